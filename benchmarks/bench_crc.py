@@ -0,0 +1,75 @@
+"""Compares CRC16Kermit throughput against the original pythoncrc implementation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_crc
+"""
+
+import os
+from ctypes import c_ushort
+from timeit import repeat
+
+from pt_fw_updater.core.crc import BACKEND, BACKENDS, CRC16Kermit
+
+PAYLOAD_SIZES = (265, 64 * 1024)
+
+
+class LegacyCRC16Kermit(object):
+    """The implementation shipped before the integer-table rewrite."""
+
+    crc16kermit_tab: list = list()
+    crc16Kermit_constant = 0x8408
+
+    def __init__(self):
+        if not len(self.crc16kermit_tab):
+            for i in range(0, 256):
+                crc = c_ushort(i).value
+                for j in range(0, 8):
+                    if crc & 0x0001:
+                        crc = c_ushort(crc >> 1).value ^ self.crc16Kermit_constant
+                    else:
+                        crc = c_ushort(crc >> 1).value
+                self.crc16kermit_tab.append(hex(crc))
+
+    def calculate(self, input_data):
+        crcValue = 0x0000
+        for c in input_data:
+            tmp = crcValue ^ c
+            crcValue = c_ushort(crcValue >> 8).value ^ int(
+                self.crc16kermit_tab[(tmp & 0x00FF)], 0
+            )
+        low_byte = (crcValue & 0xFF00) >> 8
+        high_byte = (crcValue & 0x00FF) << 8
+        return low_byte | high_byte
+
+
+def bytes_per_second(func, data, number):
+    best = min(repeat(lambda: func(data), number=number, repeat=5))
+    return len(data) * number / best
+
+
+def main():
+    implementations = {"legacy": lambda data: LegacyCRC16Kermit().calculate(data)}
+    for name in BACKENDS:
+        implementations[name] = lambda data, name=name: CRC16Kermit(
+            backend=name
+        ).calculate(data)
+
+    print(f"Default backend: {BACKEND}")
+    for size in PAYLOAD_SIZES:
+        data = os.urandom(size)
+        number = max(1, 200_000 // size)
+        rates = {
+            name: bytes_per_second(func, data, number)
+            for name, func in implementations.items()
+        }
+        baseline = rates["legacy"]
+        print(f"\n{size} byte payload")
+        for name, rate in rates.items():
+            print(
+                f"  {name:<10} {rate / 1e6:10.2f} MB/s  ({rate / baseline:6.1f}x legacy)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compares firmware transfer time at every supported frame size.
+
+The same image is encoded at each frame size and sent to a simulated
+device. Sending a frame costs its bytes on the bus plus the delay
+applied after every I2C transaction, so smaller frames pay that delay
+more often.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_frame_size [--image FILE] [--interval SECS]
+"""
+
+import argparse
+import os
+from time import perf_counter
+
+from pt_fw_updater.core.frame_creator import SUPPORTED_FRAME_SIZES
+from pt_fw_updater.core.packet_manager import PacketManager, PacketType
+from pt_fw_updater.utils import bundled_firmware_files
+
+# 8 data bits and an ack bit for every byte of an I2C write
+I2C_BITS_PER_BYTE = 9
+
+
+class SimulatedBus(object):
+    """Adds up the time a real bus would take instead of sleeping."""
+
+    def __init__(self, bus_speed: int, interval: float) -> None:
+        self.bus_speed = bus_speed
+        self.interval = interval
+        self.elapsed = 0.0
+
+    def send(self, packet) -> None:
+        # Register byte and address byte are sent with every packet
+        bytes_on_bus = len(packet) + 2
+        self.elapsed += bytes_on_bus * I2C_BITS_PER_BYTE / self.bus_speed
+        self.elapsed += self.interval
+
+
+def transfer_time(bin_file: str, frame_size: int, bus_speed: int, interval: float):
+    packet_manager = PacketManager(frame_length=frame_size)
+    packet_manager.set_fw_file_to_install(bin_file)
+    bus = SimulatedBus(bus_speed, interval)
+
+    start = perf_counter()
+    bus.send(packet_manager.create_packets(PacketType.StartingPacket))
+    frames = 0
+    for packet in packet_manager.iter_fw_packets():
+        bus.send(list(packet))
+        frames += 1
+    encode_time = perf_counter() - start
+    packet_manager.close()
+    return frames, encode_time, bus.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--image",
+        help="Firmware file to send (default: largest bundled file)",
+        default=max(bundled_firmware_files(), key=os.path.getsize),
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.1,
+        help="Delay after every packet in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--bus-speed",
+        type=int,
+        default=100_000,
+        help="I2C clock in Hz (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    print(f"{args.image}")
+    print(f"interval {args.interval}s, bus {args.bus_speed / 1000:.0f} kHz\n")
+    print(f"  {'frame size':>10} {'frames':>7} {'encode':>9} {'transfer':>10}")
+    results = {
+        frame_size: transfer_time(args.image, frame_size, args.bus_speed, args.interval)
+        for frame_size in SUPPORTED_FRAME_SIZES
+    }
+    baseline = results[max(SUPPORTED_FRAME_SIZES)][2]
+    for frame_size, (frames, encode_time, elapsed) in results.items():
+        print(
+            f"  {frame_size:>10} {frames:>7} {encode_time * 1000:>7.1f}ms "
+            f"{elapsed:>9.1f}s  ({elapsed / baseline:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
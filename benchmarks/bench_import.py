@@ -0,0 +1,138 @@
+"""Measures how long the command line entry points take to start.
+
+Each target runs in a fresh interpreter with -X importtime. The total
+import time is the cumulative time of the top-level imports; the wall
+time also includes interpreter startup and running the command itself.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import [--repeat N]
+"""
+
+import argparse
+import subprocess
+import sys
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+_ENTRY_POINT = (
+    "import sys; sys.argv = {argv!r}; "
+    "from pt_fw_updater.__main__ import {command}; {command}()"
+)
+
+TARGETS = (
+    ("python", "pass"),
+    (
+        "pt-firmware-updater --version",
+        _ENTRY_POINT.format(
+            argv=["pt-firmware-updater", "--version"], command="do_update"
+        ),
+    ),
+    (
+        "pt-firmware-checker --version",
+        _ENTRY_POINT.format(
+            argv=["pt-firmware-checker", "--version"], command="do_check"
+        ),
+    ),
+    ("checker modules", "import pt_fw_updater.check"),
+    ("updater modules", "import pt_fw_updater.update"),
+)
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int]]:
+    """Returns the name and cumulative time in microseconds of every
+    top-level import in -X importtime output."""
+    imports = list()
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        # Nested imports are indented under the module that imported them
+        if name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(fields[1])))
+    return imports
+
+
+def measure(code: str, repeat: int = 5) -> Dict:
+    """Returns the best wall and import time of running code in a new
+    interpreter, and the slowest top-level imports of that run.
+
+    Raises RuntimeError if the code fails, since its timings wouldn't
+    be those of a normal run.
+    """
+    runs: List[Dict[str, Any]] = list()
+    for _ in range(repeat):
+        start = perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        wall_time = perf_counter() - start
+        if process.returncode != 0:
+            errors = [
+                line
+                for line in process.stderr.splitlines()
+                if not line.startswith("import time:")
+            ]
+            # The last line of a traceback is the exception
+            raise RuntimeError(
+                "Exited with status {}: {}".format(
+                    process.returncode, errors[-1] if errors else ""
+                )
+            )
+        imports = parse_importtime(process.stderr)
+        import_time = sum(cumulative for _, cumulative in imports) / 1_000_000
+        runs.append(
+            {
+                "wall_time": wall_time,
+                "import_time": import_time,
+                "slowest_imports": sorted(imports, key=lambda i: -i[1])[:5],
+            }
+        )
+    return min(runs, key=lambda run: run["wall_time"])
+
+
+def import_benchmarks(repeat: int = 5):
+    """Yields the name and timings of every target. A target that fails,
+    e.g. because the package isn't installed, is skipped and yields the
+    reason instead."""
+    for name, code in TARGETS:
+        try:
+            yield name, measure(code, repeat)
+        except RuntimeError as e:
+            yield name, {"skipped": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Runs of each target, keeping the fastest (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    print(f"  {'target':<32} {'wall':>9} {'imports':>9}  slowest imports")
+    for name, result in import_benchmarks(args.repeat):
+        if "skipped" in result:
+            print(f"  {name:<32} skipped: {result['skipped']}")
+            continue
+        slowest = ", ".join(
+            f"{module} {cumulative / 1000:.1f}ms"
+            for module, cumulative in result["slowest_imports"][:3]
+        )
+        print(
+            f"  {name:<32} {result['wall_time'] * 1000:>7.1f}ms "
+            f"{result['import_time'] * 1000:>7.1f}ms  {slowest}"
+        )
+
+
+if __name__ == "__main__":
+    main()
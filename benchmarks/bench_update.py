@@ -0,0 +1,105 @@
+"""Runs a full firmware update against a simulated device.
+
+Every bundled image is staged and installed with FirmwareUpdater on a
+SimulatedFirmwareDevice that reports the previous version. The time
+spent in the updater is measured separately from the bus time the
+simulated device models, unless --realtime is given.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_update [--pipelined] [--realtime]
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from time import perf_counter
+from unittest.mock import patch
+
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from pt_fw_updater.core.simulated_device import SimulatedFirmwareDevice
+from pt_fw_updater.utils import bundled_firmware_files
+
+# 100 kHz I2C, 9 bits per byte
+DEFAULT_BYTE_TIME = 9 / 100_000
+
+
+def simulated_update(
+    bin_file: str,
+    pipelined: bool = False,
+    byte_time: float = DEFAULT_BYTE_TIME,
+    interval: float = 0.0,
+    realtime: bool = False,
+):
+    fw_file = FirmwareFileObject.from_file(bin_file)
+    if fw_file.firmware_version is None or fw_file.schematic_version is None:
+        raise ValueError("{}: {}".format(bin_file, fw_file.error_string))
+    major, minor = fw_file.firmware_version
+    previous_version = (
+        "{}.{}".format(major, minor - 1) if minor else "{}.0".format(major - 1)
+    )
+    device = SimulatedFirmwareDevice(
+        fw_file.device_name,
+        fw_version=previous_version,
+        schematic_version=fw_file.schematic_version,
+        byte_time=byte_time,
+        send_packet_interval=interval,
+        realtime=realtime,
+    )
+    fw_updater = FirmwareUpdater(device, pipelined=pipelined)
+    fw_updater.stage_file(fw_file)
+
+    start = perf_counter()
+    # Don't wait for the simulated device to restart
+    with patch("pt_fw_updater.core.readiness.sleep"):
+        success, _ = fw_updater.install_updates()
+    elapsed = perf_counter() - start
+    # Hubs keep the verified image until the next power cycle
+    installed = success and (device.fw_okay or device.resets > 0)
+    return device, elapsed, installed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Sleep for the modelled bus time instead of only adding it up",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        help="Delay after every packet in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--byte-time",
+        type=float,
+        default=DEFAULT_BYTE_TIME,
+        help="Bus time per byte in seconds (default: 100 kHz I2C)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print(f"  {'image':<45} {'updater':>9} {'bus':>8} {'installed':>10}")
+    for bin_file in bundled_firmware_files():
+        fw_file = FirmwareFileObject.from_file(bin_file)
+        if fw_file.error or fw_file.device_name not in (
+            "pt4_hub",
+            "pt4_foundation_plate",
+            "pt4_expansion_plate",
+        ):
+            continue
+        device, elapsed, installed = simulated_update(
+            bin_file, args.pipelined, args.byte_time, args.interval, args.realtime
+        )
+        print(
+            f"  {Path(bin_file).name:<45} {elapsed * 1000:>7.1f}ms "
+            f"{device.bus_time:>7.2f}s {str(installed):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
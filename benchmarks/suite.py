@@ -0,0 +1,261 @@
+"""Benchmark suite for the firmware update hot paths.
+
+Measures CPU time, wall time and peak Python memory of:
+
+- CRC16Kermit.calculate
+- FrameCreator.create_fw_frame
+- PacketManager.create_packets for every bundled firmware file
+- FirmwareFileObject.from_file
+- find_latest_firmware over folders of 10 to 10,000 files
+- a full update of a simulated device
+- the import time of the command line entry points, see bench_import;
+  entry points that fail to run, e.g. when the package isn't installed,
+  are recorded as skipped with the reason
+
+Results are written as JSON so runs from different releases can be
+compared; --compare exits with status 1 if any benchmark got slower or
+used more memory than the given threshold allows.
+
+Run from the repository root:
+
+    python -m benchmarks.suite [--output FILE] [--compare FILE] [--quick]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter, process_time
+from typing import Callable, Dict, List
+
+from benchmarks.bench_import import import_benchmarks
+from benchmarks.bench_update import simulated_update
+from pt_fw_updater import __version__, utils
+from pt_fw_updater.core.crc import CRC16Kermit
+from pt_fw_updater.core.firmware_catalog import FirmwareCatalog
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.frame_creator import FrameCreator
+from pt_fw_updater.core.packet_manager import PacketManager, PacketType
+from pt_fw_updater.core.simulated_device import SimulatedFirmwareDevice
+
+FOLDER_SIZES = (10, 100, 1000, 10000)
+QUICK_FOLDER_SIZES = (10, 100)
+SIMULATED_UPDATE_FILE = "pt4_hub-v5.6-sch10-release.bin"
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Returns the best CPU and wall time of func over repeat runs, and its
+    peak memory in a separate, traced run."""
+    func()
+    cpu_times = list()
+    wall_times = list()
+    for _ in range(repeat):
+        cpu_start = process_time()
+        wall_start = perf_counter()
+        func()
+        wall_times.append(perf_counter() - wall_start)
+        cpu_times.append(process_time() - cpu_start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "cpu_time": min(cpu_times),
+        "wall_time": min(wall_times),
+        "peak_memory": peak_memory,
+        "repeat": repeat,
+    }
+
+
+def crc_benchmarks():
+    for size in (265, 64 * 1024):
+        data = os.urandom(size)
+        calculate = partial(CRC16Kermit().calculate, data)
+        yield f"crc.calculate[{size}]", calculate, max(5, 200_000 // size)
+
+
+def frame_creator_benchmarks():
+    create_fw_frame = partial(FrameCreator.create_fw_frame, 1, os.urandom(256))
+    yield "frame_creator.create_fw_frame[256]", create_fw_frame, 1000
+
+
+def packet_manager_benchmarks():
+    def create_packets(bin_file):
+        packet_manager = PacketManager()
+        packet_manager.set_fw_file_to_install(bin_file)
+        packet_manager.create_packets(PacketType.StartingPacket)
+        packet_manager.create_packets(PacketType.FwPackets)
+        packet_manager.close()
+
+    for bin_file in utils.bundled_firmware_files():
+        name = f"packet_manager.create_packets[{Path(bin_file).name}]"
+        yield name, partial(create_packets, bin_file), 20
+
+
+def firmware_file_benchmarks(folder_sizes):
+    bin_file = utils.bundled_firmware_files()[0]
+    from_file = partial(FirmwareFileObject.from_file, bin_file)
+    yield "firmware_file_object.from_file", from_file, 1000
+
+    device = SimulatedFirmwareDevice("pt4_hub", fw_version="5.0", schematic_version=10)
+
+    def find_latest_firmware(folder):
+        # Every file counts as new, as in the first check after boot
+        utils.session.clear()
+        return utils.find_latest_firmware(folder, device)
+
+    # Keep the temporary folders out of the persistent catalog
+    utils.firmware_catalog = FirmwareCatalog(location=None)
+
+    for folder_size in folder_sizes:
+        folder = mkdtemp(prefix="pt-fw-bench-")
+        for i in range(folder_size):
+            schematic_version = 10 if i % 2 else 9
+            name = (
+                f"pt4_hub-v{5 + i // 100}.{i % 100}-sch{schematic_version}-release.bin"
+            )
+            Path(folder, name).touch()
+        try:
+            yield f"utils.find_latest_firmware[{folder_size}]", partial(
+                find_latest_firmware, folder
+            ), max(3, 1000 // folder_size)
+        finally:
+            rmtree(folder)
+
+
+def update_benchmarks():
+    bin_file = next(
+        f
+        for f in utils.bundled_firmware_files()
+        if Path(f).name == SIMULATED_UPDATE_FILE
+    )
+    for pipelined in (False, True):
+        name = "update.simulated[{}]".format("pipelined" if pipelined else "sequential")
+        yield name, partial(simulated_update, bin_file, pipelined), 5
+
+
+def run(quick: bool = False) -> List[Dict]:
+    results = list()
+    benchmarks = (
+        crc_benchmarks(),
+        frame_creator_benchmarks(),
+        packet_manager_benchmarks(),
+        firmware_file_benchmarks(QUICK_FOLDER_SIZES if quick else FOLDER_SIZES),
+        update_benchmarks(),
+    )
+    for group in benchmarks:
+        for name, func, repeat in group:
+            result = {"name": name}
+            result.update(measure(func, 1 if quick else repeat))
+            print(
+                f"  {name:<72} {result['cpu_time'] * 1000:>10.3f}ms "
+                f"{result['peak_memory'] / 1024:>10.1f}KiB",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    for name, result in import_benchmarks(1 if quick else 5):
+        if "skipped" in result:
+            result = {"name": f"import[{name}]", "skipped": result["skipped"]}
+            print(
+                f"  {result['name']:<72} skipped: {result['skipped']}",
+                file=sys.stderr,
+            )
+            results.append(result)
+            continue
+        result = {
+            "name": f"import[{name}]",
+            "wall_time": result["wall_time"],
+            "import_time": result["import_time"],
+        }
+        print(
+            f"  {result['name']:<72} {result['import_time'] * 1000:>10.3f}ms",
+            file=sys.stderr,
+        )
+        results.append(result)
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Returns a description of every regression against baseline."""
+    baseline_results = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = list()
+    for result in results:
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+        for metric in ("cpu_time", "peak_memory", "import_time"):
+            if metric not in result or not previous.get(metric):
+                continue
+            if result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    "{} {}: {:.6g} -> {:.6g} ({:+.0%})".format(
+                        result["name"],
+                        metric,
+                        previous[metric],
+                        result[metric],
+                        result[metric] / previous[metric] - 1,
+                    )
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument(
+        "--compare", help="Compare results against a previous JSON results file"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative increase before reporting a regression "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Run every benchmark once and skip the largest folders",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": run(args.quick),
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report["results"], json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,7 @@
-from .version import __version__
+def __getattr__(name):
+    # Looking up the installed version is slow, so only do it when asked
+    if name == "__version__":
+        from .version import __version__
+
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
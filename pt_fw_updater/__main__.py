@@ -5,10 +5,17 @@ from sys import exit
 import click
 import click_logging
 from pitop.common.firmware_device import FirmwareDevice
-from pitop.system import device_type
-from systemd.journal import JournalHandler
 
-from . import check, update
+from .constants import (
+    DEFAULT_LOOP_TIME,
+    DEFAULT_MAX_LOOP_TIME,
+    DISTRIBUTION_NAME,
+    IN_PROCESS_UPDATE,
+    UPDATE_MODES,
+)
+
+# Each command imports what it needs when it runs, so that --help,
+# --version and the other command don't pay for it
 
 logger = logging.getLogger()
 click_logging.basic_config(logger)
@@ -19,6 +26,8 @@ def is_root() -> bool:
 
 
 def handle_exit_cases():
+    from pitop.system import device_type
+
     if device_type() != "pi-top [4]":
         logger.error("This program only runs on a pi-top [4]")
         exit(0)
@@ -37,16 +46,48 @@ def handle_exit_cases():
 )
 @click.option(
     "--loop-time",
-    help="Sets the time interval in seconds that the script will wait before each update check.",
-    default=3,
+    help="Sets the time interval in seconds that the script will wait before each update check "
+    "after a device is attached, detached or updated.",
+    default=DEFAULT_LOOP_TIME,
     type=click.IntRange(1, 300),
 )
+@click.option(
+    "--max-loop-time",
+    help="Longest time between checks in seconds, reached while no devices are "
+    "attached, detached or updated",
+    default=DEFAULT_MAX_LOOP_TIME,
+    type=click.IntRange(1, 3600),
+)
+@click.option(
+    "--hotplug",
+    help="Check for devices when pi-topd reports a peripheral change instead of "
+    "every --loop-time seconds, polling if pi-topd isn't available. pi-topd "
+    "doesn't report plates, which are then only found every minute",
+    is_flag=True,
+)
+@click.option(
+    "--update-mode",
+    help="Install updates from the checker process, or by running "
+    "pt-firmware-updater for each update",
+    default=IN_PROCESS_UPDATE,
+    type=click.Choice(UPDATE_MODES),
+)
 @click_logging.simple_verbosity_option(logger)
-@click.version_option()
-def do_check(force, loop_time):
+@click.version_option(package_name=DISTRIBUTION_NAME)
+def do_check(force, loop_time, max_loop_time, hotplug, update_mode):
     handle_exit_cases()
+
+    from . import check
+    from .core.hotplug import PTDMHotplugEvents
+
     try:
-        check.main(force, loop_time)
+        check.main(
+            force,
+            loop_time,
+            PTDMHotplugEvents() if hotplug else None,
+            max_loop_time,
+            update_mode,
+        )
     except Exception as e:
         logger.error(f"{e}")
         exit(1)
@@ -54,7 +95,17 @@ def do_check(force, loop_time):
 
 @click.command()
 @click.argument(
-    "device", type=click.Choice([dev.name for dev in FirmwareDevice.valid_device_ids()])
+    "device",
+    type=click.Choice([dev.name for dev in FirmwareDevice.valid_device_ids()]),
+    required=False,
+)
+@click.option(
+    "-a",
+    "--all",
+    "all_devices",
+    help="Update every attached device that has newer firmware available, "
+    "asking the user once",
+    is_flag=True,
 )
 @click.option("-f", "--force", help="Skip internal checks of fw file", is_flag=True)
 @click.option(
@@ -80,13 +131,52 @@ def do_check(force, loop_time):
     help="Make update interactive by displaying desktop notifications to the user",
     is_flag=True,
 )
-def do_update(device, force, interval, path, notify_user):
+@click.option(
+    "--pipelined",
+    help="Encode packages in a separate thread while sending them to the device",
+    is_flag=True,
+)
+@click.option(
+    "--adaptive-interval",
+    help="Adapt the interval between packages to the device, falling back to "
+    "--interval if the device can't verify the update",
+    is_flag=True,
+)
+@click.version_option(package_name=DISTRIBUTION_NAME)
+def do_update(
+    device,
+    all_devices,
+    force,
+    interval,
+    path,
+    notify_user,
+    pipelined,
+    adaptive_interval,
+):
+    if all_devices == (device is not None):
+        raise click.UsageError("Specify either a DEVICE or --all")
+    if all_devices and path:
+        raise click.UsageError("--path can't be used with --all")
+
     handle_exit_cases()
 
+    from systemd.journal import JournalHandler
+
+    from . import update
+
     logger.addHandler(JournalHandler())
 
     try:
-        update.main(device, force, interval, path, notify_user)
+        if all_devices:
+            results = update.main_all(
+                force, interval, notify_user, pipelined, adaptive_interval
+            )
+            if not all(success for success, _ in results.values()):
+                exit(1)
+        else:
+            update.main(
+                device, force, interval, path, notify_user, pipelined, adaptive_interval
+            )
     except Exception as e:
         logger.error(f"{e}")
         exit(1)
@@ -1,6 +1,8 @@
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
 from time import sleep
-from typing import Dict, List
+from typing import Optional
 
 from pitop.common.command_runner import run_command
 from pitop.common.firmware_device import (
@@ -9,22 +11,39 @@ from pitop.common.firmware_device import (
 )
 from pitop.common.lock import PTLock
 
+from .constants import (
+    DEFAULT_LOOP_TIME,
+    DEFAULT_MAX_LOOP_TIME,
+    IN_PROCESS_UPDATE,
+    UPDATE_MODES,
+)
+from .core.checker_session import DeviceSession
+from .core.firmware_file_object import FirmwareFileObject
+from .core.hotplug import HotplugEvents
+from .core.poll_scheduler import PollScheduler
 from .utils import (
     default_firmware_folder,
     find_latest_firmware,
-    i2c_addr_found,
     is_valid_fw_object,
-    processed_firmware_files,
+    scan_bus,
+    session,
+    warm_frame_cache,
 )
 
 logger = logging.getLogger(__name__)
 
-devices_notified_this_session: List[str] = list()
-fw_device_cache: Dict[str, FirmwareDevice] = dict()
+# Checks still run this often when waiting for hotplug events, in case
+# an event was missed
+HOTPLUG_FALLBACK_LOOP_TIME = 60
+
+poll_scheduler: Optional[PollScheduler] = None
+update_mode = IN_PROCESS_UPDATE
+update_executor: Optional[ThreadPoolExecutor] = None
+update_future: Optional[Future] = None
 
 
 def already_notified_this_session(device_str: str) -> bool:
-    return device_str in devices_notified_this_session
+    return session.is_notified(device_str)
 
 
 def run_firmware_updater(
@@ -34,55 +53,215 @@ def run_firmware_updater(
     command_str = f"{FW_UPDATER_BINARY} --path {path_to_fw_object} {'' if force else '--notify-user'} {device_str}"
     logger.info(f"Running command: {command_str}")
     run_command(command_str, timeout=None)
-    devices_notified_this_session.append(device_str)
+    session.device(device_str).notified = True
+
+
+def update_device(device_session: DeviceSession, device_str: str, force: bool):
+    # Only needed once there's an update to install
+    from . import update
+
+    try:
+        # The checker's force only skips asking the user, like running
+        # pt-firmware-updater without -f; the file is still verified
+        update.main(
+            device_str,
+            False,
+            notify_user=not force,
+            fw_device=device_session.fw_device,
+            fw_file=device_session.pending_update,
+        )
+    except Exception as e:
+        logger.warning(f"{device_str} update error: {e}")
+    finally:
+        device_session.pending_update = None
+
+
+def start_firmware_update(
+    device_str: str, fw_file_object: FirmwareFileObject, force: bool = False
+) -> None:
+    """Updates a device in the background with the device handle the
+    checker already has open."""
+    global update_executor, update_future
+
+    if update_executor is None:
+        update_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="pt-firmware-update"
+        )
+
+    logger.info(f"Updating {device_str} with {fw_file_object.path}")
+    device_session = session.device(device_str)
+    device_session.notified = True
+    # Keeps the device from being evicted while it restarts
+    device_session.pending_update = fw_file_object
+    update_future = update_executor.submit(
+        update_device, device_session, device_str, force
+    )
+
+
+def update_running() -> bool:
+    return update_future is not None and not update_future.done()
+
+
+def wait_for_update() -> bool:
+    """Blocks until the update started in the background finishes,
+    returning True if there was one."""
+    global update_future
+
+    if update_future is None:
+        return False
+    logger.debug("Waiting for the running update to finish.")
+    wait_for_futures([update_future])
+    update_future = None
+    return True
 
 
-def check_and_update(device_enum, force=False):
+def check_and_update(device_enum, force=False) -> bool:
+    """Runs the updater if there's newer firmware for a device, returning
+    True if it did."""
     lock = PTLock(device_enum.name)
     if lock.is_locked():
         logger.warning(
             f"Already running an operation on {device_enum.name}... skipping"
         )
-        return
+        return False
 
     device_str = device_enum.name
     path_to_fw_folder = default_firmware_folder(device_str)
 
-    fw_device = fw_device_cache.get(device_enum.name)
-    if fw_device_cache.get(device_enum.name) is None:
+    device_session = session.get(device_str)
+    if device_session is None or device_session.fw_device is None:
+        # Only keep state for devices that identify themselves
         fw_device = FirmwareDevice(device_enum)
-        fw_device_cache[device_str] = fw_device
+        device_session = session.device(device_str)
+        device_session.fw_device = fw_device
+    session.identified_devices[device_session.fw_device.addr] = device_str
 
-    fw_file_object = find_latest_firmware(path_to_fw_folder, fw_device)
-    if is_valid_fw_object(fw_file_object):
+    # Device name and schematic version don't change while it's connected
+    if device_session.device_info is None:
+        device_session.device_info = FirmwareFileObject.from_device(
+            device_session.fw_device
+        )
+
+    fw_file_object = find_latest_firmware(
+        path_to_fw_folder, device_session.fw_device, device_session.device_info
+    )
+    if not is_valid_fw_object(fw_file_object):
+        return False
+    if update_mode == IN_PROCESS_UPDATE:
+        start_firmware_update(device_str, fw_file_object, force)
+    else:
         run_firmware_updater(device_str, fw_file_object.path, force)
+    return True
+
+
+def check_devices(force=False) -> bool:
+    """Checks every connected device for updates, returning True if the
+    connected devices changed, an update ran or a check failed."""
+    if update_running():
+        # Probes don't take the device locks, so they could land in the
+        # middle of a transaction with the device being updated
+        logger.debug("Update in progress, skipping check.")
+        return False
+
+    addresses_found = scan_bus()
+    changed = addresses_found != session.last_bus_scan
+    session.last_bus_scan = addresses_found
+    for address, found in addresses_found.items():
+        if not found:
+            session.identified_devices.pop(address, None)
+
+    for device_enum, device_info in FirmwareDevice.device_info.items():
+        device_str = device_enum.name
+        device_address = device_info.get("i2c_addr")
+
+        if not addresses_found[device_address]:
+            if not session.is_updating(device_str):
+                session.evict(device_str)
+            continue
+
+        if already_notified_this_session(device_str):
+            continue
+        if session.identified_devices.get(device_address, device_str) != device_str:
+            continue
+        try:
+            if check_and_update(device_enum, force):
+                changed = True
+                if update_future is not None:
+                    # The other devices are checked once this update
+                    # finishes and the bus is free again
+                    break
+        except PTInvalidFirmwareDeviceException as e:
+            # Probably just probing for the wrong device at the same address - nothing to worry about
+            logger.debug(f"{device_str} error: {e}")
+        except Exception as e:
+            logger.warning(f"{device_str} error: {e}")
+            changed = True
+
+    return changed
+
+
+def wait_for_next_check(timeout: float, events: Optional[HotplugEvents]) -> bool:
+    """Waits until the next check is due, returning True if it was
+    triggered by a hotplug event."""
+    if events is None:
+        logger.debug(f"Sleeping for {timeout} secs before next check.")
+        sleep(timeout)
+        return False
+
+    logger.debug(f"Waiting up to {timeout} secs for a hotplug event.")
+    received = events.wait(timeout)
+    if received:
+        logger.debug("Hotplug event received, checking devices.")
+    return received
+
+
+def main(
+    force=False,
+    loop_time=DEFAULT_LOOP_TIME,
+    events: Optional[HotplugEvents] = None,
+    max_loop_time=DEFAULT_MAX_LOOP_TIME,
+    mode=IN_PROCESS_UPDATE,
+) -> None:
+    global poll_scheduler, update_executor, update_future, update_mode
+
+    if mode not in UPDATE_MODES:
+        raise ValueError(f"Invalid update mode: {mode}")
+    update_mode = mode
+
+    warm_frame_cache()
 
+    if events is not None and not events.start():
+        logger.warning("Hotplug events unavailable, polling for devices instead.")
+        events = None
 
-def main(force=False, loop_time=3) -> None:
-    while True:
-        for device_enum, device_info in FirmwareDevice.device_info.items():
-            device_str = device_enum.name
-            device_address = device_info.get("i2c_addr")
-
-            if i2c_addr_found(device_address):
-                if already_notified_this_session(device_str):
-                    continue
-                try:
-                    check_and_update(device_enum, force)
-                except PTInvalidFirmwareDeviceException as e:
-                    # Probably just probing for the wrong device at the same address - nothing to worry about
-                    logger.debug(f"{device_str} error: {e}")
-                except Exception as e:
-                    logger.warning(f"{device_str} error: {e}")
-            else:
-                if device_str in processed_firmware_files:
-                    processed_firmware_files[device_str] = list()
-                if device_str in devices_notified_this_session:
-                    devices_notified_this_session.remove(device_str)
-                if device_str in fw_device_cache:
-                    processed_firmware_files[device_str] = list()
-
-        if force:
-            break
-        logger.debug(f"Sleeping for {loop_time} secs before next check.")
-        sleep(loop_time)
+    # Waiting for events only needs the occasional check in case one was
+    # missed
+    poll_scheduler = PollScheduler(
+        loop_time, max_loop_time if events is None else HOTPLUG_FALLBACK_LOOP_TIME
+    )
+    try:
+        event_received = False
+        while True:
+            changed = check_devices(force)
+            # Nothing else uses the bus until the update finishes; the
+            # devices are checked again soon after, once they restart
+            updated = wait_for_update()
+            if force:
+                # Check for the next device to update until none is left
+                if not updated:
+                    break
+                continue
+            if updated:
+                changed = True
+            # Devices can take a moment to appear on the bus after an event
+            interval = poll_scheduler.next_interval(changed or event_received)
+            event_received = wait_for_next_check(interval, events)
+    finally:
+        if events is not None:
+            events.stop()
+        if update_executor is not None:
+            # Let a running update finish rather than leave a device half
+            # written
+            update_executor.shutdown(wait=True)
+            update_executor = None
+            update_future = None
@@ -0,0 +1,14 @@
+# Kept apart from check.py so the command line can be built without
+# importing the checker
+
+# Name of the package as distributed, which its version is looked up by
+DISTRIBUTION_NAME = "pt-firmware-updater"
+
+DEFAULT_LOOP_TIME = 3
+DEFAULT_MAX_LOOP_TIME = 30
+
+# Updates run in a worker thread of the checker, or in a new
+# pt-firmware-updater process
+IN_PROCESS_UPDATE = "in-process"
+PROCESS_UPDATE = "process"
+UPDATE_MODES = (IN_PROCESS_UPDATE, PROCESS_UPDATE)
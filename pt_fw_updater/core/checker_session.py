@@ -0,0 +1,146 @@
+import logging
+from typing import Dict, Iterable, Iterator, Optional
+
+from pitop.common.firmware_device import FirmwareDevice
+
+from .firmware_file_object import FirmwareFileObject
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DEVICES = 16
+DEFAULT_MAX_PROCESSED_FILES = 1024
+
+
+class ProcessedFiles(object):
+    """Set of firmware file paths that holds at most max_size paths,
+    forgetting the ones added first when it's full.
+
+    Add paths oldest first: a forgotten path can be offered again, but
+    the updater won't install firmware that isn't newer than the
+    device's.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_PROCESSED_FILES) -> None:
+        if max_size < 1:
+            raise ValueError("Maximum size must be positive")
+        self.max_size = max_size
+        # Dicts keep insertion order, so the first key is the oldest path
+        self._paths: Dict[str, None] = dict()
+
+    def add(self, path: str) -> None:
+        self._paths.pop(path, None)
+        self._paths[path] = None
+        while len(self._paths) > self.max_size:
+            del self._paths[next(iter(self._paths))]
+
+    def update(self, paths: Iterable[str]) -> None:
+        for path in paths:
+            self.add(path)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
+class DeviceSession(object):
+    """What the checker knows about a connected device."""
+
+    __slots__ = (
+        "fw_device",
+        "device_info",
+        "processed_files",
+        "notified",
+        "pending_update",
+    )
+
+    def __init__(self, max_processed_files: int = DEFAULT_MAX_PROCESSED_FILES):
+        self.fw_device: Optional[FirmwareDevice] = None
+        self.device_info: Optional[FirmwareFileObject] = None
+        self.processed_files = ProcessedFiles(max_processed_files)
+        self.notified = False
+        # Firmware file being installed by the checker, if any
+        self.pending_update: Optional[FirmwareFileObject] = None
+
+    def release(self) -> None:
+        """Closes the device's I2C handle."""
+        if self.fw_device is None:
+            return
+        i2c_device = getattr(self.fw_device, "_i2c_device", None)
+        if i2c_device is not None:
+            try:
+                i2c_device.disconnect()
+            except Exception as e:
+                logger.debug(
+                    "Couldn't disconnect from {}: {}".format(self.fw_device.str_name, e)
+                )
+        self.fw_device = None
+
+
+class CheckerSession(object):
+    """State the checker keeps about devices while they stay connected.
+
+    Everything about a device is dropped when it's evicted on disconnect,
+    so a long running checker holds at most max_devices devices and
+    max_processed_files paths for each of them.
+    """
+
+    def __init__(
+        self,
+        max_devices: int = DEFAULT_MAX_DEVICES,
+        max_processed_files: int = DEFAULT_MAX_PROCESSED_FILES,
+    ) -> None:
+        self.max_devices = max_devices
+        self.max_processed_files = max_processed_files
+        self._devices: Dict[str, DeviceSession] = dict()
+        # Devices share I2C addresses; once the device at an address has
+        # been identified the others there aren't tried until it's
+        # disconnected
+        self.identified_devices: Dict[int, str] = dict()
+        self.last_bus_scan: Dict[int, bool] = dict()
+
+    def device(self, device_str: str) -> DeviceSession:
+        """Returns the state of a device, creating it if needed."""
+        device_session = self._devices.get(device_str)
+        if device_session is None:
+            while len(self._devices) >= self.max_devices:
+                self.evict(next(iter(self._devices)))
+            device_session = DeviceSession(self.max_processed_files)
+            self._devices[device_str] = device_session
+        return device_session
+
+    def get(self, device_str: str) -> Optional[DeviceSession]:
+        return self._devices.get(device_str)
+
+    def is_notified(self, device_str: str) -> bool:
+        device_session = self._devices.get(device_str)
+        return device_session is not None and device_session.notified
+
+    def is_updating(self, device_str: str) -> bool:
+        device_session = self._devices.get(device_str)
+        return device_session is not None and device_session.pending_update is not None
+
+    def evict(self, device_str: str) -> None:
+        """Forgets a device and releases its handle."""
+        device_session = self._devices.pop(device_str, None)
+        if device_session is not None:
+            device_session.release()
+        for address, identified in list(self.identified_devices.items()):
+            if identified == device_str:
+                del self.identified_devices[address]
+
+    def clear(self) -> None:
+        for device_str in list(self._devices):
+            self.evict(device_str)
+        self.identified_devices.clear()
+        self.last_bus_scan = dict()
+
+    def __contains__(self, device_str: object) -> bool:
+        return device_str in self._devices
+
+    def __len__(self) -> int:
+        return len(self._devices)
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TransferCheckpoint(object):
+    """Records how far a firmware transfer to a device got.
+
+    The checkpoint holds the image SHA-256, the frame size, the firmware
+    version the device reported when the transfer started and the number
+    of frames the device acknowledged. It is saved every SAVE_EVERY frames
+    and when a transfer fails, so a crash or a service restart loses at
+    most SAVE_EVERY frames of progress, and it is removed once a transfer
+    completes.
+    """
+
+    DEFAULT_LOCATION = "/var/lib/pt-firmware-updater/checkpoints/"
+    SAVE_EVERY = 64
+    # Frames resent before the last acknowledged one, in case the device
+    # acknowledged a frame it didn't get to write
+    REWIND_FRAMES = 1
+
+    def __init__(self, device_name: str, location: Optional[str] = None) -> None:
+        if location is None:
+            location = self.DEFAULT_LOCATION
+        self.device_name = device_name
+        self.location = location
+        self.path = os.path.join(location, "{}.json".format(device_name))
+        self.image_digest: Optional[str] = None
+        self.frame_size = 0
+        self.total_frames = 0
+        self.fw_version: Optional[str] = None
+        self.acknowledged_frames = 0
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("Not a checkpoint")
+            return data
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug("Couldn't read checkpoint {}: {}".format(self.path, e))
+            return None
+
+    def resume_index(
+        self, image_digest: str, frame_size: int, total_frames: int, fw_version: str
+    ) -> int:
+        """Returns the index of the first frame to send to the device.
+
+        Returns 0 and removes the checkpoint if it doesn't belong to this
+        image or the device state can't be trusted, e.g. because the device
+        firmware changed since the checkpoint was saved.
+        """
+        data = self.load()
+        if data is None:
+            return 0
+
+        try:
+            acknowledged_frames = int(data["acknowledged_frames"])
+            matches = (
+                data["device"] == self.device_name
+                and data["image"] == image_digest
+                and int(data["frame_size"]) == frame_size
+                and int(data["total_frames"]) == total_frames
+                and data["fw_version"] == fw_version
+                and 0 < acknowledged_frames < total_frames
+            )
+        except (KeyError, TypeError, ValueError):
+            matches = False
+
+        if not matches:
+            logger.info(
+                "{} - Discarding checkpoint of a previous transfer".format(
+                    self.device_name
+                )
+            )
+            self.clear()
+            return 0
+
+        return max(0, acknowledged_frames - self.REWIND_FRAMES)
+
+    def begin(
+        self,
+        image_digest: str,
+        frame_size: int,
+        total_frames: int,
+        fw_version: str,
+        start_index: int = 0,
+    ) -> None:
+        self.image_digest = image_digest
+        self.frame_size = frame_size
+        self.total_frames = total_frames
+        self.fw_version = fw_version
+        self.acknowledged_frames = start_index
+
+    def track(self, send: Callable[[List[int]], None]) -> Callable[[List[int]], None]:
+        """Returns a send function that counts acknowledged frames."""
+
+        def tracked_send(packet: List[int]) -> None:
+            send(packet)
+            self.acknowledged_frames += 1
+            if self.acknowledged_frames % self.SAVE_EVERY == 0:
+                self.save()
+
+        return tracked_send
+
+    def save(self) -> None:
+        data = {
+            "device": self.device_name,
+            "image": self.image_digest,
+            "frame_size": self.frame_size,
+            "total_frames": self.total_frames,
+            "fw_version": self.fw_version,
+            "acknowledged_frames": self.acknowledged_frames,
+        }
+        temp_path = "{}.tmp".format(self.path)
+        try:
+            os.makedirs(self.location, exist_ok=True)
+            with open(temp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.debug("Couldn't save checkpoint {}: {}".format(self.path, e))
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
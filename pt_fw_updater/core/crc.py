@@ -1,65 +1,170 @@
 # -*- coding: utf8 -*-
 
-# This file is taken from pythoncrc 1.21 (https://pypi.org/project/pythoncrc/)
+# The table-driven algorithm is based on pythoncrc 1.21 (https://pypi.org/project/pythoncrc/)
 
 #
 # CRC16Kermit (CRC-CCITT (Kermit)) MODULE
 #
 
 
-from ctypes import c_ushort
-from typing import List
+from struct import iter_unpack
+from typing import Callable, Dict, List, Union
+
+try:
+    from binascii import crc_hqx
+except ImportError:  # pragma: no cover - only on interpreters without binascii
+    crc_hqx = None  # type: ignore[assignment]
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Reflected form of the CRC-CCITT polynomial 0x1021
+CRC16_KERMIT_POLYNOMIAL = 0x8408
+
+# Number of bytes consumed per step by the slicing backend
+SLICING_FACTOR = 8
+
+
+def _build_table() -> List[int]:
+    table = list()
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ CRC16_KERMIT_POLYNOMIAL
+            else:
+                crc = crc >> 1
+        table.append(crc)
+    return table
+
+
+def _build_slicing_tables(n: int) -> List[List[int]]:
+    """Builds the tables for slicing-by-n.
+
+    Table k holds the CRC contribution of a byte followed by k zero
+    bytes.
+    """
+    tables = [CRC16_KERMIT_TABLE]
+    for _ in range(1, n):
+        previous = tables[-1]
+        tables.append([(crc >> 8) ^ CRC16_KERMIT_TABLE[crc & 0xFF] for crc in previous])
+    return tables
+
+
+CRC16_KERMIT_TABLE = _build_table()
+_SLICING_TABLES = _build_slicing_tables(SLICING_FACTOR)
+_REFLECTED_BYTES = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
+
+
+def _as_bytes_view(data: BytesLike) -> memoryview:
+    if isinstance(data, str):
+        raise TypeError("Please provide a byte sequence as argument for calculation.")
+    view = memoryview(data)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+def _update_table(crc: int, data: BytesLike) -> int:
+    table = CRC16_KERMIT_TABLE
+    for byte in _as_bytes_view(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _update_slicing(crc: int, data: BytesLike) -> int:
+    view = _as_bytes_view(data)
+    end = len(view) - len(view) % SLICING_FACTOR
+    t0, t1, t2, t3, t4, t5, t6, t7 = _SLICING_TABLES
+
+    # The register only overlaps the first two bytes of each block; the
+    # remaining bytes are looked up independently of it.
+    for b0, b1, b2, b3, b4, b5, b6, b7 in iter_unpack("8B", view[:end]):
+        crc = (
+            t7[b0 ^ (crc & 0xFF)]
+            ^ t6[b1 ^ (crc >> 8)]
+            ^ t5[b2]
+            ^ t4[b3]
+            ^ t3[b4]
+            ^ t2[b5]
+            ^ t1[b6]
+            ^ t0[b7]
+        )
+
+    return _update_table(crc, view[end:])
+
+
+def _reflect16(value: int) -> int:
+    return (_REFLECTED_BYTES[value & 0xFF] << 8) | _REFLECTED_BYTES[value >> 8]
+
+
+def _update_binascii(crc: int, data: BytesLike) -> int:
+    # crc_hqx computes the same polynomial MSB-first (CRC-16/XMODEM). Mirroring
+    # every input byte and the register converts between the two forms, so the
+    # whole calculation runs in C.
+    if not isinstance(data, (bytes, bytearray)):
+        data = _as_bytes_view(data).tobytes()
+    return _reflect16(crc_hqx(data.translate(_REFLECTED_BYTES), _reflect16(crc)))
+
+
+BACKENDS: Dict[str, Callable[[int, BytesLike], int]] = {
+    "table": _update_table,
+    "slicing": _update_slicing,
+}
+if crc_hqx is not None:
+    BACKENDS["binascii"] = _update_binascii
+
+# Fastest backend available in this interpreter, picked at import time
+BACKEND = "binascii" if "binascii" in BACKENDS else "slicing"
 
 
 class CRC16Kermit(object):
-    crc16kermit_tab: List[str] = list()
-
-    # The CRC's are computed using polynomials. Here is the most used
-    # coefficient for CRC16 SICK
-    crc16Kermit_constant = 0x8408
-
-    def __init__(self):
-        # initialize the precalculated tables
-        if not len(self.crc16kermit_tab):
-            self.init_crc16kermit()
-
-    def calculate(self, input_data=None):
-        try:
-            is_string = isinstance(input_data, str)
-            is_bytes = isinstance(input_data, bytes)
-
-            if not is_string and not is_bytes:
-                raise Exception(
-                    "Please provide a string or a byte sequence "
-                    "as argument for calculation."
-                )
-
-            crcValue = 0x0000
-
-            for c in input_data:
-                d = ord(c) if is_string else c
-                tmp = crcValue ^ d
-                crcValue = c_ushort(crcValue >> 8).value ^ int(
-                    self.crc16kermit_tab[(tmp & 0x00FF)], 0
-                )
-
-            # After processing, the one's complement of the CRC is calculated
-            # and two bytes of the CRC are swapped.
-            low_byte = (crcValue & 0xFF00) >> 8
-            high_byte = (crcValue & 0x00FF) << 8
-            crcValue = low_byte | high_byte
-
-            return crcValue
-        except Exception as e:
-            print("EXCEPTION(calculate): {}".format(e))
-
-    def init_crc16kermit(self):
-        """The algorithm use tables with precalculated values."""
-        for i in range(0, 256):
-            crc = c_ushort(i).value
-            for j in range(0, 8):
-                if crc & 0x0001:
-                    crc = c_ushort(crc >> 1).value ^ self.crc16Kermit_constant
-                else:
-                    crc = c_ushort(crc >> 1).value
-            self.crc16kermit_tab.append(hex(crc))
+    """Incremental CRC-16/KERMIT calculator.
+
+    Usage mirrors hashlib: feed data with update() and read the result with
+    digest(), which returns the two CRC bytes in the order they are appended
+    to a frame.
+    """
+
+    def __init__(self, data: BytesLike = b"", backend: str = BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown CRC backend: {}".format(backend))
+        self.backend = backend
+        self._update = BACKENDS[backend]
+        self._crc = 0x0000
+        if data:
+            self.update(data)
+
+    def update(self, data: BytesLike) -> "CRC16Kermit":
+        self._crc = self._update(self._crc, data)
+        return self
+
+    @property
+    def value(self) -> int:
+        return self._crc
+
+    def digest(self) -> bytes:
+        return self._crc.to_bytes(2, byteorder="big")
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+    def copy(self) -> "CRC16Kermit":
+        other = CRC16Kermit(backend=self.backend)
+        other._crc = self._crc
+        return other
+
+    def calculate(self, input_data: Union[str, BytesLike]) -> int:
+        """One-shot calculation, kept for compatibility with pythoncrc.
+
+        The two bytes of the returned CRC are swapped, as in the original
+        implementation. The state used by update() is not modified.
+        """
+        if isinstance(input_data, str):
+            input_data = input_data.encode("latin-1")
+        crc = self._update(0x0000, input_data)
+        return ((crc & 0xFF00) >> 8) | ((crc & 0x00FF) << 8)
+
+
+def crc16_kermit(data: BytesLike) -> bytes:
+    """Returns the CRC of data as it is appended to a frame."""
+    return BACKENDS[BACKEND](0x0000, data).to_bytes(2, byteorder="big")
@@ -0,0 +1,91 @@
+import logging
+
+from pitop.common.firmware_device import FirmwareDevice
+
+from .frame_creator import DEFAULT_FRAME_SIZE, SUPPORTED_FRAME_SIZES
+from .retry import register_reads
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceProfile(object):
+    """Transfer settings of the bootloader of a firmware device.
+
+    frame_size is the largest frame size used for the device; it's
+    lowered to the maximum the bootloader advertises, if it does.
+    supports_resume is only set for bootloaders known to keep the frames
+    already written when a transfer is restarted with the same starting
+    packet, so that an interrupted transfer can continue from the last
+    acknowledged frame instead of frame 1.
+    """
+
+    def __init__(
+        self,
+        device_name: str,
+        frame_size: int = DEFAULT_FRAME_SIZE,
+        supports_resume: bool = False,
+    ) -> None:
+        if frame_size not in SUPPORTED_FRAME_SIZES:
+            raise ValueError(
+                "{} - Unsupported frame size: {}".format(device_name, frame_size)
+            )
+        self.device_name = device_name
+        self.frame_size = frame_size
+        self.supports_resume = supports_resume
+
+    def __repr__(self) -> str:
+        return "DeviceProfile({}, frame_size={}, supports_resume={})".format(
+            self.device_name, self.frame_size, self.supports_resume
+        )
+
+
+DEVICE_PROFILES = {
+    "pt4_hub": DeviceProfile("pt4_hub"),
+    "pt4_foundation_plate": DeviceProfile("pt4_foundation_plate"),
+    "pt4_expansion_plate": DeviceProfile("pt4_expansion_plate"),
+}
+
+
+def get_device_profile(device_name: str) -> DeviceProfile:
+    """Returns the profile of a device, or a conservative default for
+    unknown devices."""
+    profile = DEVICE_PROFILES.get(device_name)
+    if profile is None:
+        profile = DeviceProfile(device_name)
+    return profile
+
+
+def negotiate_frame_size(fw_device: FirmwareDevice, profile: DeviceProfile) -> int:
+    """Returns the largest supported frame size allowed by both the device
+    profile and the maximum advertised by the bootloader.
+
+    Devices that don't advertise a maximum, or return None, use the
+    profile frame size.
+    """
+    max_frame_size = profile.frame_size
+    get_max_frame_size = getattr(fw_device, "get_max_frame_size", None)
+    if get_max_frame_size is not None:
+        try:
+            advertised = register_reads.call(get_max_frame_size)
+            if advertised is not None:
+                logger.debug(
+                    "{} - Bootloader accepts frames of up to {} bytes".format(
+                        profile.device_name, advertised
+                    )
+                )
+                max_frame_size = min(max_frame_size, int(advertised))
+        except Exception as e:
+            logger.warning(
+                "{} - Couldn't read maximum frame size, using {} bytes: {}".format(
+                    profile.device_name, max_frame_size, e
+                )
+            )
+
+    frame_sizes = [size for size in SUPPORTED_FRAME_SIZES if size <= max_frame_size]
+    if not frame_sizes:
+        raise ValueError(
+            "{} - No supported frame size fits in {} bytes".format(
+                profile.device_name, max_frame_size
+            )
+        )
+    return frame_sizes[-1]
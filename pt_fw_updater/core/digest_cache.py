@@ -0,0 +1,66 @@
+import logging
+import os
+from hashlib import md5
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 64
+_CHUNK_SIZE = 64 * 1024
+
+
+def _file_key(filename: str) -> Tuple[int, int, int, int]:
+    stat_result = os.stat(filename)
+    return (
+        stat_result.st_dev,
+        stat_result.st_ino,
+        stat_result.st_size,
+        stat_result.st_mtime_ns,
+    )
+
+
+class DigestCache(object):
+    """MD5 digests of files, remembered against their device, inode, size
+    and modification time.
+
+    A file is only hashed again once one of those changes, which covers
+    the file being replaced or rewritten. A rewrite that keeps the size
+    within the filesystem's timestamp resolution isn't noticed, so
+    callers that must not trust the file re-hash it themselves.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._digests: Dict[Tuple[int, int, int, int], str] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, filename: str) -> str:
+        key = _file_key(filename)
+        digest = self._digests.get(key)
+        if digest is not None:
+            self.hits += 1
+            return digest
+
+        self.misses += 1
+        hash_object = md5()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                hash_object.update(chunk)
+        digest = hash_object.hexdigest()
+        self.__store(key, digest)
+        return digest
+
+    def remember(self, filename: str, digest: str) -> None:
+        """Records a digest computed elsewhere, e.g. while copying the
+        file."""
+        self.__store(_file_key(filename), digest)
+
+    def clear(self) -> None:
+        self._digests.clear()
+
+    def __store(self, key: Tuple[int, int, int, int], digest: str) -> None:
+        self._digests.pop(key, None)
+        self._digests[key] = digest
+        while len(self._digests) > self.max_entries:
+            del self._digests[next(iter(self._digests))]
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+from typing import Container, Dict, List, Optional, Tuple
+
+from .firmware_file_object import FirmwareFileObject
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+
+
+def candidate_key(device_name: Optional[str], schematic_version: Optional[int]) -> str:
+    return "{}-sch{}".format(device_name, schematic_version)
+
+
+class FirmwareCatalog(object):
+    """Index of the valid firmware files in each firmware folder.
+
+    Files are grouped by device name and schematic version and kept
+    sorted from newest to oldest, so finding the latest firmware for a
+    device doesn't parse the folder again. A folder is indexed again
+    when its modification time changes, which happens whenever a file is
+    added, removed or renamed in it. The index is saved to disk so it
+    survives restarts of the checker.
+    """
+
+    DEFAULT_LOCATION = "/var/cache/pt-firmware-updater/catalog.json"
+
+    def __init__(self, location: Optional[str] = DEFAULT_LOCATION) -> None:
+        self.location = location
+        self._folders: Optional[Dict[str, Dict]] = None
+        # Paths built from each index, kept in memory only
+        self._paths: Dict[str, Tuple] = dict()
+
+    def candidates(
+        self,
+        folder: str,
+        device_name: Optional[str],
+        schematic_version: Optional[int],
+    ) -> List[str]:
+        """Returns the paths of the firmware files for a device, newest
+        first."""
+        _, candidates = self.__get_paths(folder)
+        return candidates.get(candidate_key(device_name, schematic_version), [])
+
+    def files(self, folder: str) -> Tuple[str, ...]:
+        """Returns the paths of every file in the folder when it was last
+        indexed."""
+        files, _ = self.__get_paths(folder)
+        return files
+
+    def latest(
+        self,
+        folder: str,
+        device_name: Optional[str],
+        schematic_version: Optional[int],
+        exclude: Container[str] = frozenset(),
+    ) -> Optional[FirmwareFileObject]:
+        """Returns the newest firmware file for a device that isn't in
+        exclude."""
+        for path in self.candidates(folder, device_name, schematic_version):
+            if path not in exclude:
+                return FirmwareFileObject.from_file(path)
+        return None
+
+    def invalidate(self, folder: Optional[str] = None) -> None:
+        folders = self.__get_folders()
+        if folder is None:
+            folders.clear()
+            self._paths.clear()
+        else:
+            folders.pop(os.path.abspath(folder), None)
+            self._paths.pop(folder, None)
+
+    def __get_paths(self, folder: str) -> Tuple:
+        index = self.__get_index(folder)
+        paths = self._paths.get(folder)
+        if paths is None or paths[0] is not index:
+            paths = (
+                index,
+                tuple(os.path.join(folder, filename) for filename in index["files"]),
+                {
+                    key: [os.path.join(folder, filename) for filename in filenames]
+                    for key, filenames in index["candidates"].items()
+                },
+            )
+            self._paths[folder] = paths
+        return paths[1:]
+
+    def __get_index(self, folder: str) -> Dict:
+        folder = os.path.abspath(folder)
+        mtime = os.stat(folder).st_mtime_ns
+        folders = self.__get_folders()
+        index = folders.get(folder)
+        if index is None or index["mtime"] != mtime:
+            index = self.__index_folder(folder, mtime)
+            folders[folder] = index
+            self.__save()
+        return index
+
+    def __index_folder(self, folder: str, mtime: int) -> Dict:
+        logger.debug("Indexing firmware files in {}".format(folder))
+        files = list()
+        candidates: Dict[str, List[Tuple[Tuple, str]]] = dict()
+        with os.scandir(folder) as it:
+            entries = list(it)
+        for entry, fw_file in zip(entries, FirmwareFileObject.parse_many(entries)):
+            files.append(entry.name)
+            if fw_file.error:
+                continue
+            key = candidate_key(fw_file.device_name, fw_file.schematic_version)
+            candidates.setdefault(key, list()).append((fw_file.sort_key, entry.name))
+
+        return {
+            "mtime": mtime,
+            "files": sorted(files),
+            "candidates": {
+                key: [filename for _, filename in sorted(entries, reverse=True)]
+                for key, entries in candidates.items()
+            },
+        }
+
+    def __get_folders(self) -> Dict[str, Dict]:
+        if self._folders is None:
+            self._folders = self.__load()
+        return self._folders
+
+    def __load(self) -> Dict[str, Dict]:
+        if self.location is None:
+            return dict()
+        try:
+            with open(self.location) as f:
+                data = json.load(f)
+            if data.get("version") != _FORMAT_VERSION:
+                return dict()
+            return {
+                folder: index
+                for folder, index in data["folders"].items()
+                if isinstance(index, dict)
+                and {"mtime", "files", "candidates"} <= index.keys()
+            }
+        except FileNotFoundError:
+            return dict()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.debug(
+                "Couldn't read firmware catalog {}: {}".format(self.location, e)
+            )
+            return dict()
+
+    def __save(self) -> None:
+        if self.location is None:
+            return
+        temp_location = "{}.{}.tmp".format(self.location, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.location), exist_ok=True)
+            with open(temp_location, "w") as f:
+                json.dump({"version": _FORMAT_VERSION, "folders": self._folders}, f)
+            os.replace(temp_location, self.location)
+        except OSError as e:
+            logger.debug(
+                "Couldn't save firmware catalog {}: {}".format(self.location, e)
+            )
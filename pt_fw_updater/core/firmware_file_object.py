@@ -1,25 +1,67 @@
 import logging
 import os
 import re
-from distutils.version import StrictVersion
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
 
 from pitop.common.common_ids import FirmwareDeviceID
 from pitop.common.firmware_device import FirmwareDevice
 
+from .retry import register_reads
+
 logger = logging.getLogger(__name__)
 
+# e.g. 'pt4_expansion_plate-v21.1-sch2-release.bin' or
+# 'pt4_hub-v5.3-sch8-preview-1591708039.bin'
+_FILENAME_REGEX = re.compile(
+    r"(?P<device_name>[^-]*)"
+    r"-v?(?P<major>\d+)\.(?P<minor>\d+)"
+    r"-(?:sch)?(?P<schematic_version>\d+)"
+    r"-(?P<release_type>release|preview)"
+    r"(?:-(?P<timestamp>\d+)(?:-.*)?)?"
+)
+_VERSION_REGEX = re.compile(r"(\d+)\.(\d+)")
+_DEVICE_NAMES = frozenset(FirmwareDeviceID._member_names_)
+
+
+class FirmwareVersion(NamedTuple):
+    """Firmware version as a tuple of integers, so versions sort natively."""
+
+    major: int
+    minor: int
+
+    @classmethod
+    def from_string(cls, version_str: str) -> "FirmwareVersion":
+        match = _VERSION_REGEX.fullmatch(version_str)
+        if match is None:
+            raise ValueError("Invalid firmware version string: {}".format(version_str))
+        return cls(int(match.group(1)), int(match.group(2)))
+
+    def __str__(self) -> str:
+        return "{}.{}".format(self.major, self.minor)
+
 
 class FirmwareFileObject(object):
+    __slots__ = (
+        "path",
+        "error",
+        "error_string",
+        "device_name",
+        "firmware_version",
+        "schematic_version",
+        "is_release",
+        "timestamp",
+    )
+
     def __init__(
         self,
         path: str,
         error: bool,
         error_string: str,
-        device_name: str,
-        firmware_version: StrictVersion,
-        schematic_version: int,
-        is_release: bool,
-        timestamp: int = None,
+        device_name: Optional[str],
+        firmware_version: Optional[FirmwareVersion],
+        schematic_version: Optional[int],
+        is_release: Optional[bool],
+        timestamp: Optional[int] = None,
     ):
         self.path = path
         self.error = error
@@ -30,180 +72,109 @@ class FirmwareFileObject(object):
         self.is_release = is_release
         self.timestamp = timestamp
 
+    @property
+    def sort_key(self) -> Tuple:
+        """Orders firmware files like is_newer: by version, then release
+        builds before previews, then by build timestamp."""
+        return (
+            self.firmware_version,
+            bool(self.is_release),
+            self.timestamp if self.timestamp is not None else -1,
+        )
+
+    @classmethod
+    def from_file(cls, path_to_file: str) -> "FirmwareFileObject":
+        if not os.path.isfile(path_to_file):
+            return cls.__invalid(path_to_file, "No file found")
+        return cls.from_filename(path_to_file)
+
     @classmethod
-    def from_file(cls, path_to_file):
-        path = path_to_file
+    def from_filename(cls, path: str) -> "FirmwareFileObject":
+        """Parses a firmware file path without checking that it exists."""
+        if not path.endswith(".bin"):
+            return cls.__invalid(path, "Not a .bin file")
 
-        error = True  # Until we have parsed
-        error_string = "Uninitialised"
+        fw_filename = os.path.basename(path)
+        match = _FILENAME_REGEX.fullmatch(fw_filename.replace(".bin", ""))
+        if match is None or match.group("device_name") not in _DEVICE_NAMES:
+            return cls.__invalid(path, cls.__describe_error(fw_filename))
 
-        device_name = None
-        firmware_version = None
-        schematic_version = None
-        is_release = None
-        timestamp = None
+        timestamp = match.group("timestamp")
+        return cls(
+            path,
+            False,
+            "",
+            match.group("device_name"),
+            FirmwareVersion(int(match.group("major")), int(match.group("minor"))),
+            int(match.group("schematic_version")),
+            match.group("release_type") == "release",
+            int(timestamp) if timestamp is not None else None,
+        )
 
-        if not os.path.isfile(path):
-            error_string = "No file found"
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
+    @classmethod
+    def parse_many(
+        cls, entries: Iterable[Union[str, os.DirEntry]]
+    ) -> List["FirmwareFileObject"]:
+        """Parses many paths or directory entries, e.g. from os.scandir.
 
-        if not path.endswith(".bin"):
-            error_string = "Not a .bin file"
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
+        Directory entries are checked with DirEntry.is_file(), which
+        usually doesn't need another stat, and paths are only parsed.
+        """
+        fw_files = list()
+        for entry in entries:
+            if isinstance(entry, os.DirEntry):
+                if not entry.is_file():
+                    fw_files.append(cls.__invalid(entry.path, "No file found"))
+                    continue
+                entry = entry.path
+            fw_files.append(cls.from_filename(entry))
+        return fw_files
 
-        _, fw_filename = os.path.split(path)
+    @classmethod
+    def __invalid(cls, path: str, error_string: str) -> "FirmwareFileObject":
+        return cls(path, True, error_string, None, None, None, None, None)
 
-        # e.g. 'pt4_expansion_plate-v21.1-sch2-release.bin'
+    @staticmethod
+    def __describe_error(fw_filename: str) -> str:
         filename_fields = fw_filename.replace(".bin", "").split("-")
-
         if len(filename_fields) < 4:
-            error_string = "Less than 4 dash-separated fields in filename"
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
-
-        # e.g. 'pt4_expansion_plate'
-        device_name = filename_fields[0]
-        if device_name not in FirmwareDeviceID._member_names_:
-            error_string = "Invalid device name string: {}".format(device_name)
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
+            return "Less than 4 dash-separated fields in filename"
 
-        # e.g. 'v21.1'
-        version_str = filename_fields[1].replace("v", "")
-        if not re.search(r"^\d+.\d+$", version_str):
-            error_string = "Invalid firmware version string: {}".format(
+        device_name, version_str, schematic_version_str, release_type_str = (
+            filename_fields[:4]
+        )
+        if device_name not in _DEVICE_NAMES:
+            return "Invalid device name string: {}".format(device_name)
+        if not re.fullmatch(r"v?\d+\.\d+", version_str):
+            return "Invalid firmware version string: {}".format(
                 version_str.replace("v", "")
             )
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
-
-        # e.g. 'sch2'
-        schematic_version_str = filename_fields[2].replace("sch", "")
-        if not str.isdigit(schematic_version_str):
-            error_string = "Invalid schematic version string: {}".format(
+        if not re.fullmatch(r"(sch)?\d+", schematic_version_str):
+            return "Invalid schematic version string: {}".format(
                 schematic_version_str.replace("sch", "")
             )
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
-
-        # e.g. 'preview'
-        release_type_str = filename_fields[3]
-        if release_type_str != "release" and release_type_str != "preview":
-            error_string = "Invalid release type string: {}".format(release_type_str)
-            return cls(
-                path,
-                error,
-                error_string,
-                device_name,
-                firmware_version,
-                schematic_version,
-                is_release,
-                timestamp,
-            )
-
-        # e.g. '1591708039'
-        timestamp = None
-        if len(filename_fields) >= 5:
-            timestamp = filename_fields[4]
-            if not str.isdigit(timestamp):
-                error_string = "Invalid timestamp string: {}".format(timestamp)
-                return cls(
-                    path,
-                    error,
-                    error_string,
-                    device_name,
-                    firmware_version,
-                    schematic_version,
-                    is_release,
-                    timestamp,
-                )
-
-        firmware_version = StrictVersion(version_str)
-        schematic_version = int(schematic_version_str)
-        is_release = release_type_str == "release"
-
-        error_string = ""
-        error = False
-
-        return cls(
-            path,
-            error,
-            error_string,
-            device_name,
-            firmware_version,
-            schematic_version,
-            is_release,
-            timestamp,
-        )
+        if release_type_str not in ("release", "preview"):
+            return "Invalid release type string: {}".format(release_type_str)
+        return "Invalid timestamp string: {}".format(filename_fields[4])
 
     @classmethod
     def from_device(cls, device_object):
-        path = None
-        error = False
-        error_string = ""
+        read = register_reads.call
         device_name = device_object.str_name
-        firmware_version = StrictVersion(device_object.get_fw_version())
-        schematic_version = device_object.get_sch_hardware_version_major()
+        firmware_version = FirmwareVersion.from_string(
+            read(device_object.get_fw_version)
+        )
+        schematic_version = read(device_object.get_sch_hardware_version_major)
         is_release = None
         timestamp = None
-        if device_object.has_extended_build_info():
-            is_release = device_object.get_is_release_build()
-            timestamp = device_object.get_raw_build_timestamp()
+        if read(device_object.has_extended_build_info):
+            is_release = read(device_object.get_is_release_build)
+            timestamp = read(device_object.get_raw_build_timestamp)
 
         return cls(
-            path,
-            error,
-            error_string,
+            None,
+            False,
+            "",
             device_name,
             firmware_version,
             schematic_version,
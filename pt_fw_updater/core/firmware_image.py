@@ -0,0 +1,93 @@
+import logging
+import mmap
+import os
+from hashlib import md5, sha256
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FirmwareImage(object):
+    """A firmware binary file, memory-mapped and analysed in a single pass.
+
+    The size, 32-bit byte-sum checksum, MD5 and SHA-256 digests are
+    computed once when the image is opened; the MD5 can be skipped when
+    the caller already trusts the file. Frames are served as
+    read-only views into the mapping, so nothing is copied until a frame
+    is encoded. Views must not be used after the image is closed.
+    """
+
+    ANALYSIS_CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self, path: str, frame_size: int = 256, compute_md5: bool = True
+    ) -> None:
+        if frame_size <= 0:
+            raise ValueError("Invalid frame size: {}".format(frame_size))
+
+        self.path = path
+        self.frame_size = frame_size
+        self.md5: Optional[str] = None
+        self._compute_md5 = compute_md5
+        self._mmap: Optional[mmap.mmap] = None
+        self.closed = False
+
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            if self.size > 0:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.data = memoryview(self._mmap if self._mmap is not None else b"")
+        self.__analyse()
+
+    def __enter__(self) -> "FirmwareImage":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __analyse(self) -> None:
+        md5_hash = md5() if self._compute_md5 else None
+        sha256_hash = sha256()
+        checksum = 0
+        for start in range(0, self.size, self.ANALYSIS_CHUNK_SIZE):
+            chunk = self.data[start : start + self.ANALYSIS_CHUNK_SIZE]  # noqa: E203
+            if md5_hash is not None:
+                md5_hash.update(chunk)
+            sha256_hash.update(chunk)
+            checksum += sum(chunk)
+
+        if md5_hash is not None:
+            self.md5 = md5_hash.hexdigest()
+        self.sha256 = sha256_hash.hexdigest()
+        self.checksum = checksum & 0xFFFFFFFF
+        self.total_frames = -(-self.size // self.frame_size)
+        self.last_frame_length = (
+            self.size - (self.total_frames - 1) * self.frame_size
+            if self.total_frames
+            else 0
+        )
+
+    def frame(self, index: int) -> memoryview:
+        """Returns the data of the frame at index (0-based)."""
+        if not 0 <= index < self.total_frames:
+            raise IndexError("Frame index out of range: {}".format(index))
+        start = index * self.frame_size
+        return self.data[start : start + self.frame_size]  # noqa: E203
+
+    def iter_frames(self, start_index: int = 0) -> Iterator[memoryview]:
+        for index in range(start_index, self.total_frames):
+            yield self.frame(index)
+
+    def close(self) -> None:
+        self.closed = True
+        self.data.release()
+        if self._mmap is None:
+            return
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Frame views are still referenced; the mapping is released
+            # once they are garbage collected
+            logger.debug("{} - Frames still in use, deferring unmap".format(self.path))
+        self._mmap = None
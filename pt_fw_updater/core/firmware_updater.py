@@ -1,14 +1,23 @@
+import errno
 import logging
-from hashlib import md5
-from os import makedirs, path
-from shutil import copyfile
-from time import sleep
-from typing import Tuple
+from functools import partial
+from os import path
+from typing import Callable, List, Optional, Tuple
 
 from pitop.common.firmware_device import DeviceInfo, FirmwareDevice
 
+from .checkpoint import TransferCheckpoint
+from .device_profile import get_device_profile, negotiate_frame_size
+from .digest_cache import DigestCache
 from .firmware_file_object import FirmwareFileObject
+from .firmware_image import FirmwareImage
+from .frame_cache import FrameCache
+from .pacing import AdaptivePacer, set_send_packet_interval
 from .packet_manager import PacketManager, PacketType
+from .readiness import DEFAULT_READY_TIMEOUT, wait_until_ready
+from .retry import fw_okay_reads, register_reads
+from .staging_store import StagingStore
+from .transfer import TransferStats, send_frames, send_frames_pipelined
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +33,43 @@ class PTUpdatePending(Exception):
 class FirmwareUpdater(object):
     fw_file_location = ""
     fw_file_hash = ""
-    FW_SAFE_LOCATION = "/tmp/pt-firmware-updater/bin/"
-
-    def __init__(self, fw_device: FirmwareDevice) -> None:
+    # Only writable by root, since whatever is staged there gets installed
+    FW_SAFE_LOCATION = "/var/cache/pt-firmware-updater/staged/"
+    # Shared by every updater in the process
+    staged_file_digests = DigestCache()
+
+    def __init__(
+        self,
+        fw_device: FirmwareDevice,
+        pipelined: bool = False,
+        adaptive_pacing: bool = False,
+        send_packet_interval: float = 0.1,
+        strict_integrity_check: bool = True,
+        ready_timeout: float = DEFAULT_READY_TIMEOUT,
+        presence_probe: Optional[Callable[[int], bool]] = None,
+    ) -> None:
         self.device = fw_device
-        self._packet = PacketManager()
+        self.pipelined = pipelined
+        self.adaptive_pacing = adaptive_pacing
+        self.send_packet_interval = send_packet_interval
+        # Hash the staged file again when sending it instead of trusting
+        # the digest remembered for it
+        self.strict_integrity_check = strict_integrity_check
+        # How long to wait for the device to answer after it's reset, and
+        # how to check that its address is on the bus in the meantime
+        self.ready_timeout = ready_timeout
+        self.presence_probe = presence_probe
+        self.last_transfer_stats: Optional[TransferStats] = None
         self.set_current_device_info()
+        self.profile = get_device_profile(self.device_info.device_name)
+        self._checkpoint = TransferCheckpoint(self.device_info.device_name)
+        self._staging_store = StagingStore(
+            self.FW_SAFE_LOCATION, self.staged_file_digests
+        )
+        self._packet = PacketManager(
+            frame_cache=FrameCache(),
+            frame_length=negotiate_frame_size(self.device, self.profile),
+        )
 
     def set_current_device_info(self):
         self.device_info = FirmwareFileObject.from_device(self.device)
@@ -37,7 +77,8 @@ class FirmwareUpdater(object):
     def has_staged_updates(self) -> bool:
         return (
             path.isfile(self.fw_file_location)
-            and self.__read_hash_from_file(self.fw_file_location) == self.fw_file_hash
+            and self.staged_file_digests.digest(self.fw_file_location)
+            == self.fw_file_hash
         )
 
     def stage_file(self, fw_file: FirmwareFileObject, force: bool = False) -> None:
@@ -72,7 +113,20 @@ class FirmwareUpdater(object):
         fw_version_before_install = self.device_info.firmware_version
 
         logger.info(f"Current device version is {fw_version_before_install}")
-        self.__send_staged_firmware_to_device()
+        pacer = self.__create_pacer()
+        resumed = self.__send_staged_firmware_to_device(pacer)
+
+        if pacer is not None or resumed:
+            verified = self.fw_downloaded_successfully()
+            if pacer is not None:
+                pacer.record_result(verified)
+            if not verified:
+                logger.warning(
+                    "{} - Resending firmware from frame 1 with a fixed interval of {} secs".format(
+                        self.device_info.device_name, self.send_packet_interval
+                    )
+                )
+                self.__send_staged_firmware_to_device(resume=False)
 
         logger.info(
             "{} - Successfully sent firmware to device.".format(
@@ -85,21 +139,31 @@ class FirmwareUpdater(object):
         if (
             self.device_info.device_name == "pt4_hub"
             or self.device_info.device_name == "pt4_expansion_plate"
-            or self.device.get_fw_version_update_schema() == 0
+            or register_reads.call(self.device.get_fw_version_update_schema) == 0
         ):
             requires_restart = True
             return success, requires_restart
 
         self.device.reset()
 
-        time_wait_mcu = 2
-
         logger.info(
-            "{} - Sleeping for {} secs before verifying update".format(
-                self.device_info.device_name, time_wait_mcu
+            "{} - Waiting up to {} secs for device to restart before verifying update".format(
+                self.device_info.device_name, self.ready_timeout
             )
         )
-        sleep(time_wait_mcu)
+        time_to_ready = wait_until_ready(
+            self.device,
+            timeout=self.ready_timeout,
+            probe=self.presence_probe,
+            previous_version=str(fw_version_before_install),
+        )
+        if time_to_ready is None:
+            logger.error(
+                "{} - Device didn't restart with new firmware after update.".format(
+                    self.device_info.device_name
+                )
+            )
+            return False, False
 
         self.set_current_device_info()
         success = self.device_info.firmware_version > fw_version_before_install
@@ -116,58 +180,131 @@ class FirmwareUpdater(object):
         requires_restart = False
         return success, requires_restart
 
-    def __send_staged_firmware_to_device(self) -> None:
-        if not self.has_staged_updates():
-            logger.error("There isn't a firmware staged to be installed on")
-            return
+    def __create_pacer(self) -> Optional[AdaptivePacer]:
+        if not self.adaptive_pacing:
+            return None
+        return AdaptivePacer(
+            self.device_info.device_name,
+            self.device_info.schematic_version,
+            fixed_interval=self.send_packet_interval,
+        )
 
-        if self.fw_file_hash != self.__read_hash_from_file(self.fw_file_location):
-            logger.error(
-                "{} - Binary file didn't pass the sanity check.".format(
-                    self.device_info.device_name
-                )
-            )
-            return
+    def __get_resume_index(self, fw_image: FirmwareImage) -> int:
+        if not self.profile.supports_resume:
+            return 0
+        return self._checkpoint.resume_index(
+            fw_image.sha256,
+            fw_image.frame_size,
+            fw_image.total_frames,
+            str(self.device_info.firmware_version),
+        )
 
-        self._packet.set_fw_file_to_install(self.fw_file_location)
+    def __send_staged_firmware_to_device(
+        self, pacer: Optional[AdaptivePacer] = None, resume: bool = True
+    ) -> bool:
+        """Sends the staged firmware to the device.
 
-        starting_packet = self._packet.create_packets(PacketType.StartingPacket)
-        self.device.send_packet(DeviceInfo.FW__UPGRADE_START, starting_packet)
+        Returns True if the transfer was resumed from a checkpoint.
+        """
+        if not path.isfile(self.fw_file_location):
+            logger.error("There isn't a firmware staged to be installed on")
+            return False
 
-        fw_packets = self._packet.create_packets(PacketType.FwPackets)
-        logger.info(
-            "{} - Sending packages to device, please wait.".format(
-                self.device_info.device_name
+        with FirmwareImage(
+            self.fw_file_location,
+            self._packet.frame_length,
+            compute_md5=self.strict_integrity_check,
+        ) as fw_image:
+            if self.strict_integrity_check:
+                digest = fw_image.md5
+            else:
+                digest = self.staged_file_digests.digest(self.fw_file_location)
+            if self.fw_file_hash != digest:
+                logger.error(
+                    "{} - Binary file didn't pass the sanity check.".format(
+                        self.device_info.device_name
+                    )
+                )
+                return False
+
+            self._packet.set_fw_image(fw_image)
+            start_index = self.__get_resume_index(fw_image) if resume else 0
+            self._checkpoint.begin(
+                fw_image.sha256,
+                fw_image.frame_size,
+                fw_image.total_frames,
+                str(self.device_info.firmware_version),
+                start_index,
             )
-        )
-        for i in range(len(fw_packets)):
-            packet = fw_packets[i]
-            self.device.send_packet(DeviceInfo.FW__UPGRADE_PACKET, packet)
+            try:
+                starting_packet = self._packet.create_packets(PacketType.StartingPacket)
+                self.device.send_packet(
+                    DeviceInfo.FW__UPGRADE_START, list(starting_packet)
+                )
 
-            if i == len(fw_packets) - 1:
-                logger.info("{} - Finished.".format(self.device_info.device_name))
+                logger.info(
+                    "{} - Sending packages to device, please wait.".format(
+                        self.device_info.device_name
+                    )
+                )
+                if start_index > 0:
+                    logger.info(
+                        "{} - Resuming interrupted transfer from frame {} of {}".format(
+                            self.device_info.device_name,
+                            start_index + 1,
+                            fw_image.total_frames,
+                        )
+                    )
+                send_fw_packet: Callable[[List[int]], None] = partial(
+                    self.device.send_packet, DeviceInfo.FW__UPGRADE_PACKET
+                )
+                if pacer is not None:
+                    send_fw_packet = pacer.wrap(self.device, send_fw_packet)
+                if self.profile.supports_resume:
+                    send_fw_packet = self._checkpoint.track(send_fw_packet)
+
+                fw_packets = self._packet.iter_fw_packets(start_index)
+                if self.pipelined:
+                    stats = send_frames_pipelined(fw_packets, send_fw_packet)
+                    logger.info(
+                        "{} - Encoding while sending saved {:.3f} secs".format(
+                            self.device_info.device_name, stats.overlap_saved
+                        )
+                    )
+                else:
+                    stats = send_frames(fw_packets, send_fw_packet)
+                self.last_transfer_stats = stats
+                logger.debug("{} - {}".format(self.device_info.device_name, stats))
+            except BaseException:
+                if self.profile.supports_resume:
+                    self._checkpoint.save()
+                raise
+            else:
+                self._checkpoint.clear()
+            finally:
+                self._packet.close()
+                if pacer is not None:
+                    set_send_packet_interval(self.device, self.send_packet_interval)
+
+        logger.info("{} - Finished.".format(self.device_info.device_name))
+        return start_index > 0
 
     def fw_downloaded_successfully(self) -> bool:
         logger.debug(
             "Checking if device has previously loaded firmware ready to be installed"
         )
-        check_fw_packet = None
 
-        # this read sometimes fails after an update is completed
-        time_sleep_on_error = 0.1
-        for i in range(5):
-            try:
-                check_fw_packet = self.device.get_check_fw_okay()
-                if check_fw_packet:
-                    break
-            except Exception:
-                logger.debug(
-                    f"Couldn't read FW OKAY register from device. Sleeping for {time_sleep_on_error} secs"
-                )
-                sleep(time_sleep_on_error)
+        def read_check_fw_okay():
+            check_fw_packet = self.device.get_check_fw_okay()
+            if not check_fw_packet:
+                raise OSError(errno.EIO, "Empty response")
+            return check_fw_packet
 
-        if check_fw_packet is None:
-            logger.error("Couldn't read FW OKAY register from device")
+        # this read sometimes fails after an update is completed
+        try:
+            check_fw_packet = fw_okay_reads.call(read_check_fw_okay)
+        except Exception as e:
+            logger.error("Couldn't read FW OKAY register from device: {}".format(e))
             return False
         return self._packet.read_fw_download_verified_packet(check_fw_packet)
 
@@ -185,21 +322,6 @@ class FirmwareUpdater(object):
         newer = self.__candidate_fw_version_is_newer_than_current(fw_file)
         return newer
 
-    def __read_hash_from_file(self, filename: str) -> str:
-        """Computes the MD5 hash of the given file.
-
-        :param filename: path to a file
-        :return: MD5 hash
-        """
-        if not path.exists(filename):
-            raise FileNotFoundError("Firmware path doesn't exist.")
-
-        hash = md5()
-        with open(filename, "rb") as f:
-            buff = f.read()
-            hash.update(buff)
-        return hash.hexdigest()
-
     def __prepare_firmware_for_install(self, fw_file: FirmwareFileObject) -> None:
         logger.debug(
             "{} - Preparing firmware for installation".format(
@@ -208,18 +330,11 @@ class FirmwareUpdater(object):
         )
         path_to_fw_file = path.abspath(fw_file.path)
 
-        self.fw_file_hash = self.__read_hash_from_file(path_to_fw_file)
-
-        _, fw_filename = path.split(path_to_fw_file)
-        self.fw_file_location = path.join(
-            self.FW_SAFE_LOCATION, self.device_info.device_name, fw_filename
+        self.fw_file_location, self.fw_file_hash = self._staging_store.stage(
+            path_to_fw_file
         )
-
-        if self.fw_file_location != path_to_fw_file:
-            makedirs(path.dirname(self.fw_file_location), exist_ok=True)
-            copyfile(path_to_fw_file, self.fw_file_location)
-            logger.debug(
-                "{} - File copied to {}".format(
-                    self.device_info.device_name, self.fw_file_location
-                )
+        logger.debug(
+            "{} - {} staged as {}".format(
+                self.device_info.device_name, path_to_fw_file, self.fw_file_location
             )
+        )
@@ -0,0 +1,268 @@
+import logging
+import mmap
+import os
+import struct
+from hashlib import sha256
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from .firmware_image import FirmwareImage
+from .frame_creator import FW_FRAME_OVERHEAD, INITIALISING_FRAME_LENGTH, FrameCreator
+
+logger = logging.getLogger(__name__)
+
+# magic, format version, frame size, total frames, last frame length,
+# image SHA-256, SHA-256 of the encoded frames that follow the header
+_HEADER = struct.Struct(">4sBHHH32s32s")
+_MAGIC = b"PTFC"
+_FORMAT_VERSION = 1
+
+
+def _stat_key(stat_result: os.stat_result) -> Tuple[int, int, int, int]:
+    return (
+        stat_result.st_dev,
+        stat_result.st_ino,
+        stat_result.st_size,
+        stat_result.st_mtime_ns,
+    )
+
+
+class CachedFrames(object):
+    """Memory-mapped, fully encoded frame stream of a firmware image.
+
+    The starting packet and the frames are read-only views into the
+    cache file. Views must not be used after close().
+    """
+
+    def __init__(self, path: str, frame_size: int, total_frames: int, data: mmap.mmap):
+        self.path = path
+        self.frame_size = frame_size
+        self.total_frames = total_frames
+        self._mmap = data
+        self._view = memoryview(data)
+        self.closed = False
+
+        frames_start = _HEADER.size + INITIALISING_FRAME_LENGTH
+        self.starting_packet = self._view[_HEADER.size : frames_start]  # noqa: E203
+        self._frames_start = frames_start
+
+    def frame(self, index: int) -> memoryview:
+        if not 0 <= index < self.total_frames:
+            raise IndexError("Frame index out of range: {}".format(index))
+        start = self._frames_start + index * (self.frame_size + FW_FRAME_OVERHEAD)
+        end = min(start + self.frame_size + FW_FRAME_OVERHEAD, len(self._view))
+        return self._view[start:end]
+
+    def iter_frames(self, start_index: int = 0) -> Iterator[memoryview]:
+        for index in range(start_index, self.total_frames):
+            yield self.frame(index)
+
+    def close(self) -> None:
+        self.closed = True
+        self.starting_packet.release()
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            logger.debug("{} - Frames still in use, deferring unmap".format(self.path))
+
+
+class FrameCache(object):
+    """On-disk cache of encoded frame streams, keyed by image SHA-256.
+
+    Entries are verified against the image digest and against a digest
+    of their own contents before use; anything that doesn't match is
+    discarded and re-encoded. The contents of an entry are only hashed
+    the first time it's used, or when it's written; after that, an entry
+    file with the same device, inode, size and modification time is
+    trusted.
+    """
+
+    DEFAULT_LOCATION = "/var/cache/pt-firmware-updater/frames/"
+    ENTRY_SUFFIX = ".frames"
+    # Stat of the entry files whose contents were verified, shared by
+    # every cache in the process
+    _verified_entries: Dict[str, Tuple[int, int, int, int]] = dict()
+
+    def __init__(self, location: Optional[str] = None) -> None:
+        self.location = location if location is not None else self.DEFAULT_LOCATION
+
+    def entry_path(self, image_digest: str, frame_size: int) -> str:
+        return os.path.join(
+            self.location, "{}-{}{}".format(image_digest, frame_size, self.ENTRY_SUFFIX)
+        )
+
+    def get(self, fw_image: FirmwareImage) -> Optional[CachedFrames]:
+        entry_path = self.entry_path(fw_image.sha256, fw_image.frame_size)
+        try:
+            with open(entry_path, "rb") as f:
+                stat_key = _stat_key(os.fstat(f.fileno()))
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        except OSError as e:
+            logger.debug("Couldn't open cached frames {}: {}".format(entry_path, e))
+            return None
+
+        verify_contents = self._verified_entries.get(entry_path) != stat_key
+        if not self.__entry_is_valid(data, fw_image, verify_contents):
+            logger.warning(
+                "Discarding invalid cached frames for {}".format(fw_image.path)
+            )
+            data.close()
+            self._verified_entries.pop(entry_path, None)
+            self.__remove(entry_path)
+            return None
+        self._verified_entries[entry_path] = stat_key
+
+        return CachedFrames(
+            entry_path, fw_image.frame_size, fw_image.total_frames, data
+        )
+
+    def put(self, fw_image: FirmwareImage) -> Optional[CachedFrames]:
+        """Encodes fw_image and stores it, returning the new entry.
+
+        Returns None if the cache location isn't writable.
+        """
+        starting_packet = FrameCreator.create_initialising_frame(
+            fw_size=fw_image.size,
+            frame_size=fw_image.frame_size,
+            total_frames=fw_image.total_frames,
+            last_frame=fw_image.last_frame_length,
+            fw_checksum=fw_image.checksum,
+        )
+        fw_frames = FrameCreator.create_fw_frames(fw_image.data, fw_image.frame_size)
+        encoded = starting_packet + (fw_frames[0].obj if fw_frames else b"")
+
+        header = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            fw_image.frame_size,
+            fw_image.total_frames,
+            fw_image.last_frame_length,
+            bytes.fromhex(fw_image.sha256),
+            sha256(encoded).digest(),
+        )
+
+        entry_path = self.entry_path(fw_image.sha256, fw_image.frame_size)
+        temp_path = "{}.{}.tmp".format(entry_path, os.getpid())
+        try:
+            os.makedirs(self.location, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(header)
+                f.write(encoded)
+            stat_key = _stat_key(os.stat(temp_path))
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.debug("Couldn't cache frames for {}: {}".format(fw_image.path, e))
+            self.__remove(temp_path)
+            return None
+
+        logger.debug("Cached frames for {} in {}".format(fw_image.path, entry_path))
+        # The frames digest was just computed from the written contents
+        self._verified_entries[entry_path] = stat_key
+        return self.get(fw_image)
+
+    def get_or_put(self, fw_image: FirmwareImage) -> Optional[CachedFrames]:
+        cached_frames = self.get(fw_image)
+        if cached_frames is None:
+            cached_frames = self.put(fw_image)
+        return cached_frames
+
+    def warm(
+        self,
+        bin_files: Iterable[str],
+        frame_size: Union[int, Callable[[str], int]] = 256,
+    ) -> None:
+        """Caches every binary file, then evicts entries for any other image.
+
+        frame_size is either the frame size of every file or a function
+        that returns the frame size of a given file.
+        """
+        expected_entries = set()
+        for bin_file in bin_files:
+            try:
+                file_frame_size = (
+                    frame_size(bin_file) if callable(frame_size) else frame_size
+                )
+                with FirmwareImage(bin_file, file_frame_size) as fw_image:
+                    if fw_image.total_frames == 0:
+                        continue
+                    cached_frames = self.get_or_put(fw_image)
+                    if cached_frames is not None:
+                        cached_frames.close()
+                    expected_entries.add(
+                        os.path.basename(
+                            self.entry_path(fw_image.sha256, fw_image.frame_size)
+                        )
+                    )
+            except OSError as e:
+                logger.warning("Couldn't cache frames for {}: {}".format(bin_file, e))
+        self.prune(expected_entries)
+
+    def prune(self, entries_to_keep: Iterable[str]) -> None:
+        entries_to_keep = set(entries_to_keep)
+        try:
+            with os.scandir(self.location) as it:
+                stale_entries = [
+                    entry.path
+                    for entry in it
+                    if entry.name not in entries_to_keep
+                    and (
+                        entry.name.endswith(self.ENTRY_SUFFIX)
+                        or entry.name.endswith(".tmp")
+                    )
+                ]
+        except FileNotFoundError:
+            return
+
+        for entry_path in stale_entries:
+            logger.debug("Evicting cached frames {}".format(entry_path))
+            self._verified_entries.pop(entry_path, None)
+            self.__remove(entry_path)
+
+    def __entry_is_valid(
+        self, data: mmap.mmap, fw_image: FirmwareImage, verify_contents: bool
+    ) -> bool:
+        expected_length = (
+            _HEADER.size
+            + INITIALISING_FRAME_LENGTH
+            + fw_image.size
+            + fw_image.total_frames * FW_FRAME_OVERHEAD
+        )
+        if len(data) != expected_length:
+            return False
+
+        (
+            magic,
+            format_version,
+            frame_size,
+            total_frames,
+            last_frame_length,
+            image_digest,
+            frames_digest,
+        ) = _HEADER.unpack_from(data)
+
+        if not (
+            magic == _MAGIC
+            and format_version == _FORMAT_VERSION
+            and frame_size == fw_image.frame_size
+            and total_frames == fw_image.total_frames
+            and last_frame_length == fw_image.last_frame_length
+            and image_digest.hex() == fw_image.sha256
+        ):
+            return False
+        if not verify_contents:
+            return True
+
+        view = memoryview(data)
+        try:
+            return sha256(view[_HEADER.size :]).digest() == frames_digest  # noqa: E203
+        finally:
+            view.release()
+
+    @staticmethod
+    def __remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
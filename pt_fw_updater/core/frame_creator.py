@@ -1,31 +1,113 @@
-import binascii
+import struct
+from typing import List
 
-from .crc import CRC16Kermit
+from .crc import BytesLike, crc16_kermit
 
+FRAME_START_BYTE = 0x8A
+FRAME_DIRECTION_BYTE = 0x01
+INITIALISING_FRAME_ID = 0xA1
+FW_FRAME_ID = 0xA2
 
-def get_crc16(frame_data):
-    crc_val = CRC16Kermit().calculate(binascii.unhexlify(frame_data))
-    return crc_val.to_bytes(2, byteorder="little").hex()
+# start byte, frame length, direction, frame id, frame number
+_FW_FRAME_HEADER = struct.Struct(">BHBBH")
+# start byte, frame length, direction, frame id, fw size, frame size,
+# total frames, last frame length, fw checksum, reserved
+_INITIALISING_FRAME = struct.Struct(">BHBBIHHHIH")
+
+CRC_LENGTH = 2
+FW_FRAME_OVERHEAD = _FW_FRAME_HEADER.size + CRC_LENGTH
+INITIALISING_FRAME_LENGTH = _INITIALISING_FRAME.size + CRC_LENGTH
+
+DEFAULT_FRAME_SIZE = 256
+# Frame sizes whose length field in the initialising frame stays valid
+SUPPORTED_FRAME_SIZES = (16, 32, 64, 128, 256)
+
+
+def _initialising_frame_length_field(frame_size: int) -> int:
+    # The bootloader has always been sent 7 + the hex digits of the frame size
+    # read as a decimal number (107 for 256 byte frames); keep it byte-for-byte.
+    return 7 + int("{:04x}".format(frame_size))
 
 
 class FrameCreator(object):
     @staticmethod
     def create_initialising_frame(
-        fw_size, frame_size, total_frames, last_frame, fw_checksum, reserved
-    ):
-        frame_length = str(format(7 + int(frame_size), "02x").zfill(4))
-        prefix = "8A" + frame_length + "01A1"
-        data_section = (
-            fw_size + frame_size + total_frames + last_frame + fw_checksum + reserved
+        fw_size, frame_size, total_frames, last_frame, fw_checksum, reserved=0
+    ) -> bytearray:
+        if frame_size not in SUPPORTED_FRAME_SIZES:
+            raise ValueError("Unsupported frame size: {}".format(frame_size))
+        frame = bytearray(INITIALISING_FRAME_LENGTH)
+        _INITIALISING_FRAME.pack_into(
+            frame,
+            0,
+            FRAME_START_BYTE,
+            _initialising_frame_length_field(frame_size),
+            FRAME_DIRECTION_BYTE,
+            INITIALISING_FRAME_ID,
+            fw_size,
+            frame_size,
+            total_frames,
+            last_frame,
+            fw_checksum,
+            reserved,
+        )
+        frame[-CRC_LENGTH:] = crc16_kermit(memoryview(frame)[:-CRC_LENGTH])
+        return frame
+
+    @staticmethod
+    def create_fw_frame(frame_number: int, frame_data: BytesLike) -> bytearray:
+        frame = bytearray(len(frame_data) + FW_FRAME_OVERHEAD)
+        FrameCreator.encode_fw_frame_into(frame, 0, frame_number, frame_data)
+        return frame
+
+    @staticmethod
+    def encode_fw_frame_into(
+        buffer: bytearray, offset: int, frame_number: int, frame_data: BytesLike
+    ) -> int:
+        """Writes a firmware frame into buffer at offset.
+
+        :return: length of the encoded frame
+        """
+        frame_length = len(frame_data) + FW_FRAME_OVERHEAD
+        _FW_FRAME_HEADER.pack_into(
+            buffer,
+            offset,
+            FRAME_START_BYTE,
+            frame_length,
+            FRAME_DIRECTION_BYTE,
+            FW_FRAME_ID,
+            frame_number,
+        )
+        data_start = offset + _FW_FRAME_HEADER.size
+        crc_start = data_start + len(frame_data)
+        buffer[data_start:crc_start] = frame_data
+        buffer[crc_start : crc_start + CRC_LENGTH] = crc16_kermit(  # noqa: E203
+            memoryview(buffer)[offset:crc_start]
         )
-        crc = get_crc16(prefix + data_section)
-        return list(bytearray.fromhex(prefix + data_section + crc))
+        return frame_length
 
     @staticmethod
-    def create_fw_frame(frame_number, frame_data):
-        frame_length = str(format(9 + len(frame_data), "02x").zfill(4))
-        prefix = "8A" + frame_length + "01A2"
-        hex_string_frame_number = format(frame_number, "04x")
-        data_section = hex_string_frame_number + frame_data.hex()
-        crc = get_crc16(prefix + data_section).zfill(4)
-        return list(bytearray.fromhex(prefix + data_section + crc))
+    def create_fw_frames(data: BytesLike, frame_size: int) -> List[memoryview]:
+        """Encodes a whole firmware image into a single buffer.
+
+        :return: one read-only view per frame, in sending order
+        """
+        data_view = memoryview(data)
+        data_size = len(data_view)
+        total_frames = -(-data_size // frame_size)
+
+        buffer = bytearray(data_size + total_frames * FW_FRAME_OVERHEAD)
+        buffer_view = memoryview(buffer).toreadonly()
+
+        frames = list()
+        offset = 0
+        for frame_number, start in enumerate(range(0, data_size, frame_size), 1):
+            frame_length = FrameCreator.encode_fw_frame_into(
+                buffer,
+                offset,
+                frame_number,
+                data_view[start : start + frame_size],  # noqa: E203
+            )
+            frames.append(buffer_view[offset : offset + frame_length])  # noqa: E203
+            offset += frame_length
+        return frames
@@ -0,0 +1,86 @@
+import logging
+from threading import Event
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HotplugEvents(object):
+    """Wakes up the checker when the attached devices may have changed.
+
+    Subclasses connect notify() to a source of hotplug signals; on its
+    own this class is a stand-in whose notify() is called directly,
+    e.g. by tests.
+    """
+
+    def __init__(self) -> None:
+        self._event = Event()
+
+    def start(self) -> bool:
+        """Starts listening for events, returning False if the source
+        isn't available."""
+        return True
+
+    def stop(self) -> None:
+        pass
+
+    def notify(self, parameters=None) -> None:
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until an event arrives or timeout expires, returning True
+        if there was an event."""
+        received = self._event.wait(timeout)
+        self._event.clear()
+        return received
+
+
+class PTDMHotplugEvents(HotplugEvents):
+    """Peripheral connection changes published by pi-topd.
+
+    pi-topd doesn't publish events for the foundation and expansion
+    plates, which are only found by the checks between events.
+    """
+
+    def __init__(self) -> None:
+        super(PTDMHotplugEvents, self).__init__()
+        self._client = None
+
+    def start(self) -> bool:
+        try:
+            from pitop.common.ptdm import (
+                Message,
+                PTDMRequestClient,
+                PTDMSubscribeClient,
+            )
+        except ImportError as e:
+            logger.warning("Can't listen to pi-topd events: {}".format(e))
+            return False
+
+        # Subscribing succeeds whether or not pi-topd is running, so make
+        # sure it answers first; the request times out after a second
+        try:
+            PTDMRequestClient().send_request(Message.REQ_PING)
+        except Exception as e:
+            logger.warning("pi-topd isn't answering: {}".format(e))
+            return False
+
+        client = PTDMSubscribeClient()
+        client.initialise(
+            {
+                Message.PUB_PERIPHERAL_CONNECTED: self.notify,
+                Message.PUB_PERIPHERAL_DISCONNECTED: self.notify,
+                Message.PUB_PITOPD_READY: self.notify,
+            }
+        )
+        if not client.start_listening():
+            logger.warning("Couldn't connect to pi-topd to receive events")
+            return False
+
+        self._client = client
+        return True
+
+    def stop(self) -> None:
+        if self._client is not None:
+            self._client.stop_listening()
+            self._client = None
@@ -0,0 +1,100 @@
+import errno
+import fcntl
+import logging
+import os
+import struct
+from threading import Lock
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# From linux/i2c-dev.h and linux/i2c.h
+I2C_SLAVE = 0x0703
+I2C_SMBUS = 0x0720
+I2C_SMBUS_WRITE = 0
+I2C_SMBUS_QUICK = 0
+
+DEFAULT_DEVICE_PATH = "/dev/i2c-1"
+
+
+class I2CBus(object):
+    """Probes for devices on an I2C bus through the i2c-dev interface.
+
+    The bus is opened once and reused by every probe. A probe is an SMBus
+    quick write, the same transaction i2cdetect uses: the address is put
+    on the bus and the device is present if it acknowledges it, which
+    takes well under a millisecond on a 100 kHz bus.
+
+    The adapter timeout and retries are left alone: they apply to every
+    user of the adapter, not only to this handle, and a missing device
+    NACKs its address straight away anyway.
+    """
+
+    def __init__(
+        self,
+        device_path: str = DEFAULT_DEVICE_PATH,
+        ioctl: Callable = fcntl.ioctl,
+    ) -> None:
+        self.device_path = device_path
+        self._ioctl = ioctl
+        self._fd: Optional[int] = None
+        self._lock = Lock()
+
+    def open(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.device_path, os.O_RDWR)
+        return self._fd
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def probe(self, address: int) -> bool:
+        """Returns True if a device acknowledges address.
+
+        Raises OSError if the bus itself can't be used.
+        """
+        with self._lock:
+            fd = self.open()
+            try:
+                self._ioctl(fd, I2C_SLAVE, address)
+            except OSError as e:
+                if e.errno == errno.EBUSY:
+                    # Claimed by a kernel driver, so something answers there
+                    return True
+                raise
+
+            request = struct.pack("BBIP", I2C_SMBUS_WRITE, 0, I2C_SMBUS_QUICK, 0)
+            try:
+                self._ioctl(fd, I2C_SMBUS, request)
+            except OSError as e:
+                if e.errno in (errno.ENODEV, errno.EBADF):
+                    # The adapter went away; reopen it on the next probe
+                    os.close(fd)
+                    self._fd = None
+                    raise
+                return False
+            return True
+
+    def __enter__(self) -> "I2CBus":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class FakeI2CBus(object):
+    """Stands in for I2CBus where there is no I2C adapter, e.g. in tests."""
+
+    def __init__(self, addresses: Iterable[int] = ()) -> None:
+        self.addresses = set(addresses)
+        self.probes = 0
+
+    def probe(self, address: int) -> bool:
+        self.probes += 1
+        return address in self.addresses
+
+    def close(self) -> None:
+        pass
@@ -1,6 +1,6 @@
 import logging
 from enum import Enum, auto
-from typing import Dict
+from typing import Dict, Optional, Sequence, Tuple, Union
 
 from pitop.common.common_ids import FirmwareDeviceID
 from pitop.common.common_names import FirmwareDeviceName
@@ -84,16 +84,32 @@ class NotificationManager(object):
         },
     }
 
-    __notification_ids: Dict[FirmwareDeviceID, int] = dict()
+    __notification_ids: Dict[
+        Union[FirmwareDeviceID, Tuple[FirmwareDeviceID, ...]], int
+    ] = dict()
 
     def notify_user(
-        self, update_enum: UpdateStatusEnum, device_id: FirmwareDeviceID
+        self,
+        update_enum: UpdateStatusEnum,
+        device_id: Union[FirmwareDeviceID, Sequence[FirmwareDeviceID]],
+        replace: Optional[Union[FirmwareDeviceID, Sequence[FirmwareDeviceID]]] = None,
     ) -> list:
+        """Shows a notification about one device, or a single notification
+        about several devices.
+
+        The notification takes the place of the last one shown about the
+        same devices, or about the devices in replace if given.
+        """
         if update_enum not in UpdateStatusEnum:
             raise ValueError("{} is not a UpdateStatusEnum".format(update_enum))
 
+        device_id = self.__key(device_id)
+        replace_id = device_id if replace is None else self.__key(replace)
+
         logger.info(
-            "Notifying user. Device: {}; enum: {}".format(device_id.name, update_enum)
+            "Notifying user. Device: {}; enum: {}".format(
+                ", ".join(d.name for d in self.__device_ids(device_id)), update_enum
+            )
         )
 
         notification_output = send_notification(
@@ -102,7 +118,7 @@ class NotificationManager(object):
             icon_name=self.MESSAGE_DATA[update_enum]["icon"],
             timeout=self.MESSAGE_DATA[update_enum]["timeout"],
             actions_manager=self.__get_action_manager(update_enum, device_id),
-            notification_id=self.get_notification_id(device_id),
+            notification_id=self.get_notification_id(replace_id),
             capture_notification_id=update_enum
             not in (
                 UpdateStatusEnum.FAILURE,
@@ -118,17 +134,40 @@ class NotificationManager(object):
             self.set_notification_id(device_id, notification_id)
         return notification_output_list
 
+    @staticmethod
+    def __key(device_id) -> Union[FirmwareDeviceID, Tuple[FirmwareDeviceID, ...]]:
+        if isinstance(device_id, FirmwareDeviceID):
+            return device_id
+        device_id = tuple(device_id)
+        if len(device_id) == 1:
+            return device_id[0]
+        return device_id
+
+    @staticmethod
+    def __device_ids(device_id) -> Tuple[FirmwareDeviceID, ...]:
+        if isinstance(device_id, FirmwareDeviceID):
+            return (device_id,)
+        return device_id
+
     def __get_notification_message(
-        self, update_enum: UpdateStatusEnum, device_id: FirmwareDeviceID
+        self, update_enum: UpdateStatusEnum, device_id
     ) -> str:
-        device_friendly_name = FirmwareDeviceName[device_id.name].value
+        device_ids = self.__device_ids(device_id)
+        names = [FirmwareDeviceName[d.name].value for d in device_ids]
+        device_friendly_name = names[-1]
+        if len(names) > 1:
+            device_friendly_name = "{} and {}".format(", ".join(names[:-1]), names[-1])
 
         if update_enum is UpdateStatusEnum.SUCCESS:
+            if len(names) > 1:
+                return "Your {} have been updated and are ready to use.".format(
+                    device_friendly_name
+                )
             return "Your {} has been updated and is ready to use.".format(
                 device_friendly_name
             )
         elif update_enum is UpdateStatusEnum.SUCCESS_REQUIRES_RESTART:
-            if device_id == FirmwareDeviceID.pt4_hub:
+            if FirmwareDeviceID.pt4_hub in device_ids:
                 return "Reboot your {} to apply changes.".format(device_friendly_name)
             else:
                 return "Disconnect and reconnect your\n{} to apply changes.".format(
@@ -155,8 +194,9 @@ class NotificationManager(object):
             )
 
     def __get_action_manager(
-        self, update_enum: UpdateStatusEnum, device_id: FirmwareDeviceID
+        self, update_enum: UpdateStatusEnum, device_id
     ) -> NotificationActionManager:
+        device_ids = self.__device_ids(device_id)
         action_manager = None
         if len(self.MESSAGE_DATA[update_enum]["actions"]) == 0:  # type: ignore
             return action_manager
@@ -166,7 +206,7 @@ class NotificationManager(object):
             action_enum = action.get("command")
             if action_enum is None:
                 continue
-            if device_id not in action["devices"]:
+            if not any(d in action["devices"] for d in device_ids):
                 continue
 
             if action_enum == ActionEnum.HUB_REBOOT:
@@ -181,11 +221,11 @@ class NotificationManager(object):
             )
         return action_manager
 
-    def get_notification_id(self, device_id: FirmwareDeviceID) -> int:
+    def get_notification_id(self, device_id) -> int:
         id = self.__notification_ids.get(device_id)
         return -1 if not id else id
 
-    def set_notification_id(self, device_id: FirmwareDeviceID, id: str) -> None:
+    def set_notification_id(self, device_id, id: str) -> None:
         try:
             self.__notification_ids[device_id] = int(id)
         except ValueError:
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+from time import sleep
+from typing import Callable, Dict, List, Optional
+
+from pitop.common.firmware_device import FirmwareDevice
+
+logger = logging.getLogger(__name__)
+
+
+def set_send_packet_interval(fw_device: FirmwareDevice, interval: float) -> None:
+    """Changes the delay applied after every I2C transaction of a device.
+
+    FirmwareDevice only takes this interval when it's created.
+    """
+    setter = getattr(fw_device, "set_send_packet_interval", None)
+    if setter is not None:
+        setter(interval)
+    else:
+        fw_device._i2c_device.set_delays(interval, interval)
+
+
+class PacingStore(object):
+    """Persists the learned inter-frame gap of each device type and
+    schematic version."""
+
+    DEFAULT_LOCATION = "/var/lib/pt-firmware-updater/pacing.json"
+
+    def __init__(self, location: Optional[str] = None) -> None:
+        if location is None:
+            location = self.DEFAULT_LOCATION
+        self.location = location
+
+    def load(self) -> Dict[str, float]:
+        try:
+            with open(self.location) as f:
+                data = json.load(f)
+            return {k: float(v) for k, v in data.items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.debug(
+                "Couldn't read pacing data from {}: {}".format(self.location, e)
+            )
+            return dict()
+
+    def get(self, key: str):
+        return self.load().get(key)
+
+    def set(self, key: str, gap: float) -> None:
+        data = self.load()
+        data[key] = gap
+        temp_location = "{}.tmp".format(self.location)
+        try:
+            os.makedirs(os.path.dirname(self.location), exist_ok=True)
+            with open(temp_location, "w") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(temp_location, self.location)
+        except OSError as e:
+            logger.warning(
+                "Couldn't save pacing data to {}: {}".format(self.location, e)
+            )
+
+
+class AdaptivePacer(object):
+    """AIMD controller for the gap between firmware frames.
+
+    The gap shrinks by GAP_DECREASE after every SUCCESS_STREAK frames
+    written without errors and doubles on every write error, in which case
+    the frame is retried. The gap reached by a transfer that the device
+    verified is stored and used as the starting point for the next
+    transfer to the same device type and schematic version; a transfer
+    that fails verification doubles the stored gap instead.
+    """
+
+    INITIAL_GAP = 0.01
+    MIN_GAP = 0.002
+    GAP_DECREASE = 0.001
+    GAP_INCREASE_FACTOR = 2
+    SUCCESS_STREAK = 32
+    MAX_RETRIES = 3
+
+    def __init__(
+        self,
+        device_name: str,
+        schematic_version: int,
+        fixed_interval: float,
+        store: Optional[PacingStore] = None,
+    ) -> None:
+        self.key = "{}-sch{}".format(device_name, schematic_version)
+        self.fixed_interval = fixed_interval
+        # Never slower than a few times the conservative fixed interval
+        self.max_gap = max(fixed_interval, self.MIN_GAP) * 4
+        self.store = store if store is not None else PacingStore()
+
+        learned_gap = self.store.get(self.key)
+        self.start_gap = self.__clamp(
+            learned_gap if learned_gap is not None else self.INITIAL_GAP
+        )
+        self.gap = self.start_gap
+        self.write_errors = 0
+        self.retries = 0
+        self.__streak = 0
+
+    def wrap(
+        self, fw_device: FirmwareDevice, send: Callable[[List[int]], None]
+    ) -> Callable[[List[int]], None]:
+        """Returns a send function that paces and retries writes to
+        fw_device."""
+        applied_gap: List[Optional[float]] = [None]
+
+        def paced_send(packet: List[int]) -> None:
+            attempt = 0
+            while True:
+                if applied_gap[0] != self.gap:
+                    set_send_packet_interval(fw_device, self.gap)
+                    applied_gap[0] = self.gap
+                try:
+                    send(packet)
+                    self.on_success()
+                    return
+                except Exception as e:
+                    self.on_error()
+                    if attempt >= self.MAX_RETRIES:
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    logger.debug(
+                        "{} - Write failed ({}), retrying with {:.4f} secs gap".format(
+                            self.key, e, self.gap
+                        )
+                    )
+                    sleep(self.gap)
+
+        return paced_send
+
+    def on_success(self) -> None:
+        self.__streak += 1
+        if self.__streak >= self.SUCCESS_STREAK:
+            self.__streak = 0
+            self.gap = self.__clamp(self.gap - self.GAP_DECREASE)
+
+    def on_error(self) -> None:
+        self.__streak = 0
+        self.write_errors += 1
+        self.gap = self.__clamp(self.gap * self.GAP_INCREASE_FACTOR)
+
+    def record_result(self, verified: bool) -> None:
+        if verified:
+            learned_gap = self.gap
+            logger.info(
+                "{} - Transfer verified with {:.4f} secs between frames".format(
+                    self.key, learned_gap
+                )
+            )
+        else:
+            learned_gap = self.__clamp(self.start_gap * self.GAP_INCREASE_FACTOR)
+            logger.warning(
+                "{} - Transfer failed verification with {:.4f} secs between frames".format(
+                    self.key, self.gap
+                )
+            )
+        self.store.set(self.key, learned_gap)
+
+    def __clamp(self, gap: float) -> float:
+        return min(self.max_gap, max(self.MIN_GAP, gap))
@@ -1,8 +1,10 @@
-import binascii
-import os
 from enum import Enum
+from typing import Iterator, Optional
 
-from .frame_creator import FrameCreator, get_crc16
+from .crc import BytesLike, crc16_kermit
+from .firmware_image import FirmwareImage
+from .frame_cache import CachedFrames, FrameCache
+from .frame_creator import DEFAULT_FRAME_SIZE, SUPPORTED_FRAME_SIZES, FrameCreator
 
 
 class PacketType(Enum):
@@ -12,14 +14,44 @@ class PacketType(Enum):
 
 
 class PacketManager(object):
-    frame_length = 256
-
-    def __init__(self):
-        self.bin_file = None
+    # Frame numbers and the frame count are 16 bit fields in the protocol
+    MAX_TOTAL_FRAMES = 0xFFFF
+
+    def __init__(
+        self,
+        frame_cache: Optional[FrameCache] = None,
+        frame_length: int = DEFAULT_FRAME_SIZE,
+    ):
+        if frame_length not in SUPPORTED_FRAME_SIZES:
+            raise ValueError("Unsupported frame length: {}".format(frame_length))
+
+        self.frame_length = frame_length
+        self.bin_file: Optional[str] = None
+        self.frame_cache = frame_cache
+        self._fw_image: Optional[FirmwareImage] = None
+        self._owns_fw_image = False
+        self._cached_frames: Optional[CachedFrames] = None
 
     def set_fw_file_to_install(self, bin_file):
+        self._release_fw_image()
         self.bin_file = bin_file
 
+    def set_fw_image(self, fw_image: FirmwareImage):
+        """Uses an already analysed image instead of reading bin_file again."""
+        if fw_image.frame_size != self.frame_length:
+            raise ValueError(
+                "Image frame size {} doesn't match frame length {}".format(
+                    fw_image.frame_size, self.frame_length
+                )
+            )
+        self._release_fw_image()
+        self.bin_file = fw_image.path
+        self._fw_image = fw_image
+
+    def close(self):
+        """Releases the binary file and cached frames being sent."""
+        self._release_fw_image()
+
     def create_packets(self, packet_type):
         if packet_type == PacketType.StartingPacket:
             return self._create_starting_packet()
@@ -27,85 +59,113 @@ class PacketManager(object):
             return self._create_fw_packets()
 
     def read_fw_download_verified_packet(self, packet):
-        hex_of_packet = binascii.hexlify(packet.to_bytes(8, byteorder="big")).decode(
-            "utf-8"
-        )
-        packet_crc_val = PacketManager._validate_and_return_crc_of_received_packet(
-            hex_of_packet
-        )
-        PacketManager._check_first_byte_of_received_packet(hex_of_packet)
-        hex_of_packet = hex_of_packet[10:]
-        data_section = int(hex_of_packet.replace(packet_crc_val, ""))
-        return data_section == 1
+        packet_bytes = packet.to_bytes(8, byteorder="big")
+        PacketManager._validate_crc_of_received_packet(packet_bytes)
+        PacketManager._check_first_byte_of_received_packet(packet_bytes)
+        data_section = packet_bytes[5:-2]
+        return int.from_bytes(data_section, byteorder="big") == 1
+
+    def iter_fw_packets(self, start_index: int = 0) -> Iterator[BytesLike]:
+        """Yields firmware frames one by one, starting at frame start_index
+        (0-based).
+
+        Frames are encoded on demand from views into the memory-mapped
+        binary file, so only one encoded frame is held at a time,
+        regardless of the size of the binary file. If a frame cache is
+        set, frames are served straight from the cached encoding instead.
+        """
+        cached_frames = self._get_cached_frames()
+        if cached_frames is not None:
+            yield from cached_frames.iter_frames(start_index)
+            return
+
+        fw_image = self._get_fw_image()
+        for frame_number, frame_data in enumerate(
+            fw_image.iter_frames(start_index), start_index + 1
+        ):
+            yield FrameCreator.create_fw_frame(frame_number, frame_data)
 
     def _create_starting_packet(self):
-        if self.bin_file is None:
-            raise Exception("No binary file specified")
+        cached_frames = self._get_cached_frames()
+        if cached_frames is not None:
+            return cached_frames.starting_packet
 
-        fw_size = PacketManager._int_to_hex_string(os.path.getsize(self.bin_file), 4)
-        frame_size = PacketManager._int_to_hex_string(self.frame_length, 2)
-        total_frames = PacketManager._int_to_hex_string(len(self._get_frames_list()), 2)
-        last_frame = PacketManager._int_to_hex_string(
-            len(self._get_frames_list()[-1]), 2
-        )
-        fw_checksum = self._get_firmware_checksum()
-        reserved = PacketManager._int_to_hex_string(0, 2)
+        fw_image = self._get_fw_image()
+        self._check_total_frames(fw_image)
         return FrameCreator.create_initialising_frame(
-            fw_size, frame_size, total_frames, last_frame, fw_checksum, reserved
+            fw_size=fw_image.size,
+            frame_size=self.frame_length,
+            total_frames=fw_image.total_frames,
+            last_frame=fw_image.last_frame_length,
+            fw_checksum=fw_image.checksum,
         )
 
     def _create_fw_packets(self):
-        frames_packet_list = []
-        for frameNumber, frameData in enumerate(self._get_frames_list()):
-            frameNumber += 1
-            new_frame = FrameCreator.create_fw_frame(frameNumber, frameData)
-            frames_packet_list.insert(len(frames_packet_list), new_frame)
-        return frames_packet_list
+        cached_frames = self._get_cached_frames()
+        if cached_frames is not None:
+            return list(cached_frames.iter_frames())
+
+        return FrameCreator.create_fw_frames(
+            self._get_fw_image().data, self.frame_length
+        )
 
     @staticmethod
-    def _check_first_byte_of_received_packet(hex_of_packet):
-        if "8a" not in hex_of_packet[:2]:
+    def _check_first_byte_of_received_packet(packet_bytes):
+        if packet_bytes[0] != 0x8A:
             raise ValueError(
-                "First byte (8A) not found in received packet: {}".format(hex_of_packet)
+                "First byte (8A) not found in received packet: {}".format(
+                    packet_bytes.hex()
+                )
             )
 
     @staticmethod
-    def _validate_and_return_crc_of_received_packet(hex_of_packet):
-        received_crc_val = hex_of_packet[-4:]
-        calculated_crc_val = get_crc16(hex_of_packet[:-4])
+    def _validate_crc_of_received_packet(packet_bytes):
+        received_crc_val = packet_bytes[-2:]
+        calculated_crc_val = crc16_kermit(packet_bytes[:-2])
         if received_crc_val != calculated_crc_val:
             raise ValueError(
                 "received CRC value = "
-                + received_crc_val
+                + received_crc_val.hex()
                 + " and calculated CRC value = "
-                + calculated_crc_val
+                + calculated_crc_val.hex()
                 + " are not the same"
             )
-        return received_crc_val
-
-    def _get_firmware_checksum(self):
-        if self.bin_file is None:
-            raise Exception("No binary file specified")
 
-        with open(self.bin_file, "rb") as f:
-            file_data = f.read()
-        checksum_val = b"%02X" % (sum(file_data) & 0xFFFFFFFF)
-        return checksum_val.decode("UTF-8").zfill(8)
-
-    def _get_frames_list(self):
+    def _get_fw_image(self) -> FirmwareImage:
         if self.bin_file is None:
             raise Exception("No binary file specified")
 
-        with open(self.bin_file, "rb") as f:
-            file_data = f.read()
-        file_size = len(file_data)
-        frames_list = [
-            file_data[i : i + self.frame_length]  # noqa
-            for i in range(0, file_size, self.frame_length)
-        ]
-        return frames_list
-
-    @staticmethod
-    def _int_to_hex_string(value, byte_length):
-        byte_format = "{:0" + str(byte_length * 2) + "x}"
-        return byte_format.format(value)
+        if self._fw_image is None or self._fw_image.closed:
+            self._fw_image = FirmwareImage(self.bin_file, self.frame_length)
+            self._owns_fw_image = True
+        return self._fw_image
+
+    def _get_cached_frames(self) -> Optional[CachedFrames]:
+        if self.frame_cache is None:
+            return None
+
+        if self._cached_frames is None or self._cached_frames.closed:
+            fw_image = self._get_fw_image()
+            self._check_total_frames(fw_image)
+            self._cached_frames = self.frame_cache.get_or_put(fw_image)
+        return self._cached_frames
+
+    def _release_fw_image(self):
+        if self._cached_frames is not None:
+            self._cached_frames.close()
+            self._cached_frames = None
+        if self._fw_image is not None and self._owns_fw_image:
+            self._fw_image.close()
+        self._fw_image = None
+        self._owns_fw_image = False
+
+    def _check_total_frames(self, fw_image: FirmwareImage):
+        if fw_image.total_frames == 0:
+            raise ValueError("Binary file {} is empty".format(fw_image.path))
+
+        if fw_image.total_frames > self.MAX_TOTAL_FRAMES:
+            raise ValueError(
+                "Binary file {} needs {} frames; the maximum is {}".format(
+                    fw_image.path, fw_image.total_frames, self.MAX_TOTAL_FRAMES
+                )
+            )
@@ -0,0 +1,36 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler(object):
+    """Decides how long the checker waits between checks.
+
+    The interval starts at min_interval and doubles after every check in
+    which nothing changed, up to max_interval. It drops back to
+    min_interval as soon as a check sees a change or fails, so devices
+    that were just attached or updated are followed up quickly while an
+    idle system is woken up less and less often.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, factor: float = 2):
+        if min_interval <= 0:
+            raise ValueError("Minimum interval must be positive")
+        if factor < 1:
+            raise ValueError("Backoff factor can't be less than 1")
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.factor = factor
+        self.interval = min_interval
+
+    def reset(self) -> None:
+        self.interval = self.min_interval
+
+    def next_interval(self, changed: bool) -> float:
+        """Returns how long to wait after a check, given whether anything
+        changed or went wrong in it."""
+        if changed:
+            self.reset()
+        else:
+            self.interval = min(self.interval * self.factor, self.max_interval)
+        return self.interval
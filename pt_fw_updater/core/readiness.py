@@ -0,0 +1,110 @@
+import logging
+from time import monotonic, sleep
+from typing import Callable, Dict, Optional
+
+from pitop.common.firmware_device import FirmwareDevice
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READY_TIMEOUT = 10.0
+INITIAL_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+
+class ReadyTimes(object):
+    """Time each device type took to answer again after a reset."""
+
+    def __init__(self) -> None:
+        self._times: Dict[str, list] = dict()
+
+    def record(self, device_name: str, seconds: float) -> None:
+        self._times.setdefault(device_name, list()).append(seconds)
+
+    def get(self, device_name: str) -> list:
+        return list(self._times.get(device_name, ()))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns the number of resets and the minimum, mean and maximum
+        time to ready of each device type."""
+        return {
+            device_name: {
+                "count": len(times),
+                "min": min(times),
+                "mean": sum(times) / len(times),
+                "max": max(times),
+            }
+            for device_name, times in self._times.items()
+        }
+
+    def clear(self) -> None:
+        self._times.clear()
+
+
+ready_times = ReadyTimes()
+
+
+def wait_until_ready(
+    fw_device: FirmwareDevice,
+    timeout: float = DEFAULT_READY_TIMEOUT,
+    probe: Optional[Callable[[int], bool]] = None,
+    previous_version: Optional[str] = None,
+    initial_interval: float = INITIAL_POLL_INTERVAL,
+    max_interval: float = MAX_POLL_INTERVAL,
+) -> Optional[float]:
+    """Waits for a device to answer again after it was reset.
+
+    The device answers once probe, if given, finds its address on the
+    bus and its firmware version can be read. Until the MCU acts on the
+    reset, it still answers with the firmware it was running, so when
+    previous_version is given the device is only ready once it reports
+    a different version, or answers after having dropped off the bus.
+
+    It's polled after initial_interval and then with an interval that
+    doubles up to max_interval until timeout seconds have passed since
+    the call.
+
+    Returns the seconds the device took to be ready, or None if it
+    wasn't ready in time.
+    """
+    start = monotonic()
+    interval = initial_interval
+    polls = 0
+    restarted = previous_version is None
+    while True:
+        remaining = timeout - (monotonic() - start)
+        if remaining <= 0:
+            break
+        sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+        polls += 1
+
+        if probe is not None and not probe(fw_device.addr):
+            restarted = True
+            continue
+        try:
+            fw_version = fw_device.get_fw_version()
+        except Exception as e:
+            logger.debug("{} - Not ready yet: {}".format(fw_device.str_name, e))
+            restarted = True
+            continue
+        if not restarted and fw_version == previous_version:
+            logger.debug(
+                "{} - Still running version {}".format(fw_device.str_name, fw_version)
+            )
+            continue
+
+        elapsed = monotonic() - start
+        ready_times.record(fw_device.str_name, elapsed)
+        logger.info(
+            "{} - Ready {:.2f} secs after reset ({} polls)".format(
+                fw_device.str_name, elapsed, polls
+            )
+        )
+        return elapsed
+
+    logger.warning(
+        "{} - Wasn't ready within {} secs of a reset".format(
+            fw_device.str_name, timeout
+        )
+    )
+    return None
@@ -0,0 +1,124 @@
+import logging
+from random import random
+from time import monotonic, sleep
+from typing import Callable, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class RetryStats(object):
+    def __init__(self) -> None:
+        self.calls = 0
+        self.attempts = 0
+        self.failures = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def retries(self) -> int:
+        return self.attempts - self.calls
+
+    def record(self, attempts: int, latency: float, failed: bool) -> None:
+        self.calls += 1
+        self.attempts += attempts
+        self.failures += int(failed)
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def __repr__(self) -> str:
+        return "{} calls, {} retries, {} failures in {:.3f}s (max {:.3f}s)".format(
+            self.calls,
+            self.retries,
+            self.failures,
+            self.latency,
+            self.max_latency,
+        )
+
+
+class RetryPolicy(object):
+    """Retries a call that fails with a transient error.
+
+    The call is attempted up to max_attempts times while it raises one of
+    the retry_on exceptions. The delay before each retry starts at
+    initial_delay and grows by factor up to max_delay; jitter takes off up
+    to that fraction of every delay at random, so that callers failing
+    together don't retry together. No retry is started if its delay would
+    end later than deadline seconds after the first attempt. Once the
+    policy gives up, the last exception is raised again.
+
+    The attempts and time taken by every call are added to stats.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        initial_delay: float = 0.01,
+        max_delay: float = 0.1,
+        factor: float = 2,
+        jitter: float = 0.5,
+        deadline: Optional[float] = 1.0,
+        retry_on: Tuple[Type[BaseException], ...] = (OSError,),
+        clock: Callable[[], float] = monotonic,
+        sleep: Callable[[float], None] = sleep,
+        random: Callable[[], float] = random,
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_on = retry_on
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random
+        self.stats = RetryStats()
+
+    def delay(self, retry: int) -> float:
+        """Returns the delay before the given retry, counting from 0."""
+        delay = min(self.initial_delay * self.factor**retry, self.max_delay)
+        return delay * (1 - self.jitter * self._random())
+
+    def call(self, function: Callable, *args, **kwargs):
+        start = self._clock()
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    result = function(*args, **kwargs)
+                except self.retry_on as e:
+                    if attempts >= self.max_attempts:
+                        raise
+                    delay = self.delay(attempts - 1)
+                    elapsed = self._clock() - start
+                    if self.deadline is not None and elapsed + delay > self.deadline:
+                        raise
+                    logger.debug(
+                        "{} failed ({}), retrying in {:.3f} secs".format(
+                            getattr(function, "__name__", function), e, delay
+                        )
+                    )
+                    self._sleep(delay)
+                    continue
+                self.stats.record(attempts, self._clock() - start, failed=False)
+                return result
+        except BaseException:
+            self.stats.record(attempts, self._clock() - start, failed=True)
+            raise
+
+
+# Reads of device registers over I2C, which fail now and then with a
+# remote I/O error while the MCU is busy
+register_reads = RetryPolicy()
+
+# The FW OKAY read sometimes fails for a while after a download
+# completes, and a false negative means sending the firmware again, so
+# it's retried for longer: at least half a second with any jitter
+fw_okay_reads = RetryPolicy(
+    max_attempts=6, initial_delay=0.1, max_delay=0.2, jitter=0.25, deadline=1.0
+)
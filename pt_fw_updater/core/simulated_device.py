@@ -0,0 +1,274 @@
+import errno
+import logging
+import random
+from time import sleep
+from typing import Iterable, Optional, Set, Tuple, Union
+
+from pitop.common.common_ids import FirmwareDeviceID
+from pitop.common.firmware_device import DeviceInfo, FirmwareDevice
+
+from .crc import crc16_kermit
+from .frame_creator import (
+    _FW_FRAME_HEADER,
+    _INITIALISING_FRAME,
+    CRC_LENGTH,
+    FRAME_DIRECTION_BYTE,
+    FRAME_START_BYTE,
+    FW_FRAME_ID,
+    INITIALISING_FRAME_ID,
+    INITIALISING_FRAME_LENGTH,
+)
+
+logger = logging.getLogger(__name__)
+
+FW_OKAY_FRAME_ID = 0xA3
+
+
+class SimulatedFirmwareDevice(object):
+    """A firmware device that only exists in memory.
+
+    It implements the FirmwareDevice methods used by the updater, so it
+    can replace a real device to run and benchmark the update pipeline
+    off-device. Frames sent to it are parsed like the bootloader does:
+    every frame is checked for its start byte, length and CRC, and once
+    all frames are received the image checksum decides the value of the
+    FW OKAY register. Resetting the device installs a verified image.
+
+    Bus latency is modelled as byte_time seconds per byte plus the send
+    packet interval after every write; the time is either slept or only
+    added to bus_time. Writes fail with a remote I/O error with
+    probability error_rate, or when their 1-based number is in
+    fail_writes, and have a bit flipped on the wire with probability
+    corruption_rate, in which case the device drops them. After a reset,
+    the next stale_reads reads of the firmware version still return the
+    previous version, as if the MCU hadn't acted on the reset yet, and
+    the restart_reads reads after them fail as if it was restarting.
+    """
+
+    def __init__(
+        self,
+        device_id: Union[FirmwareDeviceID, str],
+        fw_version: str = "1.0",
+        schematic_version: int = 1,
+        update_schema: int = 1,
+        is_release_build: bool = True,
+        build_timestamp: int = 0,
+        version_after_update: Optional[str] = None,
+        max_frame_size: Optional[int] = None,
+        keeps_frames_on_restart: bool = False,
+        restart_reads: int = 0,
+        stale_reads: int = 0,
+        byte_time: float = 0.0,
+        send_packet_interval: float = 0.0,
+        realtime: bool = True,
+        error_rate: float = 0.0,
+        corruption_rate: float = 0.0,
+        fail_writes: Iterable[int] = (),
+        seed: Optional[int] = None,
+    ) -> None:
+        if isinstance(device_id, str):
+            device_id = FirmwareDeviceID[device_id]
+
+        self.str_name = device_id.name
+        self.addr = FirmwareDevice.device_info[device_id]["i2c_addr"]
+        self.part_name = FirmwareDevice.device_info[device_id]["part_name"]
+
+        self.fw_version = fw_version
+        self.schematic_version = schematic_version
+        self.update_schema = update_schema
+        self.is_release_build = is_release_build
+        self.build_timestamp = build_timestamp
+        self.version_after_update = version_after_update
+        self.max_frame_size = max_frame_size
+        self.keeps_frames_on_restart = keeps_frames_on_restart
+        self.restart_reads = restart_reads
+        self.stale_reads = stale_reads
+
+        self.byte_time = byte_time
+        self.send_packet_interval = send_packet_interval
+        self.realtime = realtime
+        self.error_rate = error_rate
+        self.corruption_rate = corruption_rate
+        self.fail_writes = set(fail_writes)
+        self._random = random.Random(seed)
+
+        self.bus_time = 0.0
+        self.writes = 0
+        self.write_errors = 0
+        self.dropped_frames = 0
+        self.resets = 0
+        self.__restarting_reads = 0
+        self.__stale_reads = 0
+        self.__previous_version = fw_version
+
+        self.image: Optional[bytearray] = None
+        self.fw_okay = False
+        self.__download: Optional[Tuple[int, int, int, int, int]] = None
+        self.__received_frames: Set[int] = set()
+
+    def get_part_name(self) -> int:
+        return self.part_name
+
+    def get_sch_hardware_version_major(self) -> int:
+        return self.schematic_version
+
+    def get_fw_version(self) -> str:
+        if self.__stale_reads > 0:
+            self.__stale_reads -= 1
+            return self.__previous_version
+        if self.__restarting_reads > 0:
+            self.__restarting_reads -= 1
+            raise OSError(errno.EREMOTEIO, "Remote I/O error")
+        return self.fw_version
+
+    def get_fw_version_major(self) -> int:
+        return int(self.fw_version.split(".")[0])
+
+    def get_fw_version_minor(self) -> int:
+        return int(self.fw_version.split(".")[1])
+
+    def get_fw_version_update_schema(self) -> int:
+        return self.update_schema
+
+    def has_extended_build_info(self) -> bool:
+        return self.build_timestamp != 0
+
+    def get_is_release_build(self) -> bool:
+        return self.is_release_build
+
+    def get_git_commit_hash(self) -> Optional[str]:
+        return None
+
+    def get_ci_build_no(self) -> Optional[int]:
+        return None
+
+    def get_raw_build_timestamp(self) -> int:
+        return self.build_timestamp
+
+    def get_max_frame_size(self) -> Optional[int]:
+        return self.max_frame_size
+
+    def set_send_packet_interval(self, interval: float) -> None:
+        self.send_packet_interval = interval
+
+    def send_packet(self, hardware_reg: int, packet) -> None:
+        self.writes += 1
+        self.__wait(len(packet) + 1)
+
+        if self.writes in self.fail_writes or self._random.random() < self.error_rate:
+            self.write_errors += 1
+            raise OSError(errno.EREMOTEIO, "Remote I/O error")
+
+        packet = bytearray(packet)
+        if packet and self._random.random() < self.corruption_rate:
+            bit = self._random.randrange(len(packet) * 8)
+            packet[bit // 8] ^= 1 << (bit % 8)
+
+        if hardware_reg == DeviceInfo.FW__UPGRADE_START:
+            self.__receive_initialising_frame(packet)
+        elif hardware_reg == DeviceInfo.FW__UPGRADE_PACKET:
+            self.__receive_fw_frame(packet)
+        else:
+            raise OSError(errno.EREMOTEIO, "Remote I/O error")
+
+    def get_check_fw_okay(self) -> int:
+        self.__wait(8)
+        packet = bytearray(
+            [FRAME_START_BYTE, 0x00, 0x08, FRAME_DIRECTION_BYTE, FW_OKAY_FRAME_ID]
+        )
+        packet.append(1 if self.fw_okay else 0)
+        packet += crc16_kermit(packet)
+        return int.from_bytes(packet, byteorder="big")
+
+    def reset(self) -> None:
+        if self.update_schema < 1:
+            return
+
+        self.resets += 1
+        self.__restarting_reads = self.restart_reads
+        self.__stale_reads = self.stale_reads
+        self.__previous_version = self.fw_version
+        if self.fw_okay:
+            self.fw_version = self.version_after_update or self.__next_minor_version()
+            logger.debug(
+                "{} - Simulated device installed version {}".format(
+                    self.str_name, self.fw_version
+                )
+            )
+        self.image = None
+        self.fw_okay = False
+        self.__download = None
+        self.__received_frames = set()
+
+    def __wait(self, packet_length: int) -> None:
+        delay = packet_length * self.byte_time + self.send_packet_interval
+        self.bus_time += delay
+        if self.realtime and delay > 0:
+            sleep(delay)
+
+    def __frame_is_valid(self, packet: bytearray, frame_id: int) -> bool:
+        if len(packet) < _FW_FRAME_HEADER.size + CRC_LENGTH:
+            return False
+        return (
+            packet[0] == FRAME_START_BYTE
+            and packet[3] == FRAME_DIRECTION_BYTE
+            and packet[4] == frame_id
+            and crc16_kermit(packet[:-CRC_LENGTH]) == packet[-CRC_LENGTH:]
+        )
+
+    def __receive_initialising_frame(self, packet: bytearray) -> None:
+        if len(packet) != INITIALISING_FRAME_LENGTH or not self.__frame_is_valid(
+            packet, INITIALISING_FRAME_ID
+        ):
+            logger.debug("{} - Dropped invalid starting packet".format(self.str_name))
+            self.dropped_frames += 1
+            self.__download = None
+            return
+
+        (_, _, _, _, fw_size, frame_size, total_frames, last_frame, checksum, _) = (
+            _INITIALISING_FRAME.unpack_from(packet)
+        )
+        download = (fw_size, frame_size, total_frames, last_frame, checksum)
+        if not (self.keeps_frames_on_restart and download == self.__download):
+            self.image = bytearray(fw_size)
+            self.__received_frames = set()
+        self.__download = download
+        self.fw_okay = False
+
+    def __receive_fw_frame(self, packet: bytearray) -> None:
+        if self.__download is None or self.image is None:
+            self.dropped_frames += 1
+            return
+
+        fw_size, frame_size, total_frames, last_frame, checksum = self.__download
+        if not self.__frame_is_valid(packet, FW_FRAME_ID):
+            self.dropped_frames += 1
+            return
+
+        _, length, _, _, frame_number = _FW_FRAME_HEADER.unpack_from(packet)
+        expected_length = last_frame if frame_number == total_frames else frame_size
+        data = packet[_FW_FRAME_HEADER.size : -CRC_LENGTH]  # noqa: E203
+        if (
+            length != len(packet)
+            or not 1 <= frame_number <= total_frames
+            or len(data) != expected_length
+        ):
+            self.dropped_frames += 1
+            return
+
+        start = (frame_number - 1) * frame_size
+        self.image[start : start + len(data)] = data  # noqa: E203
+        self.__received_frames.add(frame_number)
+
+        if len(self.__received_frames) == total_frames:
+            self.fw_okay = sum(self.image) & 0xFFFFFFFF == checksum
+            logger.debug(
+                "{} - Simulated download complete, FW OKAY = {}".format(
+                    self.str_name, self.fw_okay
+                )
+            )
+
+    def __next_minor_version(self) -> str:
+        return "{}.{}".format(
+            self.get_fw_version_major(), self.get_fw_version_minor() + 1
+        )
@@ -0,0 +1,123 @@
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import stat
+import threading
+from typing import Optional, Tuple
+
+from .digest_cache import DigestCache
+
+logger = logging.getLogger(__name__)
+
+# From linux/fs.h
+FICLONE = 0x40049409
+
+_COPY_CHUNK_SIZE = 64 * 1024
+
+
+class StagingStore(object):
+    """Content-addressed store of firmware files staged for install.
+
+    Each file is kept once, named after its MD5 digest. A file is linked
+    into the store when it's on the same filesystem, cloned when the
+    filesystem supports reflinks and copied otherwise.
+
+    The digest returned for a file always comes from hashing that file,
+    and a stored file is only used once hashing it gives the digest it's
+    named after; digests remembers the digest of every file hashed while
+    it's unchanged, so staging the same file again only takes a stat of
+    the file and of its copy in the store. A linked file shares its inode
+    with the file it was staged from, so rewriting that file changes the
+    stored one too, which is then replaced.
+
+    The store must only be writable by the current user, since whatever
+    is in it gets installed.
+    """
+
+    def __init__(self, location: str, digests: Optional[DigestCache] = None) -> None:
+        self.location = location
+        self.digests = digests if digests is not None else DigestCache()
+
+    def stage(self, source: str) -> Tuple[str, str]:
+        """Puts a file in the store, returning the path of the stored
+        file and its MD5 digest.
+
+        Raises PermissionError if other users can write to the store.
+        """
+        self.__check_location()
+
+        digest = self.digests.digest(source)
+        staged_path = self.path(digest)
+        if self.__stored_file_is_intact(digest):
+            return staged_path, digest
+
+        temp_path = os.path.join(
+            self.location,
+            ".{}.{}.tmp".format(os.getpid(), threading.get_ident()),
+        )
+        try:
+            self.__add(source, temp_path)
+            # Checked again in case the source changed while it was added
+            if self.digests.digest(temp_path) != digest:
+                raise OSError(
+                    errno.EAGAIN, "{} changed while it was staged".format(source)
+                )
+            if os.path.exists(staged_path) and os.path.samefile(temp_path, staged_path):
+                # Renaming a link over another link to the same file does
+                # nothing, and would leave the temporary link behind
+                os.unlink(temp_path)
+            else:
+                os.replace(temp_path, staged_path)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        return staged_path, digest
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.location, "{}.bin".format(digest))
+
+    def __add(self, source: str, destination: str) -> None:
+        """Places source at destination."""
+        try:
+            os.link(source, destination)
+            logger.debug("Linked {} to {}".format(source, destination))
+            return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                logger.debug("Cloned {} to {}".format(source, destination))
+                return
+            except OSError:
+                pass
+
+            logger.debug("Copying {} to {}".format(source, destination))
+            shutil.copyfileobj(src, dst, _COPY_CHUNK_SIZE)
+
+    def __check_location(self) -> None:
+        os.makedirs(self.location, mode=0o755, exist_ok=True)
+        stat_result = os.lstat(self.location)
+        if (
+            not stat.S_ISDIR(stat_result.st_mode)
+            or stat_result.st_uid != os.geteuid()
+            or stat_result.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+        ):
+            raise PermissionError(
+                "Staging location {} must be a directory only writable by "
+                "its owner".format(self.location)
+            )
+
+    def __stored_file_is_intact(self, digest: str) -> bool:
+        """Returns True if the stored file of digest has the contents it's
+        named after."""
+        try:
+            return self.digests.digest(self.path(digest)) == digest
+        except FileNotFoundError:
+            return False
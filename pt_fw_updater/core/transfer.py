@@ -0,0 +1,127 @@
+import logging
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import perf_counter
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_END_OF_FRAMES: Any = object()
+
+
+class TransferStats(object):
+    def __init__(self) -> None:
+        self.frames_sent = 0
+        self.encode_time = 0.0
+        self.send_time = 0.0
+        self.wall_time = 0.0
+
+    @property
+    def overlap_saved(self) -> float:
+        """Seconds saved by encoding while sending, compared to doing one
+        after the other."""
+        return max(0.0, self.encode_time + self.send_time - self.wall_time)
+
+    def __repr__(self) -> str:
+        return (
+            "{} frames in {:.3f}s (encode {:.3f}s, send {:.3f}s, "
+            "overlap saved {:.3f}s)".format(
+                self.frames_sent,
+                self.wall_time,
+                self.encode_time,
+                self.send_time,
+                self.overlap_saved,
+            )
+        )
+
+
+def send_frames(frames: Iterable, send: Callable[[List[int]], None]) -> TransferStats:
+    """Encodes and sends frames one after the other."""
+    stats = TransferStats()
+    start = perf_counter()
+    frame_iterator = iter(frames)
+    while True:
+        encode_start = perf_counter()
+        frame = next(frame_iterator, _END_OF_FRAMES)
+        if frame is _END_OF_FRAMES:
+            break
+        packet = list(frame)
+        send_start = perf_counter()
+        stats.encode_time += send_start - encode_start
+
+        send(packet)
+        stats.send_time += perf_counter() - send_start
+        stats.frames_sent += 1
+
+    stats.wall_time = perf_counter() - start
+    return stats
+
+
+def send_frames_pipelined(
+    frames: Iterable, send: Callable[[List[int]], None], queue_size: int = 16
+) -> TransferStats:
+    """Encodes frames in a producer thread while the caller sends them.
+
+    Frames are sent in the order they are produced. The bounded queue
+    stops the producer from running more than queue_size frames ahead of
+    the device. An exception in either thread stops the transfer and is
+    raised in the caller.
+    """
+    stats = TransferStats()
+    packets: Queue = Queue(maxsize=queue_size)
+    stop = Event()
+    producer_error: List[Optional[BaseException]] = [None]
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                packets.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            frame_iterator = iter(frames)
+            while True:
+                encode_start = perf_counter()
+                frame = next(frame_iterator, _END_OF_FRAMES)
+                if frame is _END_OF_FRAMES:
+                    break
+                packet = list(frame)
+                stats.encode_time += perf_counter() - encode_start
+                if not put(packet):
+                    return
+        except BaseException as e:
+            producer_error[0] = e
+        put(_END_OF_FRAMES)
+
+    start = perf_counter()
+    producer = Thread(target=produce, name="frame-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            packet = packets.get()
+            if packet is _END_OF_FRAMES:
+                break
+            send_start = perf_counter()
+            send(packet)
+            stats.send_time += perf_counter() - send_start
+            stats.frames_sent += 1
+    finally:
+        stop.set()
+        # Unblock the producer if it is waiting on a full queue
+        try:
+            while True:
+                packets.get_nowait()
+        except Empty:
+            pass
+        producer.join()
+
+    stats.wall_time = perf_counter() - start
+    if producer_error[0] is not None:
+        raise producer_error[0]
+
+    logger.debug("Pipelined transfer: {}".format(stats))
+    return stats
@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 import logging
 import os
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 from pitop.common.common_ids import FirmwareDeviceID
 from pitop.common.firmware_device import (
@@ -17,11 +17,13 @@ from .core.firmware_updater import (
     PTUpdatePending,
 )
 from .core.notification_manager import NotificationManager, UpdateStatusEnum
+from .core.pacing import set_send_packet_interval
 from .utils import (
     default_firmware_folder,
     find_latest_firmware,
     i2c_addr_found,
     is_valid_fw_object,
+    scan_bus,
 )
 
 logger = logging.getLogger(__name__)
@@ -58,10 +60,25 @@ def create_firmware_device(device_id: FirmwareDeviceID, interval: float):
         raise
 
 
-def create_fw_updater_object(device_id: FirmwareDeviceID, interval: float):
-    fw_device = create_firmware_device(device_id, interval)
+def create_fw_updater_object(
+    device_id: FirmwareDeviceID,
+    interval: float,
+    pipelined: bool = False,
+    adaptive_interval: bool = False,
+    fw_device: Optional[FirmwareDevice] = None,
+):
+    if fw_device is None:
+        fw_device = create_firmware_device(device_id, interval)
+    else:
+        set_send_packet_interval(fw_device, interval)
     try:
-        return FirmwareUpdater(fw_device)
+        return FirmwareUpdater(
+            fw_device,
+            pipelined=pipelined,
+            adaptive_pacing=adaptive_interval,
+            send_packet_interval=interval,
+            presence_probe=i2c_addr_found,
+        )
     except (ConnectionError, AttributeError, PTInvalidFirmwareDeviceException) as e:
         logger.warning("Exception while checking for update: {}".format(e))
         raise
@@ -70,9 +87,14 @@ def create_fw_updater_object(device_id: FirmwareDeviceID, interval: float):
         raise
 
 
-def stage_update(fw_updater: FirmwareUpdater, path_to_fw_file: str, force: bool):
+def stage_update(
+    fw_updater: FirmwareUpdater,
+    fw_file: Union[str, FirmwareFileObject],
+    force: bool,
+):
     try:
-        fw_file = FirmwareFileObject.from_file(path_to_fw_file)
+        if isinstance(fw_file, str):
+            fw_file = FirmwareFileObject.from_file(fw_file)
         fw_updater.stage_file(fw_file, force)
     except PTInvalidFirmwareFile:
         logger.info("Skipping update: no valid candidate firmware")
@@ -95,20 +117,37 @@ def apply_update(fw_updater: FirmwareUpdater) -> Tuple[bool, bool]:
     return True, False
 
 
-def main(device, force, interval=0.1, path="", notify_user=True) -> None:
-    if path == "":
+def main(
+    device,
+    force,
+    interval=0.1,
+    path="",
+    notify_user=True,
+    pipelined=False,
+    adaptive_interval=False,
+    fw_device: Optional[FirmwareDevice] = None,
+    fw_file: Optional[FirmwareFileObject] = None,
+) -> None:
+    """Stages, confirms and installs a firmware update for a device.
+
+    fw_device and fw_file let a caller that has already opened the device
+    and picked the firmware file, like the checker, reuse them.
+    """
+    if fw_file is not None:
+        path = fw_file.path
+    elif path == "":
         logger.info("No path specified - finding latest...")
 
-        fw_file_object = find_latest_firmware(
+        fw_file = find_latest_firmware(
             default_firmware_folder(device),
-            FirmwareDevice(FirmwareDevice.str_name_to_device_id(device)),
+            fw_device or FirmwareDevice(FirmwareDevice.str_name_to_device_id(device)),
         )
 
-        if not is_valid_fw_object(fw_file_object):
+        if not is_valid_fw_object(fw_file):
             logger.warning("No valid firmware object found")
             return
 
-        path = fw_file_object.path
+        path = fw_file.path
 
     if not os.path.isfile(path):
         raise ValueError(f"{path} isn't a valid file.")
@@ -117,8 +156,10 @@ def main(device, force, interval=0.1, path="", notify_user=True) -> None:
     if not i2c_addr_found(device_addr):
         raise ConnectionError(f"Device {device} not detected")
 
-    fw_updater = create_fw_updater_object(device_id, interval)
-    stage_update(fw_updater, path, force)
+    fw_updater = create_fw_updater_object(
+        device_id, interval, pipelined, adaptive_interval, fw_device
+    )
+    stage_update(fw_updater, fw_file or path, force)
 
     if notify_user:
         notification_manager = NotificationManager()
@@ -135,6 +176,17 @@ def main(device, force, interval=0.1, path="", notify_user=True) -> None:
     with lock_file:
         success, requires_restart = apply_update(fw_updater)
 
+    log_update_result(device_id, success, requires_restart)
+
+    if notify_user:
+        notification_manager.notify_user(
+            get_update_status(success, requires_restart), device_id
+        )
+
+
+def log_update_result(
+    device_id: FirmwareDeviceID, success: bool, requires_restart: bool
+) -> None:
     if success:
         logger.info("Operation finished successfully")
         if requires_restart and device_id == FirmwareDeviceID.pt4_hub:
@@ -150,10 +202,112 @@ def main(device, force, interval=0.1, path="", notify_user=True) -> None:
             "A problem was encountered while attempting to upgrade. Please reboot and try again"
         )
 
+
+def get_update_status(success: bool, requires_restart: bool) -> UpdateStatusEnum:
+    if success and requires_restart:
+        return UpdateStatusEnum.SUCCESS_REQUIRES_RESTART
+    elif success:
+        return UpdateStatusEnum.SUCCESS
+    return UpdateStatusEnum.FAILURE
+
+
+def find_attached_devices(interval: float) -> Dict[FirmwareDeviceID, FirmwareDevice]:
+    """Opens every attached firmware device, probing each address once."""
+    addresses_found = scan_bus()
+    devices: Dict[FirmwareDeviceID, FirmwareDevice] = dict()
+    identified_addresses = set()
+    for device_id, device_info in FirmwareDevice.device_info.items():
+        address = device_info["i2c_addr"]
+        if not addresses_found[address] or address in identified_addresses:
+            continue
+        try:
+            devices[device_id] = create_firmware_device(device_id, interval)
+            identified_addresses.add(address)
+        except Exception:
+            # Already logged; probably the wrong device for the address
+            continue
+    return devices
+
+
+def main_all(
+    force,
+    interval=0.1,
+    notify_user=True,
+    pipelined=False,
+    adaptive_interval=False,
+) -> Dict[FirmwareDeviceID, Tuple[bool, bool]]:
+    """Updates every attached device that has newer firmware available.
+
+    Every update is staged before the user is asked, once, to install
+    them all; they are then installed one after the other. Returns
+    whether each installed update succeeded and requires a restart.
+    """
+    staged: List[Tuple[FirmwareDeviceID, FirmwareUpdater]] = list()
+    for device_id, fw_device in find_attached_devices(interval).items():
+        device = device_id.name
+        try:
+            fw_updater = create_fw_updater_object(
+                device_id, interval, pipelined, adaptive_interval, fw_device
+            )
+            fw_file = find_latest_firmware(
+                default_firmware_folder(device), fw_device, fw_updater.device_info
+            )
+            if not is_valid_fw_object(fw_file):
+                logger.info(f"{device} - No valid firmware object found")
+                continue
+            stage_update(fw_updater, fw_file, force)
+        except (PTInvalidFirmwareFile, PTUpdatePending):
+            continue
+        except Exception as e:
+            logger.warning(f"{device} - Couldn't stage update: {e}")
+            continue
+        staged.append((device_id, fw_updater))
+
+    if not staged:
+        logger.info("No updates to install")
+        return dict()
+
+    device_ids = [device_id for device_id, _ in staged]
+    if notify_user:
+        notification_manager = NotificationManager()
+        user_response = notification_manager.notify_user(
+            UpdateStatusEnum.PROMPT, device_ids
+        )
+        logger.info(f"User response: {user_response}")
+        if "OK" not in user_response:
+            logger.info("User declined upgrade... exiting")
+            return dict()
+        notification_manager.notify_user(UpdateStatusEnum.ONGOING, device_ids)
+
+    results: Dict[FirmwareDeviceID, Tuple[bool, bool]] = dict()
+    for device_id, fw_updater in staged:
+        logger.info(f"Updating {device_id.name}")
+        try:
+            with PTLock(device_id.name):
+                results[device_id] = apply_update(fw_updater)
+        except Exception:
+            results[device_id] = (False, False)
+        log_update_result(device_id, *results[device_id])
+
     if notify_user:
-        status = UpdateStatusEnum.FAILURE
-        if success and requires_restart:
-            status = UpdateStatusEnum.SUCCESS_REQUIRES_RESTART
-        elif success:
-            status = UpdateStatusEnum.SUCCESS
-        notification_manager.notify_user(status, device_id)
+        failed = [
+            device_id for device_id, (success, _) in results.items() if not success
+        ]
+        requires_restart = [
+            device_id
+            for device_id, (success, restart) in results.items()
+            if success and restart
+        ]
+        outcomes = [
+            (UpdateStatusEnum.FAILURE, failed),
+            (UpdateStatusEnum.SUCCESS_REQUIRES_RESTART, requires_restart),
+        ]
+        if not failed and not requires_restart:
+            outcomes = [(UpdateStatusEnum.SUCCESS, device_ids)]
+        # The first outcome takes the place of the ongoing notification
+        replace: Optional[List[FirmwareDeviceID]] = device_ids
+        for status, devices in outcomes:
+            if devices:
+                notification_manager.notify_user(status, devices, replace=replace)
+                replace = None
+    return results
@@ -1,16 +1,23 @@
 import logging
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from pitop.common.command_runner import run_command
 from pitop.common.firmware_device import FirmwareDevice
 
+from .core.checker_session import CheckerSession
+from .core.device_profile import get_device_profile
+from .core.firmware_catalog import FirmwareCatalog
 from .core.firmware_file_object import FirmwareFileObject
+from .core.frame_cache import FrameCache
+from .core.i2c_probe import I2CBus
 
 logger = logging.getLogger(__name__)
 
-processed_firmware_files: Dict[str, List[str]] = dict()
+session = CheckerSession()
+firmware_catalog = FirmwareCatalog()
+i2c_bus = I2CBus()
 
 
 def get_project_root() -> Path:
@@ -21,7 +28,29 @@ def default_firmware_folder(device_str: str) -> str:
     return os.path.abspath(os.path.join(get_project_root(), "bin", device_str))
 
 
+def bundled_firmware_files() -> List[str]:
+    return sorted(str(p) for p in Path(get_project_root(), "bin").glob("*/*.bin"))
+
+
+def warm_frame_cache() -> None:
+    """Pre-encodes the frames of every bundled firmware file."""
+    try:
+        FrameCache().warm(
+            bundled_firmware_files(),
+            frame_size=lambda bin_file: get_device_profile(
+                Path(bin_file).parent.name
+            ).frame_size,
+        )
+    except Exception as e:
+        logger.warning(f"Couldn't warm firmware frame cache: {e}")
+
+
 def i2c_addr_found(device_address: int) -> bool:
+    try:
+        return i2c_bus.probe(device_address)
+    except OSError as e:
+        logger.debug(f"Couldn't probe {hex(device_address)} in-process: {e}")
+
     try:
         run_command(
             f"i2cping {device_address}", timeout=1, check=True, log_errors=False
@@ -32,32 +61,49 @@ def i2c_addr_found(device_address: int) -> bool:
     return is_connected
 
 
+def scan_bus() -> Dict[int, bool]:
+    """Probes each address used by a firmware device once, returning
+    whether something answered there."""
+    addresses = {info.get("i2c_addr") for info in FirmwareDevice.device_info.values()}
+    return {address: i2c_addr_found(address) for address in sorted(addresses)}
+
+
 def find_latest_firmware(
-    path_to_fw_folder: str, firmware_device: FirmwareDevice
+    path_to_fw_folder: str,
+    firmware_device: FirmwareDevice,
+    device_info: Optional[FirmwareFileObject] = None,
 ) -> FirmwareFileObject:
+    """Returns the newest firmware file for a device in a folder, ignoring
+    files already processed for that device.
+
+    device_info avoids reading the device name and schematic version
+    from the device again.
+    """
     if not os.path.exists(path_to_fw_folder):
         raise FileNotFoundError(
             "Firmware path {} doesn't exist.".format(path_to_fw_folder)
         )
 
-    firmware_object = FirmwareFileObject.from_device(firmware_device)
-
-    candidate_latest_fw_object = None
-    with os.scandir(path_to_fw_folder) as i:
-        for entry in i:
-            if already_processed_file(entry.path, firmware_device.str_name):
-                continue
-            fw_object = FirmwareFileObject.from_file(entry.path)
-            if fw_object.verify(
-                firmware_object.device_name, firmware_object.schematic_version
-            ):
-                if candidate_latest_fw_object is None or FirmwareFileObject.is_newer(
-                    candidate_latest_fw_object, fw_object, quiet=True
-                ):
-                    candidate_latest_fw_object = fw_object
-                    logger.debug(
-                        f"Current latest firmware available is version {candidate_latest_fw_object.firmware_version}"
-                    )
+    if device_info is None:
+        device_info = FirmwareFileObject.from_device(firmware_device)
+
+    processed_files = session.device(firmware_device.str_name).processed_files
+    candidate_latest_fw_object = firmware_catalog.latest(
+        path_to_fw_folder,
+        device_info.device_name,
+        device_info.schematic_version,
+        exclude=processed_files,
+    )
+    # Oldest first, so the newest are kept if there are too many to remember
+    processed_files.update(
+        reversed(
+            firmware_catalog.candidates(
+                path_to_fw_folder,
+                device_info.device_name,
+                device_info.schematic_version,
+            )
+        )
+    )
 
     if candidate_latest_fw_object:
         logger.info(
@@ -71,10 +117,8 @@ def is_valid_fw_object(fw_file_object: FirmwareFileObject) -> bool:
 
 
 def already_processed_file(file_path: str, device_str: str) -> bool:
-    processed_files = processed_firmware_files.get(device_str)
-    if processed_files is None:
-        processed_firmware_files[device_str] = list()
-    elif file_path in processed_files:
+    processed_files = session.device(device_str).processed_files
+    if file_path in processed_files:
         return True
-    processed_firmware_files[device_str].append(file_path)
+    processed_files.add(file_path)
     return False
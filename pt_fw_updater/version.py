@@ -1,7 +1,9 @@
-from pkg_resources import get_distribution
+from importlib.metadata import version
+
+from .constants import DISTRIBUTION_NAME
 
 __version__ = "N/A"
 try:
-    __version__ = get_distribution("pt_fw_updater").version
+    __version__ = version(DISTRIBUTION_NAME)
 except Exception:
     pass
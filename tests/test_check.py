@@ -0,0 +1,495 @@
+import gc
+import sys
+import tracemalloc
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import Dict, List
+from unittest import TestCase
+from unittest.mock import ANY, MagicMock, patch
+
+from pitop.common.common_ids import FirmwareDeviceID
+from pitop.common.firmware_device import (
+    FirmwareDevice,
+    PTInvalidFirmwareDeviceException,
+)
+
+from pt_fw_updater import check, update, utils
+from pt_fw_updater.constants import IN_PROCESS_UPDATE, PROCESS_UPDATE
+from pt_fw_updater.core import hotplug
+from pt_fw_updater.core.checker_session import CheckerSession
+from pt_fw_updater.core.hotplug import HotplugEvents, PTDMHotplugEvents
+
+
+class StopChecking(Exception):
+    pass
+
+
+class UnavailableEvents(HotplugEvents):
+    def start(self):
+        return False
+
+
+class CheckMainTestCase(TestCase):
+    def setUp(self):
+        self.check_times = list()
+        self.checks_before_stop = 3
+        # Whether each check reports a change; later checks report none
+        self.changes = list()
+
+        def check_devices(force):
+            self.check_times.append(perf_counter())
+            if len(self.check_times) >= self.checks_before_stop:
+                raise StopChecking()
+            return self.changes.pop(0) if self.changes else False
+
+        patchers = [
+            patch.object(check, "check_devices", side_effect=check_devices),
+            patch.object(check, "warm_frame_cache"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_force_checks_once(self):
+        check.main(force=True, loop_time=1)
+        self.assertEqual(len(self.check_times), 1)
+
+    @patch.object(check, "sleep")
+    def test_polls_without_events(self, sleep_mock):
+        self.changes = [True, True]
+        with self.assertRaises(StopChecking):
+            check.main(loop_time=2)
+        self.assertEqual(len(self.check_times), 3)
+        sleep_mock.assert_called_with(2)
+
+    @patch.object(check, "sleep")
+    def test_backs_off_while_nothing_changes(self, sleep_mock):
+        self.checks_before_stop = 8
+        with self.assertRaises(StopChecking):
+            check.main(loop_time=3, max_loop_time=30)
+        intervals = [c.args[0] for c in sleep_mock.call_args_list]
+        self.assertEqual(intervals, [6, 12, 24, 30, 30, 30, 30])
+        self.assertEqual(check.poll_scheduler.interval, 30)
+
+    @patch.object(check, "sleep")
+    def test_polls_quickly_after_change(self, sleep_mock):
+        self.checks_before_stop = 6
+        self.changes = [False, False, False, True]
+        with self.assertRaises(StopChecking):
+            check.main(loop_time=3, max_loop_time=30)
+        intervals = [c.args[0] for c in sleep_mock.call_args_list]
+        self.assertEqual(intervals, [6, 12, 24, 3, 6])
+
+    @patch.object(check, "sleep")
+    def test_polls_when_events_unavailable(self, sleep_mock):
+        self.changes = [True, True]
+        events = UnavailableEvents()
+        with self.assertRaises(StopChecking):
+            check.main(loop_time=2, events=events)
+        sleep_mock.assert_called_with(2)
+
+    @patch.object(check, "HOTPLUG_FALLBACK_LOOP_TIME", 60)
+    def test_checks_straight_after_event(self):
+        self.checks_before_stop = 2
+        events = HotplugEvents()
+        start = perf_counter()
+
+        def notify():
+            sleep(0.05)
+            events.notify([1])
+
+        Thread(target=notify, daemon=True).start()
+        with self.assertRaises(StopChecking):
+            check.main(loop_time=60, events=events)
+        self.assertLess(self.check_times[1] - start, 5)
+
+    @patch.object(check, "HOTPLUG_FALLBACK_LOOP_TIME", 60)
+    def test_checks_again_shortly_after_event(self):
+        self.checks_before_stop = 4
+        events = HotplugEvents()
+        events.notify()
+        with patch.object(events, "wait", wraps=events.wait) as wait:
+            with self.assertRaises(StopChecking):
+                check.main(loop_time=0.01, events=events)
+        timeouts = [c.args[0] for c in wait.call_args_list]
+        self.assertEqual(timeouts, [0.02, 0.01, 0.02])
+
+    @patch.object(check, "HOTPLUG_FALLBACK_LOOP_TIME", 0.04)
+    def test_backs_off_to_fallback_without_events(self):
+        self.checks_before_stop = 5
+        events = HotplugEvents()
+        with patch.object(events, "wait", wraps=events.wait) as wait:
+            with self.assertRaises(StopChecking):
+                check.main(loop_time=0.01, events=events)
+        timeouts = [c.args[0] for c in wait.call_args_list]
+        self.assertEqual(timeouts, [0.02, 0.04, 0.04, 0.04])
+
+    def test_stops_events_on_exit(self):
+        events = HotplugEvents()
+        with patch.object(events, "stop") as stop:
+            check.main(force=True, events=events)
+        stop.assert_called_once()
+
+
+class HotplugEventsTestCase(TestCase):
+    def test_wait_times_out_without_event(self):
+        self.assertFalse(HotplugEvents().wait(0.01))
+
+    def test_wait_consumes_event(self):
+        events = HotplugEvents()
+        events.notify()
+        events.notify()
+        self.assertTrue(events.wait(0))
+        self.assertFalse(events.wait(0))
+
+
+class PTDMHotplugEventsTestCase(TestCase):
+    def setUp(self):
+        # pi-topd's clients, without a pi-topd to talk to
+        self.ptdm = MagicMock()
+        patcher = patch.dict(sys.modules, {"pitop.common.ptdm": self.ptdm})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unavailable_when_pi_topd_does_not_answer(self):
+        request_client = self.ptdm.PTDMRequestClient.return_value
+        request_client.send_request.side_effect = Exception("timed out")
+        with self.assertLogs(hotplug.logger, "WARNING"):
+            self.assertFalse(PTDMHotplugEvents().start())
+        self.ptdm.PTDMSubscribeClient.assert_not_called()
+
+    def test_listens_once_pi_topd_answers(self):
+        events = PTDMHotplugEvents()
+        self.assertTrue(events.start())
+        self.ptdm.PTDMRequestClient.return_value.send_request.assert_called_once_with(
+            self.ptdm.Message.REQ_PING
+        )
+        subscribe_client = self.ptdm.PTDMSubscribeClient.return_value
+        subscribe_client.start_listening.assert_called_once()
+
+        events.stop()
+        subscribe_client.stop_listening.assert_called_once()
+
+
+class FakeFirmwareDevice:
+    """Identifies itself like FirmwareDevice, with connected_part_names
+    mapping each address to the part name that answers there."""
+
+    device_info = FirmwareDevice.device_info
+    connected_part_names: Dict[int, int] = dict()
+    created: List[str] = list()
+
+    def __init__(self, id):
+        self.str_name = id.name
+        self.addr = self.device_info[id]["i2c_addr"]
+        self.created.append(id.name)
+        part_name = self.device_info[id]["part_name"]
+        if self.connected_part_names.get(self.addr) != part_name:
+            raise PTInvalidFirmwareDeviceException("Part name provided does not match")
+
+
+class UnlockedLock:
+    def __init__(self, name):
+        pass
+
+    def is_locked(self):
+        return False
+
+
+class FakeDevicesTestCase(TestCase):
+    def setUp(self):
+        FakeFirmwareDevice.connected_part_names = dict()
+        FakeFirmwareDevice.created = list()
+        self.probes = list()
+
+        def i2c_addr_found(address):
+            self.probes.append(address)
+            return address in FakeFirmwareDevice.connected_part_names
+
+        # Plain functions rather than mocks, which remember every call
+
+        patchers = [
+            patch.object(check, "FirmwareDevice", FakeFirmwareDevice),
+            patch.object(utils, "i2c_addr_found", i2c_addr_found),
+            patch.object(check, "PTLock", UnlockedLock),
+            patch.object(check.FirmwareFileObject, "from_device", lambda _: None),
+            patch.object(check, "find_latest_firmware", lambda *_: None),
+            patch.object(check, "session", CheckerSession()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def connect(self, device_id):
+        info = FirmwareDevice.device_info[device_id]
+        FakeFirmwareDevice.connected_part_names[info["i2c_addr"]] = info["part_name"]
+
+
+class CheckDevicesTestCase(FakeDevicesTestCase):
+    def test_probes_each_address_once(self):
+        check.check_devices()
+        self.assertEqual(sorted(self.probes), [0x04, 0x11])
+        self.assertEqual(check.session.last_bus_scan, {0x04: False, 0x11: False})
+
+    def test_identifies_device_at_shared_address_once(self):
+        self.connect(FirmwareDeviceID.pt4_expansion_plate)
+        with self.assertLogs(check.logger, "DEBUG") as logs:
+            check.check_devices()
+            check.check_devices()
+            check.check_devices()
+        self.assertEqual(
+            FakeFirmwareDevice.created,
+            ["pt4_foundation_plate", "pt4_expansion_plate"],
+        )
+        self.assertEqual(
+            len([m for m in logs.output if "does not match" in m]),
+            1,
+        )
+        self.assertEqual(
+            check.session.identified_devices, {0x04: "pt4_expansion_plate"}
+        )
+
+    def test_identifies_again_after_swapping_devices(self):
+        self.connect(FirmwareDeviceID.pt4_foundation_plate)
+        check.check_devices()
+        FakeFirmwareDevice.connected_part_names.clear()
+        check.check_devices()
+        self.assertEqual(check.session.identified_devices, dict())
+
+        self.connect(FirmwareDeviceID.pt4_expansion_plate)
+        check.check_devices()
+        self.assertEqual(
+            check.session.identified_devices, {0x04: "pt4_expansion_plate"}
+        )
+        self.assertNotIn("pt4_foundation_plate", check.session)
+
+    def test_reports_changes(self):
+        self.assertTrue(check.check_devices())
+        self.assertFalse(check.check_devices())
+
+        self.connect(FirmwareDeviceID.pt4_hub)
+        self.assertTrue(check.check_devices())
+        self.assertFalse(check.check_devices())
+
+    def test_reports_update(self):
+        self.connect(FirmwareDeviceID.pt4_hub)
+        check.check_devices()
+        with patch.object(check, "check_and_update", return_value=True):
+            self.assertTrue(check.check_devices())
+
+    def test_reports_failed_check(self):
+        self.connect(FirmwareDeviceID.pt4_hub)
+        check.check_devices()
+        with patch.object(check, "check_and_update", side_effect=OSError("bus")):
+            self.assertTrue(check.check_devices())
+
+    def test_forgets_notified_device_on_disconnect(self):
+        self.connect(FirmwareDeviceID.pt4_hub)
+        check.check_devices()
+        check.session.device("pt4_hub").notified = True
+        self.assertTrue(check.already_notified_this_session("pt4_hub"))
+
+        FakeFirmwareDevice.connected_part_names.clear()
+        check.check_devices()
+        self.assertFalse(check.already_notified_this_session("pt4_hub"))
+        self.assertEqual(len(check.session), 0)
+
+    def test_memory_stays_flat_across_attach_detach_cycles(self):
+        plates = (
+            FirmwareDeviceID.pt4_foundation_plate,
+            FirmwareDeviceID.pt4_expansion_plate,
+        )
+
+        def cycle(i):
+            self.connect(plates[i % 2])
+            self.connect(FirmwareDeviceID.pt4_hub)
+            check.check_devices()
+            check.session.device("pt4_hub").processed_files.update(
+                f"pt4_hub-v{i}.0-sch1-release.bin" for _ in range(4)
+            )
+            FakeFirmwareDevice.connected_part_names.clear()
+            check.check_devices()
+            FakeFirmwareDevice.created.clear()
+            self.probes.clear()
+
+        with patch.object(check.logger, "disabled", True):
+            for i in range(100):
+                cycle(i)
+            gc.collect()
+            tracemalloc.start()
+            try:
+                before, _ = tracemalloc.get_traced_memory()
+                for i in range(5000):
+                    cycle(i)
+                gc.collect()
+                after, _ = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual(len(check.session), 0)
+        self.assertLess(after - before, 16 * 1024)
+
+
+class UpdateModeTestCase(FakeDevicesTestCase):
+    def setUp(self):
+        super(UpdateModeTestCase, self).setUp()
+        self.fw_file = MagicMock(path="/fw/pt4_hub-v5.6-sch10-release.bin", error=None)
+        patchers = [
+            patch.object(check, "find_latest_firmware", lambda *_: self.fw_file),
+            patch.object(check, "warm_frame_cache"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.connect(FirmwareDeviceID.pt4_hub)
+
+    def test_updates_in_process_with_cached_device(self):
+        with patch.object(update, "main") as update_main:
+            check.main(force=True, mode=IN_PROCESS_UPDATE)
+
+        # Forcing the checker doesn't skip verifying the firmware file
+        update_main.assert_called_once_with(
+            "pt4_hub",
+            False,
+            notify_user=False,
+            fw_device=ANY,
+            fw_file=self.fw_file,
+        )
+        fw_device = update_main.call_args.kwargs["fw_device"]
+        self.assertIsInstance(fw_device, FakeFirmwareDevice)
+        self.assertIs(check.session.get("pt4_hub").fw_device, fw_device)
+        self.assertTrue(check.already_notified_this_session("pt4_hub"))
+        self.assertFalse(check.session.is_updating("pt4_hub"))
+
+    def test_keeps_device_while_updating(self):
+        started = Event()
+        finish = Event()
+
+        def update_main(*args, **kwargs):
+            started.set()
+            finish.wait(5)
+
+        with patch.object(update, "main", update_main):
+            check.update_mode = IN_PROCESS_UPDATE
+            self.addCleanup(setattr, check, "update_mode", IN_PROCESS_UPDATE)
+            check.check_devices()
+            self.assertTrue(started.wait(5))
+
+            # The device restarts at the end of the update
+            FakeFirmwareDevice.connected_part_names.clear()
+            check.check_devices()
+            self.assertTrue(check.session.is_updating("pt4_hub"))
+
+            finish.set()
+            self.assertTrue(check.wait_for_update())
+            check.update_executor.shutdown(wait=True)
+            check.update_executor = None
+
+        check.check_devices()
+        self.assertNotIn("pt4_hub", check.session)
+
+    def test_bus_is_left_alone_while_updating(self):
+        started = Event()
+        finish = Event()
+
+        def update_main(*args, **kwargs):
+            started.set()
+            finish.wait(5)
+
+        with patch.object(update, "main", update_main):
+            check.update_mode = IN_PROCESS_UPDATE
+            self.addCleanup(setattr, check, "update_mode", IN_PROCESS_UPDATE)
+            self.assertTrue(check.check_devices())
+            self.assertTrue(started.wait(5))
+
+            probes = len(self.probes)
+            self.assertFalse(check.check_devices())
+            self.assertEqual(len(self.probes), probes)
+
+            finish.set()
+            self.assertTrue(check.wait_for_update())
+            self.assertFalse(check.wait_for_update())
+            check.update_executor.shutdown(wait=True)
+            check.update_executor = None
+
+        check.check_devices()
+        self.assertGreater(len(self.probes), probes)
+
+    def test_updates_one_device_at_a_time(self):
+        self.connect(FirmwareDeviceID.pt4_foundation_plate)
+        updating = list()
+        finish = Event()
+
+        def update_main(device_str, *args, **kwargs):
+            updating.append(device_str)
+            finish.wait(5)
+
+        with patch.object(update, "main", update_main):
+            check.update_mode = IN_PROCESS_UPDATE
+            self.addCleanup(setattr, check, "update_mode", IN_PROCESS_UPDATE)
+            self.assertTrue(check.check_devices())
+            # The plate isn't touched while the hub is being updated
+            self.assertEqual(FakeFirmwareDevice.created, ["pt4_hub"])
+            self.assertFalse(check.session.is_updating("pt4_foundation_plate"))
+
+            finish.set()
+            self.assertTrue(check.wait_for_update())
+            self.assertTrue(check.check_devices())
+            self.assertTrue(check.wait_for_update())
+            check.update_executor.shutdown(wait=True)
+            check.update_executor = None
+
+        self.assertEqual(updating, ["pt4_hub", "pt4_foundation_plate"])
+
+    def test_force_updates_every_device(self):
+        self.connect(FirmwareDeviceID.pt4_foundation_plate)
+        with patch.object(update, "main") as update_main:
+            check.main(force=True, mode=IN_PROCESS_UPDATE)
+        self.assertEqual(
+            [call.args[0] for call in update_main.call_args_list],
+            ["pt4_hub", "pt4_foundation_plate"],
+        )
+
+    def test_main_loop_waits_for_update(self):
+        class StopLoop(Exception):
+            pass
+
+        finished = Event()
+
+        def update_main(*args, **kwargs):
+            sleep(0.05)
+            finished.set()
+
+        def wait_for_next_check(timeout, events):
+            self.assertTrue(finished.is_set())
+            self.assertFalse(check.update_running())
+            # Checks again soon after the update, once the device restarts
+            self.assertEqual(timeout, 2)
+            raise StopLoop()
+
+        with patch.object(update, "main", update_main), patch.object(
+            check, "wait_for_next_check", wait_for_next_check
+        ):
+            with self.assertRaises(StopLoop):
+                check.main(loop_time=2, mode=IN_PROCESS_UPDATE)
+        self.assertIsNone(check.update_executor)
+
+    def test_update_errors_are_logged(self):
+        with patch.object(update, "main", side_effect=ConnectionError("gone")):
+            with self.assertLogs(check.logger, "WARNING") as logs:
+                check.main(force=True, mode=IN_PROCESS_UPDATE)
+        self.assertIn("gone", logs.output[0])
+        self.assertFalse(check.session.is_updating("pt4_hub"))
+
+    def test_updates_in_new_process(self):
+        with patch.object(check, "run_command") as run_command:
+            with patch.object(update, "main") as update_main:
+                check.main(mode=PROCESS_UPDATE, force=True)
+        update_main.assert_not_called()
+        command = run_command.call_args.args[0]
+        self.assertIn("--path /fw/pt4_hub-v5.6-sch10-release.bin", command)
+        self.assertTrue(check.already_notified_this_session("pt4_hub"))
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            check.main(force=True, mode="thread")
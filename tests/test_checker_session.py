@@ -0,0 +1,75 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from pt_fw_updater.core.checker_session import CheckerSession, ProcessedFiles
+
+
+class ProcessedFilesTestCase(TestCase):
+    def test_forgets_oldest_paths_when_full(self):
+        processed_files = ProcessedFiles(max_size=3)
+        processed_files.update(["a", "b", "c", "d"])
+        self.assertEqual(list(processed_files), ["b", "c", "d"])
+        self.assertNotIn("a", processed_files)
+
+    def test_adding_again_makes_path_newest(self):
+        processed_files = ProcessedFiles(max_size=3)
+        processed_files.update(["a", "b", "c", "a", "d"])
+        self.assertEqual(list(processed_files), ["c", "a", "d"])
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            ProcessedFiles(max_size=0)
+
+
+class CheckerSessionTestCase(TestCase):
+    def test_evict_releases_device(self):
+        session = CheckerSession()
+        fw_device = MagicMock()
+        device_session = session.device("pt4_hub")
+        device_session.fw_device = fw_device
+        device_session.notified = True
+        session.identified_devices[0x11] = "pt4_hub"
+
+        session.evict("pt4_hub")
+
+        fw_device._i2c_device.disconnect.assert_called_once()
+        self.assertNotIn("pt4_hub", session)
+        self.assertFalse(session.is_notified("pt4_hub"))
+        self.assertEqual(session.identified_devices, dict())
+
+    def test_evict_ignores_disconnect_errors(self):
+        session = CheckerSession()
+        fw_device = MagicMock()
+        fw_device._i2c_device.disconnect.side_effect = OSError("gone")
+        session.device("pt4_hub").fw_device = fw_device
+        session.evict("pt4_hub")
+        self.assertEqual(len(session), 0)
+
+    def test_evict_unknown_device(self):
+        CheckerSession().evict("pt4_hub")
+
+    def test_bounded_number_of_devices(self):
+        session = CheckerSession(max_devices=2)
+        first = MagicMock()
+        session.device("first").fw_device = first
+        session.device("second")
+        session.device("third")
+        self.assertEqual(len(session), 2)
+        self.assertNotIn("first", session)
+        first._i2c_device.disconnect.assert_called_once()
+
+    def test_processed_files_are_bounded(self):
+        session = CheckerSession(max_processed_files=10)
+        processed_files = session.device("pt4_hub").processed_files
+        processed_files.update(str(i) for i in range(100))
+        self.assertEqual(len(processed_files), 10)
+
+    def test_clear(self):
+        session = CheckerSession()
+        session.device("pt4_hub")
+        session.identified_devices[0x11] = "pt4_hub"
+        session.last_bus_scan = {0x11: True}
+        session.clear()
+        self.assertEqual(len(session), 0)
+        self.assertEqual(session.identified_devices, dict())
+        self.assertEqual(session.last_bus_scan, dict())
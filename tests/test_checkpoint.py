@@ -0,0 +1,150 @@
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater.core.checkpoint import TransferCheckpoint
+from pt_fw_updater.core.device_profile import DEVICE_PROFILES
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.firmware_image import FirmwareImage
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from tests.test_readiness import FakeClockTestCase
+from tests.test_simulated_device import FOUNDATION_PLATE_FILE, create_device
+from tests.utils import isolate_firmware_updater
+
+
+class FakeDevice:
+    def __init__(self, fail_at=None):
+        self.sent = list()
+        self.fail_at = fail_at
+
+    def send(self, packet):
+        if len(self.sent) == self.fail_at:
+            raise OSError("Remote I/O error")
+        self.sent.append(packet)
+
+
+class TransferCheckpointTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def create_checkpoint(self):
+        return TransferCheckpoint("pt4_hub", self.folder)
+
+    def interrupted_transfer(self, fail_at, total_frames=300):
+        checkpoint = self.create_checkpoint()
+        checkpoint.begin("abcd", 256, total_frames, "5.3")
+        send = checkpoint.track(FakeDevice(fail_at).send)
+        try:
+            for i in range(total_frames):
+                send([i])
+        except OSError:
+            checkpoint.save()
+        return checkpoint
+
+    def test_resumes_from_last_acknowledged_frame(self):
+        self.interrupted_transfer(fail_at=200)
+        resume_index = self.create_checkpoint().resume_index("abcd", 256, 300, "5.3")
+        self.assertEqual(resume_index, 200 - TransferCheckpoint.REWIND_FRAMES)
+
+    def test_progress_is_saved_periodically(self):
+        checkpoint = self.create_checkpoint()
+        checkpoint.begin("abcd", 256, 300, "5.3")
+        send = checkpoint.track(FakeDevice().send)
+        for i in range(TransferCheckpoint.SAVE_EVERY + 10):
+            send([i])
+
+        # Not saved when the transfer stops, as if the process was killed
+        resume_index = self.create_checkpoint().resume_index("abcd", 256, 300, "5.3")
+        self.assertEqual(
+            resume_index,
+            TransferCheckpoint.SAVE_EVERY - TransferCheckpoint.REWIND_FRAMES,
+        )
+
+    def test_resumed_transfer_keeps_counting_from_start_index(self):
+        checkpoint = self.create_checkpoint()
+        checkpoint.begin("abcd", 256, 300, "5.3", start_index=150)
+        checkpoint.track(FakeDevice().send)([0])
+        checkpoint.save()
+        self.assertEqual(checkpoint.load()["acknowledged_frames"], 151)
+
+    def test_restarts_cleanly_when_checkpoint_does_not_match(self):
+        mismatches = [
+            ("other", 256, 300, "5.3"),
+            ("abcd", 128, 300, "5.3"),
+            ("abcd", 256, 301, "5.3"),
+            # Device firmware changed since the transfer was interrupted
+            ("abcd", 256, 300, "5.4"),
+        ]
+        for args in mismatches:
+            self.interrupted_transfer(fail_at=200)
+            self.assertEqual(self.create_checkpoint().resume_index(*args), 0)
+            self.assertFalse(path.exists(self.create_checkpoint().path))
+
+    def test_corrupt_checkpoint_is_ignored(self):
+        checkpoint = self.create_checkpoint()
+        with open(checkpoint.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(checkpoint.resume_index("abcd", 256, 300, "5.3"), 0)
+
+    def test_clear_removes_checkpoint(self):
+        checkpoint = self.interrupted_transfer(fail_at=200)
+        checkpoint.clear()
+        self.assertIsNone(checkpoint.load())
+        self.assertEqual(checkpoint.resume_index("abcd", 256, 300, "5.3"), 0)
+
+
+class ResumeTransferTestCase(FakeClockTestCase):
+    def setUp(self):
+        super(ResumeTransferTestCase, self).setUp()
+        isolate_firmware_updater(self)
+        # No bootloader is known to keep the frames it wrote when a
+        # transfer restarts, so resuming is off for every device
+        patcher = patch.object(
+            DEVICE_PROFILES["pt4_foundation_plate"], "supports_resume", True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_fw_updater(self, device):
+        fw_updater = FirmwareUpdater(device, send_packet_interval=0)
+        fw_updater.stage_file(FirmwareFileObject.from_file(FOUNDATION_PLATE_FILE))
+        return fw_updater
+
+    def interrupt_transfer(self, device):
+        with self.assertRaises(OSError):
+            self.create_fw_updater(device).install_updates()
+
+    def test_resumes_interrupted_transfer(self):
+        # The starting packet is the first write, so the 20th frame fails
+        device = create_device(keeps_frames_on_restart=True, fail_writes=[21])
+        self.interrupt_transfer(device)
+
+        fw_updater = self.create_fw_updater(device)
+        self.assertEqual(fw_updater.install_updates(), (True, False))
+        self.assertEqual(device.fw_version, "6.5")
+
+        with FirmwareImage(FOUNDATION_PLATE_FILE, fw_updater._packet.frame_length) as f:
+            total_frames = f.total_frames
+        # Sent again from the frame before the one that failed
+        start_index = 19 - TransferCheckpoint.REWIND_FRAMES
+        self.assertEqual(
+            fw_updater.last_transfer_stats.frames_sent, total_frames - start_index
+        )
+        self.assertIsNone(fw_updater._checkpoint.load())
+
+    def test_sends_everything_again_if_device_lost_frames(self):
+        device = create_device(fail_writes=[21])
+        self.interrupt_transfer(device)
+
+        fw_updater = self.create_fw_updater(device)
+        self.assertEqual(fw_updater.install_updates(), (True, False))
+        self.assertEqual(device.fw_version, "6.5")
+
+        with FirmwareImage(FOUNDATION_PLATE_FILE, fw_updater._packet.frame_length) as f:
+            total_frames = f.total_frames
+        self.assertEqual(fw_updater.last_transfer_stats.frames_sent, total_frames)
@@ -0,0 +1,48 @@
+from os import urandom
+from unittest import TestCase
+
+from pt_fw_updater.core.crc import BACKENDS, CRC16Kermit, crc16_kermit
+
+
+class CRC16KermitTestCase(TestCase):
+    def test_check_value_matches_crc16_kermit_catalogue(self):
+        for backend in BACKENDS:
+            crc = CRC16Kermit(b"123456789", backend=backend)
+            self.assertEqual(crc.value, 0x2189)
+            self.assertEqual(crc.digest(), b"\x21\x89")
+
+    def test_calculate_keeps_swapped_bytes_of_original_implementation(self):
+        for backend in BACKENDS:
+            self.assertEqual(
+                CRC16Kermit(backend=backend).calculate(b"123456789"), 0x8921
+            )
+            self.assertEqual(
+                CRC16Kermit(backend=backend).calculate("123456789"), 0x8921
+            )
+
+    def test_backends_agree_for_all_lengths(self):
+        data = urandom(300)
+        for length in range(0, 300, 7):
+            expected = CRC16Kermit(data[:length], backend="table").value
+            for backend in BACKENDS:
+                self.assertEqual(
+                    CRC16Kermit(data[:length], backend=backend).value, expected
+                )
+
+    def test_incremental_updates_match_one_shot(self):
+        data = urandom(1000)
+        for backend in BACKENDS:
+            crc = CRC16Kermit(backend=backend)
+            for i in range(0, len(data), 37):
+                crc.update(memoryview(data)[i : i + 37])
+            self.assertEqual(crc.digest(), crc16_kermit(data))
+
+    def test_accepts_bytearray_and_memoryview(self):
+        data = urandom(64)
+        expected = crc16_kermit(data)
+        self.assertEqual(crc16_kermit(bytearray(data)), expected)
+        self.assertEqual(crc16_kermit(memoryview(data)), expected)
+
+    def test_rejects_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            CRC16Kermit(backend="qwe")
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from pt_fw_updater.core.device_profile import (
+    DeviceProfile,
+    get_device_profile,
+    negotiate_frame_size,
+)
+
+
+class FakeDevice:
+    pass
+
+
+class AdvertisingDevice:
+    def __init__(self, max_frame_size):
+        self.max_frame_size = max_frame_size
+
+    def get_max_frame_size(self):
+        if isinstance(self.max_frame_size, Exception):
+            raise self.max_frame_size
+        return self.max_frame_size
+
+
+class DeviceProfileTestCase(TestCase):
+    def test_unknown_devices_use_default_profile(self):
+        profile = get_device_profile("pt4_unknown")
+        self.assertEqual(profile.frame_size, 256)
+        self.assertFalse(profile.supports_resume)
+
+    def test_rejects_unsupported_frame_size(self):
+        with self.assertRaises(ValueError):
+            DeviceProfile("pt4_hub", frame_size=100)
+
+    def test_profile_frame_size_is_used_without_advertised_maximum(self):
+        profile = DeviceProfile("pt4_hub", frame_size=128)
+        self.assertEqual(negotiate_frame_size(FakeDevice(), profile), 128)
+
+    def test_advertised_maximum_lowers_frame_size(self):
+        profile = DeviceProfile("pt4_hub")
+        self.assertEqual(negotiate_frame_size(AdvertisingDevice(100), profile), 64)
+        self.assertEqual(negotiate_frame_size(AdvertisingDevice(1024), profile), 256)
+
+    def test_failed_advertisement_falls_back_to_profile(self):
+        profile = DeviceProfile("pt4_hub", frame_size=64)
+        device = AdvertisingDevice(OSError("Remote I/O error"))
+        self.assertEqual(negotiate_frame_size(device, profile), 64)
+
+    def test_advertised_maximum_below_smallest_frame_size(self):
+        with self.assertRaises(ValueError):
+            negotiate_frame_size(AdvertisingDevice(8), DeviceProfile("pt4_hub"))
@@ -0,0 +1,134 @@
+import os
+from hashlib import md5
+from shutil import copyfile, rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater.core.digest_cache import DigestCache
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.firmware_image import FirmwareImage
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from tests.test_readiness import FakeClock
+from tests.test_simulated_device import FOUNDATION_PLATE_FILE, create_device
+from tests.utils import isolate_firmware_updater
+
+
+class DigestCacheTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.addCleanup(rmtree, self.folder)
+        self.file = os.path.join(self.folder, "fw.bin")
+        self.write(b"firmware")
+
+    def write(self, data):
+        with open(self.file, "wb") as f:
+            f.write(data)
+
+    def test_hashes_file_once(self):
+        cache = DigestCache()
+        self.assertEqual(cache.digest(self.file), md5(b"firmware").hexdigest())
+        self.assertEqual(cache.digest(self.file), md5(b"firmware").hexdigest())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_hashes_again_when_file_changes(self):
+        cache = DigestCache()
+        cache.digest(self.file)
+        self.write(b"new firmware")
+        self.assertEqual(cache.digest(self.file), md5(b"new firmware").hexdigest())
+        self.assertEqual(cache.misses, 2)
+
+    def test_hashes_again_when_file_is_replaced(self):
+        cache = DigestCache()
+        cache.digest(self.file)
+        stat_result = os.stat(self.file)
+        replacement = os.path.join(self.folder, "new.bin")
+        with open(replacement, "wb") as f:
+            f.write(b"FIRMWARE")
+        # Same size and modification time, different inode
+        os.utime(replacement, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+        os.replace(replacement, self.file)
+        self.assertEqual(cache.digest(self.file), md5(b"FIRMWARE").hexdigest())
+
+    def test_remember(self):
+        cache = DigestCache()
+        cache.remember(self.file, "digest")
+        self.assertEqual(cache.digest(self.file), "digest")
+        self.assertEqual(cache.misses, 0)
+
+    def test_bounded(self):
+        cache = DigestCache(max_entries=2)
+        for i in range(5):
+            name = os.path.join(self.folder, str(i))
+            with open(name, "wb") as f:
+                f.write(bytes([i]))
+            cache.digest(name)
+        self.assertEqual(len(cache._digests), 2)
+
+
+class StagedFileIntegrityTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.addCleanup(rmtree, self.folder)
+        self.fw_file = os.path.join(
+            self.folder, os.path.basename(FOUNDATION_PLATE_FILE)
+        )
+        copyfile(FOUNDATION_PLATE_FILE, self.fw_file)
+        isolate_firmware_updater(self)
+        clock = FakeClock()
+
+        patchers = [
+            patch("pt_fw_updater.core.readiness.monotonic", clock.time),
+            patch("pt_fw_updater.core.readiness.sleep", clock.sleep),
+            patch.object(FirmwareUpdater, "staged_file_digests", DigestCache()),
+            patch.object(
+                FirmwareImage,
+                "__init__",
+                autospec=True,
+                side_effect=FirmwareImage.__init__,
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stage(self, strict_integrity_check):
+        self.device = create_device()
+        fw_updater = FirmwareUpdater(
+            self.device, strict_integrity_check=strict_integrity_check
+        )
+        fw_updater.stage_file(FirmwareFileObject.from_file(self.fw_file))
+        self.assertTrue(fw_updater.has_staged_updates())
+        return fw_updater
+
+    def test_hashes_image_once_when_sending(self):
+        success, _ = self.stage(strict_integrity_check=True).install_updates()
+
+        self.assertTrue(success)
+        self.assertTrue(FirmwareImage.__init__.call_args.kwargs["compute_md5"])
+        # Only the source is hashed when staging; the staged file isn't
+        # hashed again until then
+        self.assertEqual(FirmwareUpdater.staged_file_digests.misses, 1)
+
+    def test_trusts_remembered_digest(self):
+        success, _ = self.stage(strict_integrity_check=False).install_updates()
+
+        self.assertTrue(success)
+        self.assertFalse(FirmwareImage.__init__.call_args.kwargs["compute_md5"])
+        self.assertEqual(FirmwareUpdater.staged_file_digests.misses, 1)
+
+    def test_strict_mode_detects_file_changed_in_place(self):
+        fw_updater = self.stage(strict_integrity_check=True)
+
+        # Rewrite the staged file without changing its size or timestamps
+        stat_result = os.stat(fw_updater.fw_file_location)
+        with open(fw_updater.fw_file_location, "r+b") as f:
+            f.write(b"\xff\xff\xff\xff")
+        os.utime(
+            fw_updater.fw_file_location,
+            ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns),
+        )
+        self.assertTrue(fw_updater.has_staged_updates())
+
+        fw_updater.install_updates()
+        self.assertEqual(self.device.writes, 0)
@@ -0,0 +1,107 @@
+import os
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater import utils
+from pt_fw_updater.core.firmware_catalog import FirmwareCatalog
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.simulated_device import SimulatedFirmwareDevice
+
+
+class FirmwareCatalogTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.fw_folder = path.join(self.folder, "pt4_hub")
+        os.mkdir(self.fw_folder)
+        self.location = path.join(self.folder, "catalog.json")
+        self.catalog = FirmwareCatalog(self.location)
+
+    def tearDown(self):
+        rmtree(self.folder)
+        utils.session.clear()
+
+    def add_files(self, *names):
+        for name in names:
+            open(path.join(self.fw_folder, name), "w").close()
+        # Make sure the folder looks modified even on coarse timestamps
+        mtime = os.stat(self.fw_folder).st_mtime_ns + 1_000_000_000
+        os.utime(self.fw_folder, ns=(mtime, mtime))
+
+    def latest_name(self, catalog=None, schematic_version=10):
+        fw_file = (catalog or self.catalog).latest(
+            self.fw_folder, "pt4_hub", schematic_version
+        )
+        return path.basename(fw_file.path) if fw_file else None
+
+    def test_orders_like_is_newer(self):
+        self.add_files(
+            "pt4_hub-v5.10-sch10-preview.bin",
+            "pt4_hub-v5.9-sch10-release.bin",
+            "pt4_hub-v5.10-sch10-release-1600000000.bin",
+            "pt4_hub-v5.10-sch10-release-1500000000.bin",
+            "pt4_hub-v6.0-sch9-release.bin",
+            "pt4_hub-v7.0.bin",
+            "notes.txt",
+        )
+        self.assertEqual(
+            self.latest_name(), "pt4_hub-v5.10-sch10-release-1600000000.bin"
+        )
+        self.assertEqual(
+            self.latest_name(schematic_version=9), "pt4_hub-v6.0-sch9-release.bin"
+        )
+        self.assertIsNone(self.latest_name(schematic_version=8))
+
+        candidates = self.catalog.candidates(self.fw_folder, "pt4_hub", 10)
+        fw_files = [FirmwareFileObject.from_file(c) for c in candidates]
+        for newer, older in zip(fw_files, fw_files[1:]):
+            self.assertFalse(FirmwareFileObject.is_newer(newer, older, quiet=True))
+
+    def test_folder_is_indexed_again_when_it_changes(self):
+        self.add_files("pt4_hub-v5.3-sch10-release.bin")
+        self.assertEqual(self.latest_name(), "pt4_hub-v5.3-sch10-release.bin")
+        self.add_files("pt4_hub-v5.4-sch10-release.bin")
+        self.assertEqual(self.latest_name(), "pt4_hub-v5.4-sch10-release.bin")
+
+    def test_index_is_reused_after_restart(self):
+        self.add_files(
+            "pt4_hub-v5.3-sch10-release.bin", "pt4_hub-v5.4-sch10-release.bin"
+        )
+        self.latest_name()
+
+        with patch.object(
+            FirmwareFileObject, "from_file", wraps=FirmwareFileObject.from_file
+        ) as from_file:
+            name = self.latest_name(FirmwareCatalog(self.location))
+        self.assertEqual(name, "pt4_hub-v5.4-sch10-release.bin")
+        # Only the selected file is parsed
+        self.assertEqual(from_file.call_count, 1)
+
+    def test_corrupt_index_is_rebuilt(self):
+        self.add_files("pt4_hub-v5.3-sch10-release.bin")
+        with open(self.location, "w") as f:
+            f.write('{"version": 1, "folders": {"x": 1}}')
+        self.assertEqual(
+            self.latest_name(FirmwareCatalog(self.location)),
+            "pt4_hub-v5.3-sch10-release.bin",
+        )
+
+    def test_find_latest_firmware_skips_processed_files(self):
+        device = SimulatedFirmwareDevice(
+            "pt4_hub", fw_version="5.0", schematic_version=10
+        )
+        self.add_files("pt4_hub-v5.3-sch10-release.bin")
+        with patch.object(utils, "firmware_catalog", self.catalog):
+            fw_file = utils.find_latest_firmware(self.fw_folder, device)
+            self.assertEqual(
+                path.basename(fw_file.path), "pt4_hub-v5.3-sch10-release.bin"
+            )
+            self.assertIsNone(utils.find_latest_firmware(self.fw_folder, device))
+
+            self.add_files("pt4_hub-v5.2-sch10-release.bin")
+            fw_file = utils.find_latest_firmware(self.fw_folder, device)
+            self.assertEqual(
+                path.basename(fw_file.path), "pt4_hub-v5.2-sch10-release.bin"
+            )
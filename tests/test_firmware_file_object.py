@@ -0,0 +1,128 @@
+import os
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject, FirmwareVersion
+
+
+def fw_file(version, is_release=True, timestamp=None):
+    return FirmwareFileObject(
+        None,
+        False,
+        "",
+        "pt4_hub",
+        FirmwareVersion.from_string(version),
+        10,
+        is_release,
+        timestamp,
+    )
+
+
+class FirmwareFileObjectTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def create_file(self, name):
+        file_path = path.join(self.folder, name)
+        open(file_path, "w").close()
+        return file_path
+
+    def test_parses_filename(self):
+        fw_file = FirmwareFileObject.from_file(
+            self.create_file("pt4_hub-v5.10-sch8-preview-1591708039.bin")
+        )
+        self.assertFalse(fw_file.error)
+        self.assertEqual(fw_file.device_name, "pt4_hub")
+        self.assertEqual(fw_file.firmware_version, (5, 10))
+        self.assertEqual(str(fw_file.firmware_version), "5.10")
+        self.assertEqual(fw_file.schematic_version, 8)
+        self.assertFalse(fw_file.is_release)
+        self.assertEqual(fw_file.timestamp, 1591708039)
+
+    def test_reports_invalid_filenames(self):
+        errors = {
+            "pt4_hub-v5.3-sch8.txt": "Not a .bin file",
+            "pt4_hub-v5.3-sch8.bin": "Less than 4 dash-separated fields in filename",
+            "pt4_hubx-v5.3-sch8-release.bin": "Invalid device name string: pt4_hubx",
+            "pt4_hub-v5-sch8-release.bin": "Invalid firmware version string: 5",
+            "pt4_hub-v5.3-schx-release.bin": "Invalid schematic version string: x",
+            "pt4_hub-v5.3-sch8-beta.bin": "Invalid release type string: beta",
+            "pt4_hub-v5.3-sch8-release-x.bin": "Invalid timestamp string: x",
+        }
+        for name, error_string in errors.items():
+            fw_file = FirmwareFileObject.from_file(self.create_file(name))
+            self.assertTrue(fw_file.error, name)
+            self.assertEqual(fw_file.error_string, error_string)
+
+        missing_file = FirmwareFileObject.from_file(
+            path.join(self.folder, "pt4_hub-v5.3-sch8-release.bin")
+        )
+        self.assertEqual(missing_file.error_string, "No file found")
+
+    def test_versions_sort_numerically(self):
+        self.assertGreater(
+            FirmwareVersion.from_string("5.10"), FirmwareVersion.from_string("5.9")
+        )
+        with self.assertRaises(ValueError):
+            FirmwareVersion.from_string("5.x")
+
+    def test_parse_many_matches_from_file(self):
+        names = [
+            "pt4_hub-v5.3-sch8-release.bin",
+            "pt4_hub-v5.3-sch8-beta.bin",
+            "notes.txt",
+        ]
+        for name in names:
+            self.create_file(name)
+        os.mkdir(path.join(self.folder, "pt4_hub-v5.4-sch8-release.bin"))
+
+        with os.scandir(self.folder) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        parsed = FirmwareFileObject.parse_many(entries)
+        expected = [FirmwareFileObject.from_file(entry.path) for entry in entries]
+        self.assertEqual(
+            [(f.error, f.error_string, f.firmware_version) for f in parsed],
+            [(f.error, f.error_string, f.firmware_version) for f in expected],
+        )
+        self.assertEqual(
+            FirmwareFileObject.parse_many([entries[0].path])[0].error_string,
+            expected[0].error_string,
+        )
+
+    def test_is_newer(self):
+        self.assertTrue(FirmwareFileObject.is_newer(fw_file("5.9"), fw_file("5.10")))
+        self.assertFalse(FirmwareFileObject.is_newer(fw_file("5.10"), fw_file("5.9")))
+        # Release build of the same version is newer than a preview
+        self.assertTrue(
+            FirmwareFileObject.is_newer(
+                fw_file("5.3", is_release=False), fw_file("5.3")
+            )
+        )
+        # Build timestamp breaks ties
+        self.assertTrue(
+            FirmwareFileObject.is_newer(
+                fw_file("5.3", timestamp=1500000000),
+                fw_file("5.3", timestamp=1600000000),
+            )
+        )
+        self.assertFalse(FirmwareFileObject.is_newer(fw_file("5.3"), fw_file("5.3")))
+
+    def test_sort_key_orders_like_is_newer(self):
+        fw_files = [
+            fw_file("5.3", is_release=False),
+            fw_file("5.3"),
+            fw_file("5.3", timestamp=1600000000),
+            fw_file("5.10"),
+        ]
+        self.assertEqual(sorted(fw_files, key=lambda f: f.sort_key), fw_files)
+        for older, newer in zip(fw_files, fw_files[1:]):
+            self.assertFalse(FirmwareFileObject.is_newer(newer, older, quiet=True))
+
+    def test_uses_slots(self):
+        with self.assertRaises(AttributeError):
+            fw_file("5.3").unknown_attribute = 1
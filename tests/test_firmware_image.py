@@ -0,0 +1,44 @@
+from hashlib import md5, sha256
+from os import remove, urandom
+from tempfile import NamedTemporaryFile
+from unittest import TestCase
+
+from pt_fw_updater.core.firmware_image import FirmwareImage
+
+
+class FirmwareImageTestCase(TestCase):
+    def setUp(self):
+        self.data = urandom(256 * 4 + 10)
+        with NamedTemporaryFile(suffix=".bin", delete=False) as f:
+            f.write(self.data)
+        self.path = f.name
+
+    def tearDown(self):
+        remove(self.path)
+
+    def test_analysis_matches_file_contents(self):
+        with FirmwareImage(self.path) as fw_image:
+            self.assertEqual(fw_image.size, len(self.data))
+            self.assertEqual(fw_image.md5, md5(self.data).hexdigest())
+            self.assertEqual(fw_image.sha256, sha256(self.data).hexdigest())
+            self.assertEqual(fw_image.checksum, sum(self.data) & 0xFFFFFFFF)
+            self.assertEqual(fw_image.total_frames, 5)
+            self.assertEqual(fw_image.last_frame_length, 10)
+
+    def test_frames_are_views_into_the_file(self):
+        with FirmwareImage(self.path, frame_size=100) as fw_image:
+            frames = list(fw_image.iter_frames())
+            self.assertEqual(b"".join(frames), self.data)
+            self.assertTrue(all(isinstance(f, memoryview) for f in frames))
+            self.assertEqual(bytes(fw_image.frame(2)), self.data[200:300])
+            with self.assertRaises(IndexError):
+                fw_image.frame(fw_image.total_frames)
+            del frames
+
+    def test_empty_file_has_no_frames(self):
+        with open(self.path, "wb"):
+            pass
+        with FirmwareImage(self.path) as fw_image:
+            self.assertEqual(fw_image.size, 0)
+            self.assertEqual(fw_image.total_frames, 0)
+            self.assertEqual(fw_image.md5, md5(b"").hexdigest())
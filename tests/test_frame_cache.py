@@ -0,0 +1,89 @@
+from os import listdir, path, remove, stat, urandom, utime
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater.core import frame_cache
+from pt_fw_updater.core.firmware_image import FirmwareImage
+from pt_fw_updater.core.frame_cache import FrameCache
+from pt_fw_updater.core.packet_manager import PacketManager, PacketType
+
+
+class FrameCacheTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.cache = FrameCache(path.join(self.folder, "cache"))
+        self.bin_file = self.create_bin_file("image.bin", 256 * 3 + 5)
+        FrameCache._verified_entries.clear()
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def create_bin_file(self, name, size):
+        bin_file = path.join(self.folder, name)
+        with open(bin_file, "wb") as f:
+            f.write(urandom(size))
+        return bin_file
+
+    def packets(self, frame_cache):
+        packet_manager = PacketManager(frame_cache=frame_cache)
+        packet_manager.set_fw_file_to_install(self.bin_file)
+        starting_packet = bytes(
+            packet_manager.create_packets(PacketType.StartingPacket)
+        )
+        fw_packets = [bytes(p) for p in packet_manager.iter_fw_packets()]
+        packet_manager.close()
+        return starting_packet, fw_packets
+
+    def test_cached_packets_match_encoded_packets(self):
+        expected = self.packets(None)
+        self.assertEqual(self.packets(self.cache), expected)
+        self.assertEqual(len(listdir(self.cache.location)), 1)
+        # Second run is served from the cache entry
+        self.assertEqual(self.packets(self.cache), expected)
+
+    def test_corrupted_entry_is_discarded(self):
+        expected = self.packets(self.cache)
+        with FirmwareImage(self.bin_file) as fw_image:
+            entry_path = self.cache.entry_path(fw_image.sha256, 256)
+        with open(entry_path, "r+b") as f:
+            f.seek(-1, 2)
+            last_byte = f.read(1)
+            f.seek(-1, 2)
+            f.write(bytes([last_byte[0] ^ 0xFF]))
+        # Make sure the change shows up even on filesystems with coarse
+        # timestamps
+        mtime_ns = stat(entry_path).st_mtime_ns + 1_000_000_000
+        utime(entry_path, ns=(mtime_ns, mtime_ns))
+
+        with FirmwareImage(self.bin_file) as fw_image:
+            self.assertIsNone(self.cache.get(fw_image))
+        self.assertFalse(path.exists(entry_path))
+        self.assertEqual(self.packets(self.cache), expected)
+
+    def test_warm_evicts_entries_of_removed_files(self):
+        other_bin_file = self.create_bin_file("other.bin", 1000)
+        self.cache.warm([self.bin_file, other_bin_file])
+        self.assertEqual(len(listdir(self.cache.location)), 2)
+
+        remove(other_bin_file)
+        self.cache.warm([self.bin_file])
+        entries = listdir(self.cache.location)
+        self.assertEqual(len(entries), 1)
+        with FirmwareImage(self.bin_file) as fw_image:
+            self.assertTrue(entries[0].startswith(fw_image.sha256))
+
+    def test_hit_does_not_hash_entry_again(self):
+        expected = self.packets(self.cache)
+        with patch.object(frame_cache, "sha256", wraps=frame_cache.sha256) as hasher:
+            self.assertEqual(self.packets(self.cache), expected)
+        hasher.assert_not_called()
+
+    def test_entry_is_verified_once_per_process(self):
+        expected = self.packets(self.cache)
+        FrameCache._verified_entries.clear()
+        with patch.object(frame_cache, "sha256", wraps=frame_cache.sha256) as hasher:
+            self.assertEqual(self.packets(self.cache), expected)
+            self.assertEqual(self.packets(self.cache), expected)
+        self.assertEqual(hasher.call_count, 1)
@@ -0,0 +1,57 @@
+import binascii
+from os import urandom
+from unittest import TestCase
+
+from pt_fw_updater.core.crc import CRC16Kermit
+from pt_fw_updater.core.frame_creator import FW_FRAME_OVERHEAD, FrameCreator
+
+
+def hex_string_fw_frame(frame_number, frame_data):
+    """Reference encoder: the hex string implementation used before."""
+    frame_length = format(9 + len(frame_data), "04x")
+    data = "8A" + frame_length + "01A2" + format(frame_number, "04x") + frame_data.hex()
+    crc = CRC16Kermit().calculate(binascii.unhexlify(data))
+    return bytes.fromhex(data + crc.to_bytes(2, byteorder="little").hex())
+
+
+class FrameCreatorTestCase(TestCase):
+    def test_fw_frame_matches_hex_string_encoder(self):
+        for frame_number, size in ((1, 256), (2, 100), (65535, 1)):
+            data = urandom(size)
+            self.assertEqual(
+                bytes(FrameCreator.create_fw_frame(frame_number, data)),
+                hex_string_fw_frame(frame_number, data),
+            )
+
+    def test_initialising_frame_is_unchanged(self):
+        frame = FrameCreator.create_initialising_frame(
+            fw_size=0x1234,
+            frame_size=256,
+            total_frames=19,
+            last_frame=0x34,
+            fw_checksum=0x0789ABCD,
+        )
+        self.assertEqual(
+            bytes(frame[:-2]).hex(),
+            "8a006b01a1" "00001234" "0100" "0013" "0034" "0789abcd" "0000",
+        )
+        self.assertEqual(len(frame), 23)
+
+    def test_create_fw_frames_uses_one_buffer(self):
+        data = urandom(256 * 10 + 17)
+        frames = FrameCreator.create_fw_frames(data, 256)
+
+        self.assertEqual(len(frames), 11)
+        self.assertEqual(len(frames[-1]), 17 + FW_FRAME_OVERHEAD)
+        self.assertTrue(all(frame.obj is frames[0].obj for frame in frames))
+        self.assertEqual(len(frames[0].obj), len(data) + 11 * FW_FRAME_OVERHEAD)
+
+        for frame_number, frame in enumerate(frames, 1):
+            start = (frame_number - 1) * 256
+            self.assertEqual(
+                bytes(frame),
+                hex_string_fw_frame(frame_number, data[start : start + 256]),
+            )
+
+    def test_create_fw_frames_handles_empty_image(self):
+        self.assertEqual(FrameCreator.create_fw_frames(b"", 256), [])
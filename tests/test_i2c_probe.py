@@ -0,0 +1,100 @@
+import errno
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater import utils
+from pt_fw_updater.core.i2c_probe import I2C_SLAVE, I2C_SMBUS, FakeI2CBus, I2CBus
+
+# Adapter-wide settings from linux/i2c-dev.h that probing must not change
+I2C_RETRIES = 0x0701
+I2C_TIMEOUT = 0x0702
+
+
+class FakeAdapter:
+    """Answers i2c-dev ioctls like an adapter with devices at addresses."""
+
+    def __init__(self, addresses, busy=()):
+        self.addresses = set(addresses)
+        self.busy = set(busy)
+        self.address = None
+        self.calls = list()
+
+    def ioctl(self, fd, request, arg):
+        self.calls.append(request)
+        if request == I2C_SLAVE:
+            if arg in self.busy:
+                raise OSError(errno.EBUSY, "Device or resource busy")
+            self.address = arg
+            return 0
+        if request == I2C_SMBUS:
+            if self.address not in self.addresses:
+                raise OSError(errno.ENXIO, "No such device or address")
+            return 0
+        raise OSError(errno.ENOTTY, "Inappropriate ioctl for device")
+
+
+class I2CBusTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.device_path = path.join(self.folder, "i2c-1")
+        open(self.device_path, "w").close()
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def test_probe_reports_acknowledged_addresses(self):
+        adapter = FakeAdapter([0x11])
+        with I2CBus(self.device_path, ioctl=adapter.ioctl) as bus:
+            self.assertTrue(bus.probe(0x11))
+            self.assertFalse(bus.probe(0x04))
+
+    def test_bus_is_opened_once(self):
+        adapter = FakeAdapter([0x11])
+        with I2CBus(self.device_path, ioctl=adapter.ioctl) as bus:
+            bus.probe(0x11)
+            fd = bus._fd
+            for _ in range(2):
+                bus.probe(0x11)
+            self.assertEqual(bus._fd, fd)
+        self.assertEqual(adapter.calls.count(I2C_SMBUS), 3)
+
+    def test_adapter_settings_are_left_alone(self):
+        adapter = FakeAdapter([0x11])
+        with I2CBus(self.device_path, ioctl=adapter.ioctl) as bus:
+            bus.probe(0x11)
+            bus.probe(0x04)
+        self.assertNotIn(I2C_TIMEOUT, adapter.calls)
+        self.assertNotIn(I2C_RETRIES, adapter.calls)
+
+    def test_address_claimed_by_driver_is_present(self):
+        adapter = FakeAdapter([], busy=[0x04])
+        with I2CBus(self.device_path, ioctl=adapter.ioctl) as bus:
+            self.assertTrue(bus.probe(0x04))
+
+    def test_missing_adapter_raises(self):
+        bus = I2CBus(path.join(self.folder, "i2c-9"), ioctl=FakeAdapter([]).ioctl)
+        with self.assertRaises(OSError):
+            bus.probe(0x11)
+
+
+class I2CAddrFoundTestCase(TestCase):
+    def test_uses_bus_probe(self):
+        bus = FakeI2CBus([0x11])
+        with patch.object(utils, "i2c_bus", bus), patch.object(
+            utils, "run_command"
+        ) as run_command:
+            self.assertTrue(utils.i2c_addr_found(0x11))
+            self.assertFalse(utils.i2c_addr_found(0x04))
+        run_command.assert_not_called()
+        self.assertEqual(bus.probes, 2)
+
+    def test_falls_back_to_i2cping_without_bus(self):
+        bus = I2CBus("/nonexistent/i2c-1")
+        with patch.object(utils, "i2c_bus", bus), patch.object(
+            utils, "run_command"
+        ) as run_command:
+            self.assertTrue(utils.i2c_addr_found(0x11))
+        run_command.assert_called_once()
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+from importlib.metadata import PackageNotFoundError
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from pt_fw_updater.__main__ import do_check, do_update
+
+# Modules that are only needed once a command runs
+DEFERRED_MODULES = (
+    "pt_fw_updater.check",
+    "pt_fw_updater.update",
+    "pt_fw_updater.core.notification_manager",
+    "pt_fw_updater.core.firmware_updater",
+    "pitop.system",
+    "systemd.journal",
+    "importlib.metadata",
+)
+
+
+class EntryPointImportsTestCase(TestCase):
+    def test_defers_command_imports(self):
+        code = (
+            "import sys, pt_fw_updater.__main__; "
+            "print('\\n'.join(m for m in {!r} if m in sys.modules))".format(
+                DEFERRED_MODULES
+            )
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            stdout=subprocess.PIPE,
+            check=True,
+            universal_newlines=True,
+        ).stdout
+        self.assertEqual(output.split(), [])
+
+
+class VersionOptionTestCase(TestCase):
+    def test_version_of_distribution(self):
+        def version(distribution_name):
+            if distribution_name != "pt-firmware-updater":
+                raise PackageNotFoundError(distribution_name)
+            return "1.2.3"
+
+        with patch("importlib.metadata.version", version):
+            for command in (do_check, do_update):
+                result = CliRunner().invoke(command, ["--version"])
+                self.assertEqual(result.exit_code, 0, result.output)
+                self.assertIn("1.2.3", result.output)
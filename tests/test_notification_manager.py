@@ -0,0 +1,65 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from pitop.common.common_ids import FirmwareDeviceID
+
+from pt_fw_updater.core import notification_manager
+from pt_fw_updater.core.notification_manager import (
+    NotificationManager,
+    UpdateStatusEnum,
+)
+
+
+@patch.object(notification_manager, "send_notification", return_value="")
+class NotificationManagerTestCase(TestCase):
+    def test_single_device_message(self, send_notification):
+        NotificationManager().notify_user(
+            UpdateStatusEnum.SUCCESS, FirmwareDeviceID.pt4_foundation_plate
+        )
+        self.assertEqual(
+            send_notification.call_args.kwargs["text"],
+            "Your pi-top [4] Foundation Plate has been updated and is ready to use.",
+        )
+
+    def test_several_devices_in_one_message(self, send_notification):
+        NotificationManager().notify_user(
+            UpdateStatusEnum.SUCCESS,
+            [FirmwareDeviceID.pt4_hub, FirmwareDeviceID.pt4_foundation_plate],
+        )
+        send_notification.assert_called_once()
+        self.assertEqual(
+            send_notification.call_args.kwargs["text"],
+            "Your pi-top [4] and pi-top [4] Foundation Plate have been updated "
+            "and are ready to use.",
+        )
+
+    def test_restart_message_with_hub(self, send_notification):
+        NotificationManager().notify_user(
+            UpdateStatusEnum.SUCCESS_REQUIRES_RESTART,
+            [FirmwareDeviceID.pt4_hub, FirmwareDeviceID.pt4_expansion_plate],
+        )
+        self.assertTrue(
+            send_notification.call_args.kwargs["text"].startswith("Reboot your")
+        )
+        self.assertIsNotNone(send_notification.call_args.kwargs["actions_manager"])
+
+    def test_replaces_notification_about_other_devices(self, send_notification):
+        # Notification ids are kept for the whole process
+        notification_ids = patch.dict(
+            NotificationManager._NotificationManager__notification_ids
+        )
+        notification_ids.start()
+        self.addCleanup(notification_ids.stop)
+
+        manager = NotificationManager()
+        devices = [FirmwareDeviceID.pt4_hub, FirmwareDeviceID.pt4_foundation_plate]
+        send_notification.return_value = "12"
+        manager.notify_user(UpdateStatusEnum.ONGOING, devices)
+
+        send_notification.return_value = ""
+        manager.notify_user(
+            UpdateStatusEnum.FAILURE, [FirmwareDeviceID.pt4_hub], replace=devices
+        )
+        self.assertEqual(send_notification.call_args.kwargs["notification_id"], 12)
+        self.assertIn("pi-top [4]", send_notification.call_args.kwargs["text"])
+        self.assertNotIn("Foundation", send_notification.call_args.kwargs["text"])
@@ -0,0 +1,142 @@
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from pitop.common.firmware_device import DeviceInfo
+
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from pt_fw_updater.core.frame_creator import _FW_FRAME_HEADER
+from pt_fw_updater.core.pacing import AdaptivePacer, PacingStore
+from pt_fw_updater.core.simulated_device import SimulatedFirmwareDevice
+from tests.test_readiness import FakeClockTestCase
+from tests.test_simulated_device import FOUNDATION_PLATE_FILE
+from tests.utils import isolate_firmware_updater
+
+
+class FakeDevice:
+    def __init__(self, failures=()):
+        self.intervals = list()
+        self.sent = list()
+        self.failures = set(failures)
+        self.attempts = 0
+
+    def set_send_packet_interval(self, interval):
+        self.intervals.append(interval)
+
+    def send(self, packet):
+        self.attempts += 1
+        if self.attempts in self.failures:
+            raise OSError("Remote I/O error")
+        self.sent.append(packet)
+
+
+class AdaptivePacerTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.store = PacingStore(path.join(self.folder, "pacing.json"))
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def create_pacer(self):
+        return AdaptivePacer("pt4_hub", 10, fixed_interval=0.1, store=self.store)
+
+    def test_gap_shrinks_while_writes_succeed(self):
+        pacer = self.create_pacer()
+        device = FakeDevice()
+        send = pacer.wrap(device, device.send)
+        for i in range(AdaptivePacer.SUCCESS_STREAK * 3):
+            send([i])
+
+        self.assertAlmostEqual(
+            pacer.gap, AdaptivePacer.INITIAL_GAP - 3 * AdaptivePacer.GAP_DECREASE
+        )
+        self.assertEqual(device.intervals[0], AdaptivePacer.INITIAL_GAP)
+        # The new gap applies from the next write
+        send([0])
+        self.assertEqual(device.intervals[-1], pacer.gap)
+
+    def test_gap_doubles_and_frame_is_retried_on_error(self):
+        pacer = self.create_pacer()
+        device = FakeDevice(failures=[2])
+        send = pacer.wrap(device, device.send)
+        send([1])
+        send([2])
+
+        self.assertEqual(device.sent, [[1], [2]])
+        self.assertEqual(pacer.retries, 1)
+        self.assertAlmostEqual(pacer.gap, AdaptivePacer.INITIAL_GAP * 2)
+
+    def test_gives_up_after_max_retries(self):
+        pacer = self.create_pacer()
+        device = FakeDevice(failures=range(1, AdaptivePacer.MAX_RETRIES + 2))
+        with self.assertRaises(OSError):
+            pacer.wrap(device, device.send)([1])
+        self.assertLessEqual(pacer.gap, pacer.max_gap)
+
+    def test_verified_gap_is_used_by_next_transfer(self):
+        pacer = self.create_pacer()
+        pacer.gap = 0.005
+        pacer.record_result(verified=True)
+        self.assertEqual(self.create_pacer().gap, 0.005)
+
+    def test_failed_verification_slows_down_next_transfer(self):
+        self.store.set("pt4_hub-sch10", 0.004)
+        pacer = self.create_pacer()
+        pacer.record_result(verified=False)
+        self.assertEqual(self.create_pacer().gap, 0.008)
+        self.assertIsNone(self.store.get("pt4_hub-sch9"))
+
+
+class RecordingDevice(SimulatedFirmwareDevice):
+    """Records the number of every firmware frame of each transfer with
+    the interval it was sent with, and garbles frame drop_frame of the
+    first transfer so that the device drops it."""
+
+    def __init__(self, drop_frame, **kwargs):
+        super(RecordingDevice, self).__init__(
+            "pt4_foundation_plate",
+            fw_version="6.4",
+            schematic_version=3,
+            realtime=False,
+            **kwargs
+        )
+        self.drop_frame = drop_frame
+        self.transfers = list()
+
+    def send_packet(self, hardware_reg, packet):
+        if hardware_reg == DeviceInfo.FW__UPGRADE_START:
+            self.transfers.append(list())
+        elif hardware_reg == DeviceInfo.FW__UPGRADE_PACKET:
+            frame_number = _FW_FRAME_HEADER.unpack_from(bytes(packet))[4]
+            self.transfers[-1].append((frame_number, self.send_packet_interval))
+            if len(self.transfers) == 1 and frame_number == self.drop_frame:
+                packet = list(packet)
+                packet[-1] ^= 0xFF
+        super(RecordingDevice, self).send_packet(hardware_reg, packet)
+
+
+class InstallUpdatesPacingTestCase(FakeClockTestCase):
+    def setUp(self):
+        super(InstallUpdatesPacingTestCase, self).setUp()
+        isolate_firmware_updater(self)
+
+    def test_resends_with_fixed_interval_after_failed_verification(self):
+        device = RecordingDevice(drop_frame=3)
+        fw_updater = FirmwareUpdater(
+            device, send_packet_interval=0.05, adaptive_pacing=True
+        )
+        fw_updater.stage_file(FirmwareFileObject.from_file(FOUNDATION_PLATE_FILE))
+
+        self.assertEqual(fw_updater.install_updates(), (True, False))
+        self.assertEqual(device.fw_version, "6.5")
+
+        paced, resent = device.transfers
+        self.assertEqual(paced[0], (1, AdaptivePacer.INITIAL_GAP))
+        # The FW OKAY check failed, so everything is sent again from
+        # frame 1 with the fixed interval
+        self.assertEqual(resent, [(n, 0.05) for n in range(1, len(resent) + 1)])
+        self.assertEqual(len(resent), len(paced))
+        self.assertEqual(device.send_packet_interval, 0.05)
@@ -0,0 +1,114 @@
+import tracemalloc
+from os import remove, urandom
+from tempfile import NamedTemporaryFile
+from unittest import TestCase
+
+from pt_fw_updater.core.crc import crc16_kermit
+from pt_fw_updater.core.packet_manager import PacketManager, PacketType
+
+
+def create_bin_file(size):
+    with NamedTemporaryFile(suffix=".bin", delete=False) as f:
+        remaining = size
+        while remaining:
+            chunk = urandom(min(remaining, 1024 * 1024))
+            f.write(chunk)
+            remaining -= len(chunk)
+    return f.name
+
+
+def peak_memory_while_streaming(packet_manager):
+    tracemalloc.start()
+    try:
+        total_frames = sum(1 for _ in packet_manager.iter_fw_packets())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return total_frames, peak
+
+
+class PacketManagerTestCase(TestCase):
+    def setUp(self):
+        self.bin_files = list()
+
+    def tearDown(self):
+        for bin_file in self.bin_files:
+            remove(bin_file)
+
+    def packet_manager_for_size(self, size, frame_length=256):
+        bin_file = create_bin_file(size)
+        self.bin_files.append(bin_file)
+        packet_manager = PacketManager(frame_length=frame_length)
+        packet_manager.set_fw_file_to_install(bin_file)
+        return packet_manager
+
+    def test_streamed_packets_match_buffered_packets(self):
+        packet_manager = self.packet_manager_for_size(256 * 20 + 100)
+        streamed = [bytes(p) for p in packet_manager.iter_fw_packets()]
+        buffered = [
+            bytes(p) for p in packet_manager.create_packets(PacketType.FwPackets)
+        ]
+        self.assertEqual(len(streamed), 21)
+        self.assertEqual(streamed, buffered)
+
+    def test_streaming_can_start_at_a_later_frame(self):
+        packet_manager = self.packet_manager_for_size(256 * 20 + 100)
+        all_packets = [bytes(p) for p in packet_manager.iter_fw_packets()]
+        resumed = [bytes(p) for p in packet_manager.iter_fw_packets(15)]
+        self.assertEqual(resumed, all_packets[15:])
+        self.assertEqual(int.from_bytes(resumed[0][5:7], "big"), 16)
+
+    def test_starting_packet_describes_frames(self):
+        packet_manager = self.packet_manager_for_size(256 * 20 + 100)
+        packet = packet_manager.create_packets(PacketType.StartingPacket)
+
+        with open(packet_manager.bin_file, "rb") as f:
+            checksum = sum(f.read()) & 0xFFFFFFFF
+        self.assertEqual(int.from_bytes(packet[5:9], "big"), 256 * 20 + 100)
+        self.assertEqual(int.from_bytes(packet[9:11], "big"), 256)
+        self.assertEqual(int.from_bytes(packet[11:13], "big"), 21)
+        self.assertEqual(int.from_bytes(packet[13:15], "big"), 100)
+        self.assertEqual(int.from_bytes(packet[15:19], "big"), checksum)
+
+    def test_frame_length_is_configurable(self):
+        packet_manager = self.packet_manager_for_size(64 * 20 + 10, frame_length=64)
+        packet = packet_manager.create_packets(PacketType.StartingPacket)
+        fw_packets = list(packet_manager.iter_fw_packets())
+
+        self.assertEqual(int.from_bytes(packet[1:3], "big"), 7 + 40)
+        self.assertEqual(int.from_bytes(packet[9:11], "big"), 64)
+        self.assertEqual(int.from_bytes(packet[11:13], "big"), 21)
+        self.assertEqual(int.from_bytes(packet[13:15], "big"), 10)
+        self.assertEqual([len(p) for p in fw_packets], [64 + 9] * 20 + [10 + 9])
+
+    def test_rejects_unsupported_frame_length(self):
+        with self.assertRaises(ValueError):
+            PacketManager(frame_length=100)
+
+    def test_streaming_memory_does_not_grow_with_image_size(self):
+        small = self.packet_manager_for_size(256 * 16)
+        largest = self.packet_manager_for_size(256 * PacketManager.MAX_TOTAL_FRAMES)
+
+        small_frames, small_peak = peak_memory_while_streaming(small)
+        largest_frames, largest_peak = peak_memory_while_streaming(largest)
+
+        self.assertEqual(small_frames, 16)
+        self.assertEqual(largest_frames, PacketManager.MAX_TOTAL_FRAMES)
+        self.assertLess(largest_peak, 64 * 1024)
+        self.assertLess(largest_peak, small_peak + 16 * 1024)
+
+    def test_last_frame_of_largest_image_is_numbered_65535(self):
+        packet_manager = self.packet_manager_for_size(
+            256 * PacketManager.MAX_TOTAL_FRAMES
+        )
+        for last_packet in packet_manager.iter_fw_packets():
+            pass
+        self.assertEqual(last_packet[5:7], b"\xff\xff")
+        self.assertEqual(last_packet[-2:], crc16_kermit(last_packet[:-2]))
+
+    def test_starting_packet_rejects_images_above_frame_limit(self):
+        packet_manager = self.packet_manager_for_size(
+            256 * PacketManager.MAX_TOTAL_FRAMES + 1
+        )
+        with self.assertRaises(ValueError):
+            packet_manager.create_packets(PacketType.StartingPacket)
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from pt_fw_updater.core.poll_scheduler import PollScheduler
+
+
+class PollSchedulerTestCase(TestCase):
+    def test_backs_off_up_to_max_interval(self):
+        scheduler = PollScheduler(3, 30)
+        intervals = [scheduler.next_interval(False) for _ in range(6)]
+        self.assertEqual(intervals, [6, 12, 24, 30, 30, 30])
+
+    def test_change_resets_interval(self):
+        scheduler = PollScheduler(3, 30)
+        for _ in range(5):
+            scheduler.next_interval(False)
+        self.assertEqual(scheduler.next_interval(True), 3)
+        self.assertEqual(scheduler.next_interval(False), 6)
+
+    def test_max_interval_below_min_interval(self):
+        scheduler = PollScheduler(10, 5)
+        self.assertEqual(scheduler.next_interval(False), 10)
+
+    def test_idle_wakeups_fall(self):
+        scheduler = PollScheduler(3, 30)
+        elapsed = 0
+        wakeups = 0
+        while elapsed < 3600:
+            elapsed += scheduler.next_interval(False)
+            wakeups += 1
+        # Polling every 3 seconds wakes up 1200 times an hour
+        self.assertLess(wakeups, 125)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            PollScheduler(0, 30)
+        with self.assertRaises(ValueError):
+            PollScheduler(3, 30, factor=0.5)
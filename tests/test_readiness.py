@@ -0,0 +1,138 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from pt_fw_updater.core.readiness import ReadyTimes, ready_times, wait_until_ready
+from tests.test_simulated_device import FOUNDATION_PLATE_FILE, create_device
+from tests.utils import isolate_firmware_updater
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeClockTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name, function in (
+            ("monotonic", self.clock.time),
+            ("sleep", self.clock.sleep),
+        ):
+            patcher = patch("pt_fw_updater.core.readiness." + name, function)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        ready_times.clear()
+        self.addCleanup(ready_times.clear)
+
+
+class WaitUntilReadyTestCase(FakeClockTestCase):
+    def wait(self, device, **kwargs):
+        return wait_until_ready(device, **kwargs)
+
+    def test_returns_as_soon_as_device_answers(self):
+        device = create_device(restart_reads=2)
+        device.reset()
+        self.assertAlmostEqual(self.wait(device), 0.05 + 0.1 + 0.2)
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.2])
+
+    def test_backoff_is_bounded(self):
+        device = create_device(restart_reads=10)
+        device.reset()
+        self.wait(device, max_interval=0.3)
+        self.assertEqual(max(self.clock.sleeps), 0.3)
+        self.assertEqual(len(self.clock.sleeps), 11)
+
+    def test_gives_up_after_timeout(self):
+        device = create_device(restart_reads=1000)
+        device.reset()
+        self.assertIsNone(self.wait(device, timeout=2))
+        self.assertAlmostEqual(self.clock.now, 2)
+        self.assertEqual(ready_times.get("pt4_foundation_plate"), [])
+
+    def test_waits_for_device_on_bus(self):
+        device = create_device()
+        probes = []
+
+        def probe(address):
+            probes.append(address)
+            return len(probes) > 3
+
+        self.assertIsNotNone(self.wait(device, probe=probe))
+        self.assertEqual(probes, [device.addr] * 4)
+
+    def test_waits_for_new_version(self):
+        device = create_device()
+        device.reset()
+        # The update didn't install, so the device keeps its version
+        self.assertIsNone(self.wait(device, timeout=2, previous_version="6.4"))
+        self.assertIsNotNone(self.wait(device, timeout=2, previous_version="6.3"))
+
+    def test_ready_after_dropping_off_bus_with_same_version(self):
+        device = create_device(stale_reads=2, restart_reads=1)
+        device.reset()
+        self.assertAlmostEqual(
+            self.wait(device, previous_version="6.4"), 0.05 + 0.1 + 0.2 + 0.4
+        )
+
+    def test_records_time_to_ready_by_device_type(self):
+        device = create_device(restart_reads=1)
+        device.reset()
+        elapsed = self.wait(device)
+        self.assertEqual(ready_times.get("pt4_foundation_plate"), [elapsed])
+
+
+class ReadyTimesTestCase(TestCase):
+    def test_summary(self):
+        times = ReadyTimes()
+        times.record("pt4_hub", 1.0)
+        times.record("pt4_hub", 3.0)
+        times.record("pt4_foundation_plate", 0.5)
+        self.assertEqual(
+            times.summary(),
+            {
+                "pt4_hub": {"count": 2, "min": 1.0, "mean": 2.0, "max": 3.0},
+                "pt4_foundation_plate": {
+                    "count": 1,
+                    "min": 0.5,
+                    "mean": 0.5,
+                    "max": 0.5,
+                },
+            },
+        )
+
+
+class InstallUpdatesReadinessTestCase(FakeClockTestCase):
+    def setUp(self):
+        super(InstallUpdatesReadinessTestCase, self).setUp()
+        isolate_firmware_updater(self)
+
+    def install(self, ready_timeout, **kwargs):
+        device = create_device(**kwargs)
+        fw_updater = FirmwareUpdater(
+            device, send_packet_interval=0, ready_timeout=ready_timeout
+        )
+        fw_updater.stage_file(FirmwareFileObject.from_file(FOUNDATION_PLATE_FILE))
+        return fw_updater.install_updates()
+
+    def test_verifies_update_once_device_restarts(self):
+        self.assertEqual(self.install(1, restart_reads=3), (True, False))
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.2, 0.4])
+
+    def test_waits_for_device_to_act_on_reset(self):
+        # Still answers with the old firmware for a few polls
+        self.assertEqual(self.install(5, stale_reads=3), (True, False))
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.2, 0.4])
+
+    def test_fails_when_device_does_not_restart(self):
+        self.assertEqual(self.install(5, restart_reads=1000), (False, False))
+        self.assertEqual(self.clock.now, 5)
@@ -0,0 +1,111 @@
+import errno
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.retry import RetryPolicy, fw_okay_reads, register_reads
+from tests.test_readiness import FakeClock
+from tests.test_simulated_device import create_device
+
+
+class FlakyRead(object):
+    def __init__(self, failures, exception=OSError(errno.EREMOTEIO, "Remote I/O")):
+        self.failures = failures
+        self.exception = exception
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.exception
+        return 42
+
+
+class RetryPolicyTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def create_policy(self, **kwargs):
+        kwargs.setdefault("jitter", 0)
+        return RetryPolicy(
+            clock=self.clock.time, sleep=self.clock.sleep, random=lambda: 1.0, **kwargs
+        )
+
+    def test_retries_with_exponential_backoff(self):
+        policy = self.create_policy(initial_delay=0.01, max_delay=0.05)
+        self.assertEqual(policy.call(FlakyRead(4)), 42)
+        self.assertEqual(self.clock.sleeps, [0.01, 0.02, 0.04, 0.05])
+
+    def test_jitter_shortens_delays(self):
+        policy = self.create_policy(jitter=0.5, initial_delay=0.02)
+        policy.call(FlakyRead(1))
+        self.assertEqual(self.clock.sleeps, [0.01])
+
+    def test_gives_up_after_max_attempts(self):
+        read = FlakyRead(10)
+        policy = self.create_policy(max_attempts=3)
+        with self.assertRaises(OSError):
+            policy.call(read)
+        self.assertEqual(read.calls, 3)
+
+    def test_gives_up_before_deadline(self):
+        read = FlakyRead(10)
+        policy = self.create_policy(
+            max_attempts=100, initial_delay=0.1, max_delay=0.1, deadline=0.35
+        )
+        with self.assertRaises(OSError):
+            policy.call(read)
+        self.assertEqual(read.calls, 4)
+        self.assertLessEqual(self.clock.now, 0.35)
+
+    def test_other_exceptions_are_not_retried(self):
+        read = FlakyRead(1, exception=ValueError())
+        with self.assertRaises(ValueError):
+            self.create_policy().call(read)
+        self.assertEqual(read.calls, 1)
+
+    def test_counts_attempts_and_latency(self):
+        policy = self.create_policy(initial_delay=0.01, max_attempts=3)
+        policy.call(FlakyRead(0))
+        policy.call(FlakyRead(2))
+        with self.assertRaises(OSError):
+            policy.call(FlakyRead(5))
+
+        self.assertEqual(policy.stats.calls, 3)
+        self.assertEqual(policy.stats.attempts, 7)
+        self.assertEqual(policy.stats.retries, 4)
+        self.assertEqual(policy.stats.failures, 1)
+        self.assertAlmostEqual(policy.stats.latency, 0.06)
+        self.assertAlmostEqual(policy.stats.max_latency, 0.03)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_attempts=0)
+        with self.assertRaises(ValueError):
+            RetryPolicy(jitter=2)
+
+
+class RegisterReadsTestCase(TestCase):
+    def test_device_info_is_read_while_device_restarts(self):
+        device = create_device(restart_reads=2)
+        device.reset()
+        retries = register_reads.stats.retries
+
+        device_info = FirmwareFileObject.from_device(device)
+
+        self.assertEqual(str(device_info.firmware_version), "6.4")
+        self.assertEqual(register_reads.stats.retries - retries, 2)
+
+
+class FwOkayReadsTestCase(TestCase):
+    def test_retries_for_at_least_half_a_second(self):
+        clock = FakeClock()
+        read = FlakyRead(100)
+        # Jitter taking the most off every delay
+        with patch.object(fw_okay_reads, "_clock", clock.time), patch.object(
+            fw_okay_reads, "_sleep", clock.sleep
+        ), patch.object(fw_okay_reads, "_random", lambda: 1.0):
+            with self.assertRaises(OSError):
+                fw_okay_reads.call(read)
+        self.assertGreaterEqual(clock.now, 0.5)
+        self.assertLessEqual(clock.now, 1.0)
@@ -0,0 +1,80 @@
+from os import path
+from unittest import TestCase
+from unittest.mock import patch
+
+from pitop.common.firmware_device import DeviceInfo
+
+from pt_fw_updater.core.firmware_file_object import FirmwareFileObject
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from pt_fw_updater.core.packet_manager import PacketManager, PacketType
+from pt_fw_updater.core.simulated_device import SimulatedFirmwareDevice
+from pt_fw_updater.utils import default_firmware_folder
+
+from .utils import isolate_firmware_updater
+
+FOUNDATION_PLATE_FILE = path.join(
+    default_firmware_folder("pt4_foundation_plate"),
+    "pt4_foundation_plate-v6.5-sch3-release.bin",
+)
+
+
+def create_device(**kwargs):
+    return SimulatedFirmwareDevice(
+        "pt4_foundation_plate", fw_version="6.4", schematic_version=3, **kwargs
+    )
+
+
+class SimulatedFirmwareDeviceTestCase(TestCase):
+    def send_firmware(self, device):
+        packet_manager = PacketManager()
+        packet_manager.set_fw_file_to_install(FOUNDATION_PLATE_FILE)
+        device.send_packet(
+            DeviceInfo.FW__UPGRADE_START,
+            list(packet_manager.create_packets(PacketType.StartingPacket)),
+        )
+        for packet in packet_manager.iter_fw_packets():
+            device.send_packet(DeviceInfo.FW__UPGRADE_PACKET, list(packet))
+        packet_manager.close()
+        return PacketManager().read_fw_download_verified_packet(
+            device.get_check_fw_okay()
+        )
+
+    def test_verifies_complete_image(self):
+        device = create_device()
+        self.assertFalse(
+            PacketManager().read_fw_download_verified_packet(device.get_check_fw_okay())
+        )
+        self.assertTrue(self.send_firmware(device))
+        with open(FOUNDATION_PLATE_FILE, "rb") as f:
+            self.assertEqual(device.image, f.read())
+
+    def test_corrupted_frames_are_dropped(self):
+        device = create_device(corruption_rate=0.5, seed=1)
+        self.assertFalse(self.send_firmware(device))
+        self.assertGreater(device.dropped_frames, 0)
+
+    def test_injected_errors_fail_writes(self):
+        device = create_device(fail_writes=[3])
+        with self.assertRaises(OSError):
+            self.send_firmware(device)
+        self.assertEqual(device.write_errors, 1)
+
+    def test_models_bus_latency(self):
+        device = create_device(byte_time=0.0001, realtime=False)
+        self.send_firmware(device)
+        frames = -(-path.getsize(FOUNDATION_PLATE_FILE) // 256)
+        bytes_sent = path.getsize(FOUNDATION_PLATE_FILE) + frames * 10 + 24 + 8
+        self.assertAlmostEqual(device.bus_time, bytes_sent * 0.0001)
+
+    def test_firmware_updater_installs_on_simulated_device(self):
+        isolate_firmware_updater(self)
+        device = create_device()
+        fw_updater = FirmwareUpdater(device)
+        fw_updater.stage_file(FirmwareFileObject.from_file(FOUNDATION_PLATE_FILE))
+        with patch("pt_fw_updater.core.readiness.sleep"):
+            success, requires_restart = fw_updater.install_updates()
+
+        self.assertTrue(success)
+        self.assertFalse(requires_restart)
+        self.assertEqual(device.get_fw_version(), "6.5")
+        self.assertEqual(device.resets, 1)
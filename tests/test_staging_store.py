@@ -0,0 +1,175 @@
+import errno
+import os
+from hashlib import md5
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest.mock import patch
+
+from pt_fw_updater.core import staging_store
+from pt_fw_updater.core.digest_cache import DigestCache
+from pt_fw_updater.core.staging_store import StagingStore
+
+
+class StagingStoreTestCase(TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.addCleanup(rmtree, self.folder)
+        self.store_location = os.path.join(self.folder, "store")
+        self.data = os.urandom(10000)
+        self.source = self.write_file("pt4_hub-v5.6-sch10-release.bin", self.data)
+
+    def write_file(self, name, data):
+        file_path = os.path.join(self.folder, name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    def test_stages_file_by_digest(self):
+        staged_path, digest = StagingStore(self.store_location).stage(self.source)
+
+        self.assertEqual(digest, md5(self.data).hexdigest())
+        self.assertEqual(
+            staged_path, os.path.join(self.store_location, digest + ".bin")
+        )
+        with open(staged_path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_links_file_on_same_filesystem(self):
+        staged_path, _ = StagingStore(self.store_location).stage(self.source)
+        self.assertTrue(os.path.samefile(staged_path, self.source))
+
+    def test_copies_file_when_it_cant_be_linked(self):
+        with patch.object(
+            staging_store.os, "link", side_effect=OSError(errno.EXDEV, "cross-device")
+        ), patch.object(
+            staging_store.fcntl, "ioctl", side_effect=OSError(errno.EOPNOTSUPP, "")
+        ):
+            staged_path, digest = StagingStore(self.store_location).stage(self.source)
+
+        self.assertEqual(digest, md5(self.data).hexdigest())
+        self.assertFalse(os.path.samefile(staged_path, self.source))
+        with open(staged_path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_staging_again_doesnt_copy_file(self):
+        StagingStore(self.store_location).stage(self.source)
+
+        # A new store checks the stored file, then remembers its digest
+        store = StagingStore(self.store_location)
+        for store in (store, store, StagingStore(self.store_location)):
+            with patch.object(StagingStore, "_StagingStore__add") as add:
+                staged_path, digest = store.stage(self.source)
+            add.assert_not_called()
+            self.assertEqual(digest, md5(self.data).hexdigest())
+
+    def test_staging_again_doesnt_read_unchanged_file(self):
+        digests = DigestCache()
+        store = StagingStore(self.store_location, digests)
+        store.stage(self.source)
+        misses = digests.misses
+        store.stage(self.source)
+        self.assertEqual(digests.misses, misses)
+
+    def test_planted_file_is_replaced(self):
+        digest = md5(self.data).hexdigest()
+        os.makedirs(self.store_location)
+        planted_path = os.path.join(self.store_location, digest + ".bin")
+        with open(planted_path, "wb") as f:
+            f.write(os.urandom(10000))
+
+        staged_path, staged_digest = StagingStore(self.store_location).stage(
+            self.source
+        )
+        self.assertEqual(staged_digest, digest)
+        with open(staged_path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_refuses_location_writable_by_others(self):
+        os.makedirs(self.store_location)
+        os.chmod(self.store_location, 0o777)
+        with self.assertRaises(PermissionError):
+            StagingStore(self.store_location).stage(self.source)
+
+    def test_restaging_leaves_no_temporary_files(self):
+        staged_path, _ = StagingStore(self.store_location).stage(self.source)
+        # A link to the same file that isn't trusted is staged again
+        with patch.object(
+            StagingStore, "_StagingStore__stored_file_is_intact", return_value=False
+        ):
+            self.assertEqual(
+                StagingStore(self.store_location).stage(self.source)[0], staged_path
+            )
+        self.assertEqual(
+            os.listdir(self.store_location), [os.path.basename(staged_path)]
+        )
+
+    def test_stages_again_when_file_changes(self):
+        store = StagingStore(self.store_location)
+        store.stage(self.source)
+
+        new_data = os.urandom(10000)
+        os.unlink(self.source)
+        self.write_file(os.path.basename(self.source), new_data)
+        staged_path, digest = store.stage(self.source)
+
+        self.assertEqual(digest, md5(new_data).hexdigest())
+        with open(staged_path, "rb") as f:
+            self.assertEqual(f.read(), new_data)
+
+    def test_stages_again_when_stored_file_is_removed(self):
+        store = StagingStore(self.store_location)
+        staged_path, _ = store.stage(self.source)
+        os.unlink(staged_path)
+
+        staged_path, _ = store.stage(self.source)
+        self.assertTrue(os.path.isfile(staged_path))
+
+    def test_same_contents_stored_once(self):
+        other = self.write_file("copy.bin", self.data)
+        store = StagingStore(self.store_location)
+        first_path, _ = store.stage(self.source)
+        second_path, _ = store.stage(other)
+
+        self.assertEqual(first_path, second_path)
+        self.assertEqual(
+            sorted(os.listdir(self.store_location)),
+            [os.path.basename(first_path)],
+        )
+
+    def rewrite_source(self, data):
+        """Rewrites the source in place, keeping its inode."""
+        stat_result = os.stat(self.source)
+        with open(self.source, "r+b") as f:
+            f.write(data)
+        # Make sure the change shows up even on filesystems with coarse
+        # timestamps
+        mtime_ns = stat_result.st_mtime_ns + 1_000_000_000
+        os.utime(self.source, ns=(mtime_ns, mtime_ns))
+
+    def test_source_rewritten_in_place_is_staged_again(self):
+        store = StagingStore(self.store_location)
+        store.stage(self.source)
+
+        new_data = os.urandom(10000)
+        self.rewrite_source(new_data)
+        staged_path, digest = store.stage(self.source)
+
+        self.assertEqual(digest, md5(new_data).hexdigest())
+        with open(staged_path, "rb") as f:
+            self.assertEqual(f.read(), new_data)
+
+    def test_stored_file_changed_through_link_is_replaced(self):
+        store = StagingStore(self.store_location)
+        old_path, old_digest = store.stage(self.source)
+        self.assertTrue(os.path.samefile(old_path, self.source))
+
+        # The stored file is a link to the source, so it changes too
+        self.rewrite_source(os.urandom(10000))
+        other = self.write_file("copy.bin", self.data)
+        for store in (store, StagingStore(self.store_location)):
+            staged_path, digest = store.stage(other)
+
+            self.assertEqual((staged_path, digest), (old_path, old_digest))
+            with open(staged_path, "rb") as f:
+                self.assertEqual(f.read(), self.data)
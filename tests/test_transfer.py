@@ -0,0 +1,62 @@
+from time import sleep
+from unittest import TestCase
+
+from pt_fw_updater.core.transfer import send_frames, send_frames_pipelined
+
+
+class PipelinedTransferTestCase(TestCase):
+    def test_frames_are_sent_in_order(self):
+        frames = [bytes([i]) * 4 for i in range(200)]
+        sent = list()
+        stats = send_frames_pipelined(iter(frames), sent.append, queue_size=4)
+        self.assertEqual(sent, [list(frame) for frame in frames])
+        self.assertEqual(stats.frames_sent, 200)
+
+    def test_producer_is_bounded_by_queue_size(self):
+        produced = list()
+        sent = list()
+
+        def frames():
+            for i in range(50):
+                produced.append(i)
+                yield bytes([i])
+
+        def send(packet):
+            # produced - sent: queued frames, the one being encoded and the
+            # one waiting to be queued
+            self.assertLessEqual(len(produced) - len(sent), 3 + 2)
+            sent.append(packet)
+            sleep(0.001)
+
+        send_frames_pipelined(frames(), send, queue_size=3)
+        self.assertEqual(len(sent), 50)
+
+    def test_overlap_saves_time(self):
+        def frames():
+            for i in range(20):
+                sleep(0.005)
+                yield bytes([i])
+
+        def send(packet):
+            sleep(0.005)
+
+        sequential = send_frames(frames(), send)
+        pipelined = send_frames_pipelined(frames(), send)
+        self.assertLess(sequential.overlap_saved, 0.02)
+        self.assertGreater(pipelined.overlap_saved, 0.05)
+        self.assertLess(pipelined.wall_time, sequential.wall_time)
+
+    def test_producer_error_is_raised(self):
+        def frames():
+            yield b"\x01"
+            raise ValueError("bad frame")
+
+        with self.assertRaises(ValueError):
+            send_frames_pipelined(frames(), lambda packet: None)
+
+    def test_sender_error_stops_producer(self):
+        def send(packet):
+            raise ConnectionError("bus error")
+
+        with self.assertRaises(ConnectionError):
+            send_frames_pipelined((bytes([i]) for i in range(1000)), send, 2)
@@ -0,0 +1,178 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+from pitop.common.common_ids import FirmwareDeviceID
+from pitop.common.firmware_device import PTInvalidFirmwareDeviceException
+
+from pt_fw_updater import update
+from pt_fw_updater.core.firmware_updater import PTUpdatePending
+from pt_fw_updater.core.notification_manager import UpdateStatusEnum
+
+
+class UpdateMainTestCase(TestCase):
+    def setUp(self):
+        self.fw_updater = MagicMock()
+        self.fw_updater.install_updates.return_value = (True, False)
+        patchers = [
+            patch.object(update, "FirmwareUpdater", return_value=self.fw_updater),
+            patch.object(update, "FirmwareDevice", wraps=update.FirmwareDevice),
+            patch.object(update, "PTLock"),
+            patch.object(update, "i2c_addr_found", return_value=True),
+            patch.object(update, "find_latest_firmware"),
+            patch.object(update.os.path, "isfile", return_value=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reuses_device_and_firmware_file(self):
+        fw_device = MagicMock(spec=["_i2c_device"])
+        fw_file = MagicMock(path="/fw/pt4_hub-v5.6-sch10-release.bin")
+
+        update.main(
+            "pt4_hub",
+            False,
+            interval=0.05,
+            notify_user=False,
+            fw_device=fw_device,
+            fw_file=fw_file,
+        )
+
+        update.FirmwareDevice.assert_not_called()
+        update.find_latest_firmware.assert_not_called()
+        self.assertIs(update.FirmwareUpdater.call_args.args[0], fw_device)
+        fw_device._i2c_device.set_delays.assert_called_once_with(0.05, 0.05)
+        self.fw_updater.stage_file.assert_called_once_with(fw_file, False)
+        self.fw_updater.install_updates.assert_called_once()
+
+
+class UpdateAllTestCase(TestCase):
+    def setUp(self):
+        self.attached = {
+            FirmwareDeviceID.pt4_hub: MagicMock(spec=["_i2c_device"]),
+            FirmwareDeviceID.pt4_expansion_plate: MagicMock(spec=["_i2c_device"]),
+        }
+        self.fw_updaters = dict()
+
+        def create_firmware_device(device_id, interval):
+            if device_id not in self.attached:
+                raise PTInvalidFirmwareDeviceException("Part name doesn't match")
+            return self.attached[device_id]
+
+        def create_fw_updater(fw_device, **kwargs):
+            fw_updater = MagicMock()
+            fw_updater.install_updates.return_value = (True, True)
+            self.fw_updaters[fw_device] = fw_updater
+            return fw_updater
+
+        self.notification_manager = MagicMock()
+        self.notification_manager.notify_user.return_value = ["OK"]
+        patchers = [
+            patch.object(update, "scan_bus", return_value={0x04: True, 0x11: True}),
+            patch.object(update, "create_firmware_device", create_firmware_device),
+            patch.object(update, "FirmwareUpdater", side_effect=create_fw_updater),
+            patch.object(update, "find_latest_firmware"),
+            patch.object(update, "is_valid_fw_object", return_value=True),
+            patch.object(update, "PTLock"),
+            patch.object(
+                update, "NotificationManager", return_value=self.notification_manager
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fw_updater(self, device_id):
+        return self.fw_updaters[self.attached[device_id]]
+
+    def test_updates_every_attached_device(self):
+        results = update.main_all(False)
+
+        self.assertEqual(
+            results,
+            {
+                FirmwareDeviceID.pt4_hub: (True, True),
+                FirmwareDeviceID.pt4_expansion_plate: (True, True),
+            },
+        )
+        for device_id in self.attached:
+            self.fw_updater(device_id).stage_file.assert_called_once()
+            self.fw_updater(device_id).install_updates.assert_called_once()
+
+    def test_asks_user_once(self):
+        update.main_all(False)
+
+        statuses = [
+            c.args[0] for c in self.notification_manager.notify_user.call_args_list
+        ]
+        self.assertEqual(
+            statuses,
+            [
+                UpdateStatusEnum.PROMPT,
+                UpdateStatusEnum.ONGOING,
+                UpdateStatusEnum.SUCCESS_REQUIRES_RESTART,
+            ],
+        )
+        prompt_devices = self.notification_manager.notify_user.call_args_list[0].args[1]
+        self.assertEqual(
+            prompt_devices,
+            [FirmwareDeviceID.pt4_hub, FirmwareDeviceID.pt4_expansion_plate],
+        )
+
+    def test_user_declines(self):
+        self.notification_manager.notify_user.return_value = []
+        self.assertEqual(update.main_all(False), dict())
+        for device_id in self.attached:
+            self.fw_updater(device_id).install_updates.assert_not_called()
+
+    def test_skips_devices_without_update(self):
+        fw_updaters = list()
+
+        def create_fw_updater(fw_device, **kwargs):
+            fw_updater = MagicMock()
+            fw_updater.install_updates.return_value = (True, False)
+            if fw_device is self.attached[FirmwareDeviceID.pt4_hub]:
+                fw_updater.stage_file.side_effect = PTUpdatePending("pending")
+            fw_updaters.append(fw_updater)
+            return fw_updater
+
+        update.FirmwareUpdater.side_effect = create_fw_updater
+        results = update.main_all(False, notify_user=False)
+
+        self.assertEqual(results, {FirmwareDeviceID.pt4_expansion_plate: (True, False)})
+        self.notification_manager.notify_user.assert_not_called()
+
+    def test_reports_failed_devices(self):
+        def create_fw_updater(fw_device, **kwargs):
+            fw_updater = MagicMock()
+            fw_updater.install_updates.return_value = (True, True)
+            if fw_device is self.attached[FirmwareDeviceID.pt4_hub]:
+                fw_updater.install_updates.side_effect = OSError("bus")
+            return fw_updater
+
+        update.FirmwareUpdater.side_effect = create_fw_updater
+        results = update.main_all(False)
+
+        self.assertEqual(results[FirmwareDeviceID.pt4_hub], (False, False))
+        self.assertEqual(results[FirmwareDeviceID.pt4_expansion_plate], (True, True))
+        device_ids = [FirmwareDeviceID.pt4_hub, FirmwareDeviceID.pt4_expansion_plate]
+        self.assertEqual(
+            self.notification_manager.notify_user.call_args_list[2:],
+            [
+                # Shown in place of the ongoing notification about both
+                call(
+                    UpdateStatusEnum.FAILURE,
+                    [FirmwareDeviceID.pt4_hub],
+                    replace=device_ids,
+                ),
+                call(
+                    UpdateStatusEnum.SUCCESS_REQUIRES_RESTART,
+                    [FirmwareDeviceID.pt4_expansion_plate],
+                    replace=None,
+                ),
+            ],
+        )
+        self.assertEqual(
+            self.notification_manager.notify_user.call_args_list[1],
+            call(UpdateStatusEnum.ONGOING, device_ids),
+        )
@@ -1,6 +1,33 @@
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest.mock import patch
+
+from pt_fw_updater.core.checkpoint import TransferCheckpoint
+from pt_fw_updater.core.firmware_updater import FirmwareUpdater
+from pt_fw_updater.core.frame_cache import FrameCache
+from pt_fw_updater.core.pacing import PacingStore
+
+
 class dotdict(dict):
     """dot.notation access to dictionary attributes."""
 
     __getattr__ = dict.get
     __setattr__ = dict.__setitem__  # type: ignore
     __delattr__ = dict.__delitem__  # type: ignore
+
+
+def isolate_firmware_updater(test_case):
+    """Points the locations FirmwareUpdater writes to at a temporary
+    folder for the duration of a test."""
+    folder = mkdtemp()
+    test_case.addCleanup(rmtree, folder)
+    for cls, attribute, location in (
+        (FirmwareUpdater, "FW_SAFE_LOCATION", "bin/"),
+        (FrameCache, "DEFAULT_LOCATION", "frames/"),
+        (TransferCheckpoint, "DEFAULT_LOCATION", "checkpoints/"),
+        (PacingStore, "DEFAULT_LOCATION", "pacing.json"),
+    ):
+        patcher = patch.object(cls, attribute, "{}/{}".format(folder, location))
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+    return folder